@@ -1,14 +1,43 @@
 
 import gzip
+import hashlib
 import json
+import os
 import shutil
+import sqlite3
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import TYPE_CHECKING
 
-from sqlalchemy import text, union
+import orjson
+
+from sqlalchemy import event, func, insert, or_, text, union
 
 PREBUILTS_DIRECTORY="database/prebuilts/"
+SNAPSHOTS_DIRECTORY="database/snapshots/"
+CHANGESETS_DIRECTORY="database/prebuilts/changes/"
+
+# tables that are exported in compact.db
+COMPACT_DB_TABLES = [
+    "metadata",
+    "semester",
+    "coursedb",
+    "coursemaxdb",
+    "coursetransferdestinationdb",
+    "courseoutlinedb",
+    "sectiondb",
+    "scheduleentrydb",
+    "sectiontimesdb",
+    "transferdb",
+]
+# bigger pages mean less per page overhead in a file that is only ever downloaded and read
+COMPACT_DB_PAGE_SIZE = 65536
+
+# seconds a connection waits for another connection's lock before giving up
+DB_BUSY_TIMEOUT = 30
+# rows written per transaction by the long updates, so the WAL can be checkpointed
+# while they run instead of growing until they finish
+WRITE_BATCH_SIZE = 2000
 
 from sdk.schema.aggregated.Course import CourseDB
 from sdk.schema.aggregated.Semester import Semester
@@ -17,23 +46,35 @@ from sdk.schema.sources.CourseAttribute import CourseAttributeDB
 from sdk.schema.sources.CourseOutline import CourseOutlineDB
 from sdk.schema.sources.CoursePage import CoursePageDB
 from sdk.schema.sources.CourseSummary import CourseSummaryDB
-from sdk.schema.sources.Section import SectionAPI, SectionDB
+from sdk.schema.sources.Section import SectionAPI, SectionAPIList, SectionDB, sectionKey
 from sdk.schema.sources.ScheduleEntry import ScheduleEntryDB
 from sdk.schema.sources.Transfer import Transfer, TransferDB
 
-from sqlmodel import Field, Session, SQLModel, create_engine, select, col
+from sqlmodel import Field, Session, SQLModel, create_engine, delete, select, col
 from sqlalchemy.orm import selectinload 
 from pydantic.json import pydantic_encoder
 
 from sdk.schema.aggregated.Metadata import Metadata
 from sdk.schema.aggregated.CourseMax import CourseMax, CourseMaxDB
+from sdk.schema.aggregated.SectionTimes import SectionTimesDB
+from sdk.schema.aggregated.CourseTransferDestination import CourseTransferDestinationDB
+from sdk.schema.aggregated.CourseDocument import CourseDocumentDB
+from sdk.schema.aggregated.Course import CourseAPI
+from sdk.schema.aggregated.ApiResponses import IndexCourse, IndexCourseList, IndexSemesterList, IndexSubjectList, IndexTransfer, IndexTransferList
+from sdk.api.Prebuilts import PrebuiltWriter, compressFile
+from sdk.api.Changesets import ChangesetLog, diffDatabases, readGeneration
+from sdk.api import ColumnarExport
+from sdk.api.QueryShapes import QUERY_SHAPES_ENV, QueryShapeRecorder
+from sdk.schema.Migrations import runMigrations
 from sdk.scrapers.DownloadLangaraInfo import fetchTermFromWeb
 from sdk.parsers.SemesterParser import parseSemesterHTML
 from sdk.parsers.CatalogueParser import parseCatalogueHTML
 from sdk.parsers.AttributesParser import parseAttributesHTML
+from sdk.parsers.ScheduleTimes import maskToBytes, scheduleMask
 from sdk.scrapers.DownloadTransferInfo import getTransferInformation
 from sdk.scrapers.LangaraCourseIndex import getCoursePageInfo
 from sdk.scrapers.ScraperUtilities import createSession
+from sdk.search.CourseSearchIndex import buildCourseSearchIndex
 
 # TODO: fix sketchy hardcoding
 import logging
@@ -41,33 +82,56 @@ logger = logging.getLogger("LangaraCourseWatcherScraper")
 
 class Controller():    
     def __init__(self, db_path="database/database.db", db_type="sqlite") -> None:        
-        connect_args = {"check_same_thread": False}
+        connect_args = {"check_same_thread": False, "timeout": DB_BUSY_TIMEOUT}
         self.engine = create_engine(f"{db_type}:///{db_path}", connect_args=connect_args)
         
+        # per connection, in WAL mode normal is still safe against corruption
+        @event.listens_for(self.engine, "connect")
+        def set_pragmas(dbapi_connection, connection_record):
+            dbapi_connection.execute("pragma synchronous = normal")
+        
+        # record the queries that are run for benchmarks/index_advisor.py
+        self.query_recorder = None
+        if os.getenv(QUERY_SHAPES_ENV):
+            self.query_recorder = QueryShapeRecorder(os.getenv(QUERY_SHAPES_ENV))
+            self.query_recorder.attach(self.engine)
+        
         self.existing_courses:dict[str, list[int]] = {}
         
+        # (subject, course_code, year, term) of every row updateSemester changed,
+        # genIndexesAndPreBuilts only regenerates what these touch
+        self.changed: set[tuple] = set()
+        
         
     # you should probably call this before doing anything
     def create_db_and_tables(self):
+        db_path = self.engine.url.database
+        new_database = not os.path.exists(db_path) or os.path.getsize(db_path) == 0
+        
         # create db and tables if they don't already exist
-        SQLModel.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            # the page size can only be set before the first table is created, and
+            # can't be changed once the database is in WAL mode
+            if new_database:
+                connection.exec_driver_sql("pragma page_size = 32768")
+            SQLModel.metadata.create_all(connection)
+        # create_all doesn't change existing tables, migrations bring older databases up to date
+        runMigrations(db_path, timeout=DB_BUSY_TIMEOUT)
         
         journal_options = (
+        # readers (the api's snapshot, compact.db, VACUUM INTO) never wait on the
+        # writer and the writer never waits on them. persists in the database file
+        "pragma journal_mode = wal;",
         "pragma synchronous = normal;",
         "pragma journal_size_limit = 6144000;",
         "pragma mmap_size = 30000000000;",
-        "pragma page_size = 32768;",
         "pragma cache_size = 100000",
-        "pragma vacuum;",
         "pragma optimize"
         )
             
         with Session(self.engine) as session:
             for pragma in journal_options:
                 session.exec(text(pragma))
-        
-        self.setMetadata("db_version", "2")
-    
     
     def incrementTerm(year, term) -> tuple[int, int]:
         if term == 10:
@@ -119,7 +183,7 @@ class Controller():
         term = latestSemester[1]
         
         changes = self.updateSemester(year, term, use_cache)
-        self.genIndexesAndPreBuilts()
+        self.genIndexesAndPreBuilts(self.changed)
         
         # now = datetime.today().strftime('%Y-%m-%d %H:%M:%S')
         # logger.info(f"[{now}] Fetched new data from Langara. {len(changes)} changes found.")
@@ -140,7 +204,7 @@ class Controller():
         logger.info(f"New semester data for {year}{term} found!")
         
         changes = self.updateSemester(year, term, use_cache=False)
-        self.genIndexesAndPreBuilts()
+        self.genIndexesAndPreBuilts(self.changed)
         
         # now = datetime.today().strftime('%Y-%m-%d %H:%M:%S')
         # logger.info(f"[{now}] Fetched new data from Langara. {len(changes)} changes found.")
@@ -287,6 +351,7 @@ class Controller():
         # usually they will mark the section as cancelled but this isn't always
         # true, especially early on before the start of registration
         with Session(self.engine) as session:
+            event.listen(session, "before_flush", self._recordChanges)
             
             # save Semester if it doesn't exist
             statement = select(Semester).where(Semester.year==year, Semester.term==term)
@@ -304,31 +369,38 @@ class Controller():
                 
             # TODO: move changes watcher to its own service
             
+            # committed in batches instead of one transaction for the whole semester,
+            # every step is an upsert so a run that fails part way is fixed by the next one
+            
             # logger.info(f"{year}{term} Inserting sections.")
-            for c in warehouse.sections:
+            for i, c in enumerate(warehouse.sections, 1):
                 self.checkCourseExists(session, c.subject, c.course_code, c)
                 session.merge(c)
+                if i % WRITE_BATCH_SIZE == 0:
+                    session.commit()
+            session.commit()
             
-            
-            # logger.info(f"{year}{term} Inserting schedules.")
-            for s in warehouse.schedules:   
-                session.merge(s)  
+            # only writes the schedule entries that changed
+            self._reconcileSchedules(session, year, term, warehouse.schedules)
                 
-            # remove sections and schedules if they have the current year and term but do not exist in the warehouse
-            logger.info(f"{year}{term} Removing orphaned sections and schedules.")
-            self._removeOrphanedSectionsAndSchedules(session, year, term, warehouse)
-                    
+            # remove sections if they have the current year and term but do not exist in the warehouse
+            logger.info(f"{year}{term} Removing orphaned sections.")
+            self._removeOrphanedSections(session, year, term, warehouse)
+            session.commit()
                     
             # logger.info(f"{year}{term} Inserting summaries.")
-            for cs in warehouse.courseSummaries:
+            for i, cs in enumerate(warehouse.courseSummaries, 1):
                 self.checkCourseExists(session, cs.subject, cs.course_code, cs)
                 session.merge(cs)
+                if i % WRITE_BATCH_SIZE == 0:
+                    session.commit()
                 
-                    
             # logger.info(f"{year}{term} Inserting attributes.")
-            for a in warehouse.attributes:
+            for i, a in enumerate(warehouse.attributes, 1):
                 self.checkCourseExists(session, a.subject, a.course_code, a)
                 session.merge(a)
+                if i % WRITE_BATCH_SIZE == 0:
+                    session.commit()
 
             # not a bottleneck, this is pretty fast
             # logger.info(f"{year}{term} : Committing updates...")
@@ -338,12 +410,51 @@ class Controller():
         logger.info(f"{year}{term} : Finished DB update.")
         return True
 
-    def _removeOrphanedSectionsAndSchedules(self, session: Session, year: int, term: int, warehouse) -> None:
-        """Remove sections and schedules from DB that exist for this year/term but are not in the current warehouse data"""
+    def _recordChanges(self, session: Session, flush_context, instances) -> None:
+        # merge() marks every row it touches as dirty, only count the ones that really changed
+        dirty = [obj for obj in session.dirty if session.is_modified(obj)]
+        for obj in (*session.new, *session.deleted, *dirty):
+            self.changed.add((
+                getattr(obj, "subject", None),
+                getattr(obj, "course_code", None),
+                getattr(obj, "year", None),
+                getattr(obj, "term", None),
+            ))
+
+    def _reconcileSchedules(self, session: Session, year: int, term: int, schedules: list[ScheduleEntryDB]) -> None:
+        """
+        Match the parsed schedule entries of a semester to the ones in the DB by id (derived from
+        their content, see scheduleEntryId) and only insert, update or delete the ones that changed.
+        """
+        statement = select(ScheduleEntryDB).where(ScheduleEntryDB.year == year, ScheduleEntryDB.term == term)
+        existing = {s.id: s for s in session.exec(statement).all()}
+        
+        inserted = updated = 0
+        for s in schedules:
+            old = existing.pop(s.id, None)
+            if old is None:
+                session.add(s)
+                inserted += 1
+                continue
+            
+            # room and instructor aren't part of the id
+            new_data = s.model_dump()
+            if old.model_dump() != new_data:
+                old.sqlmodel_update(new_data)
+                session.add(old)
+                updated += 1
+        
+        # whatever is left isn't listed anymore
+        for s in existing.values():
+            session.delete(s)
+        
+        logger.info(f"{year}{term} : Schedules: {inserted} inserted, {updated} updated, {len(existing)} deleted, {len(schedules) - inserted - updated} unchanged.")
+
+    def _removeOrphanedSections(self, session: Session, year: int, term: int, warehouse) -> None:
+        """Remove sections from DB that exist for this year/term but are not in the current warehouse data"""
         
         # Get all section IDs that currently exist in the warehouse (scraped data)
         current_section_ids = {section.id for section in warehouse.sections}
-        current_schedule_ids = {schedule.id for schedule in warehouse.schedules}
         
         # Find all sections in the database for this year/term
         statement = select(SectionDB).where(SectionDB.year == year, SectionDB.term == term)
@@ -355,28 +466,14 @@ class Controller():
             if section.id not in current_section_ids:
                 sections_to_delete.append(section)
         
-        # Find all schedules in the database for this year/term
-        statement = select(ScheduleEntryDB).where(ScheduleEntryDB.year == year, ScheduleEntryDB.term == term)
-        existing_schedules = session.exec(statement).all()
-        
-        # Find schedules that are in DB but not in current scraped data (orphaned)
-        schedules_to_delete = []
-        for schedule in existing_schedules:
-            if schedule.id not in current_schedule_ids:
-                schedules_to_delete.append(schedule)
-        
-        # Delete orphaned schedules first (due to foreign key constraints)
-        for schedule in schedules_to_delete:
-            session.delete(schedule)
-            
-        # Delete orphaned sections
+        # Delete orphaned sections (their schedules were removed by _reconcileSchedules)
         for section in sections_to_delete:
             session.delete(section)
             
-        if sections_to_delete or schedules_to_delete:
-            logger.info(f"{year}{term} : Removed {len(sections_to_delete)} orphaned sections and {len(schedules_to_delete)} orphaned schedules.")
+        if sections_to_delete:
+            logger.info(f"{year}{term} : Removed {len(sections_to_delete)} orphaned sections.")
         else:
-            logger.info(f"{year}{term} : No orphaned sections or schedules found.")
+            logger.info(f"{year}{term} : No orphaned sections found.")
 
     
     def timeDeltaString(time1:float, time2:float) -> str:
@@ -429,6 +526,10 @@ class Controller():
                     result.sqlmodel_update(new_data)
                     session.add(result)
                 
+                # short transactions instead of one for every agreement
+                if (i + 1) % WRITE_BATCH_SIZE == 0:
+                    session.commit()
+                
                 if i % 5000==0:
                     logger.info(f"Storing transfer agreements... ({i}/{len(transfers)})")
             
@@ -436,53 +537,212 @@ class Controller():
                 
 
     
-    def genIndexesAndPreBuilts(self) -> None:
-        self._generateCourseIndexes()
-        self._generatePreBuilds()
-        self._generateCourseDatabase()
-        
-    def _generateCourseDatabase(self, db_path="database/prebuilts/compact.db") -> None:
-        # file system database
-        logger.info("Saving compact.db...")
+    def checkpoint(self, retries: int = 3) -> bool:
+        """
+        Copy the WAL into the database file and truncate it, after a big write.
+        Readers that are still on an older version can keep it from finishing,
+        in that case it's retried and otherwise left to the next one.
+        """
+        for attempt in range(retries):
+            with self.engine.connect() as connection:
+                busy, log_pages, checkpointed_pages = connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").one()
+            if not busy:
+                logger.info(f"Checkpointed {checkpointed_pages} WAL pages.")
+                return True
+            time.sleep(1 + attempt)
+        
+        logger.warning(f"WAL checkpoint still blocked by readers after {retries} tries ({checkpointed_pages}/{log_pages} pages).")
+        return False
+    
+    def publishSnapshot(self, keep: int = 3) -> str:
+        """
+        Publish an immutable copy of the database for the api workers.
+        
+        Every api worker opens the newest snapshot read only, so the OS page cache
+        is shared between them instead of each holding its own copy of the database.
+        Snapshots are never modified after they are published.
+        """
+        os.makedirs(SNAPSHOTS_DIRECTORY, exist_ok=True)
+        
+        # a published file must never be overwritten, so names have to be unique
+        name = f"snapshot-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}.db"
+        path = os.path.join(SNAPSHOTS_DIRECTORY, name)
+        assert not os.path.exists(path), f"Snapshot {path} already exists."
+        temp_path = path + ".tmp"
+        
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        
+        # VACUUM INTO gives a consistent, defragmented copy in one statement
+        with self.engine.connect() as connection:
+            connection.exec_driver_sql("VACUUM INTO ?", (temp_path,))
+        os.replace(temp_path, path)
+        
+        # swap the pointer atomically so workers never see a half written name
+        pointer = os.path.join(SNAPSHOTS_DIRECTORY, "CURRENT")
+        with open(pointer + ".tmp", "w") as fi:
+            fi.write(name)
+        os.replace(pointer + ".tmp", pointer)
+        
+        # workers that still have an old snapshot open keep reading it after it is unlinked
+        snapshots = sorted(f for f in os.listdir(SNAPSHOTS_DIRECTORY) if f.startswith("snapshot-") and f.endswith(".db"))
+        for old in snapshots[:-keep]:
+            os.remove(os.path.join(SNAPSHOTS_DIRECTORY, old))
+        
+        logger.info(f"Published snapshot {name}.")
+        return path
+    
+    def genIndexesAndPreBuilts(self, changed: set[tuple] | None = None) -> bool:
+        """
+        Regenerate the aggregations, prebuilts and exports.
+        
+        With `changed` (see self.changed) only the courses and semesters it touches
+        are regenerated, and nothing at all if it's empty. Returns whether anything was.
+        """
+        if changed is not None and not changed:
+            logger.info("Nothing changed, skipping aggregations and prebuilts.")
+            return False
         
-        sql_address = f'sqlite:///{db_path}'
-
-        new_engine = create_engine(sql_address)
+        courses = None
+        semesters = None
+        if changed is not None:
+            courses = {(subject, course_code) for subject, course_code, _, _ in changed if subject is not None}
+            semesters = {(year, term) for _, _, year, term in changed if year is not None}
+            logger.info(f"Regenerating {len(courses)} courses and {len(semesters)} semesters.")
+        
+        timings = {}
+        def timed(name: str, step, *args) -> None:
+            start = time.perf_counter()
+            step(*args)
+            timings[name] = time.perf_counter() - start
+        
+        timed("course indexes", self._generateCourseIndexes, courses)
+        # only transfers change these, and updateSemester doesn't touch them
+        if changed is None:
+            timed("transfer destinations", self._generateTransferDestinations)
+        timed("search indexes", self._generateSearchIndexes)
+        timed("section times", self._generateSectionTimes, semesters)
+        timed("course documents", self._generateCourseDocuments, courses)
+        timed("prebuilts", self._generatePreBuilds, semesters, courses)
+        timed("columnar export", self._generateColumnarExport, semesters)
+        timed("compact.db", self._generateCourseDatabase)
+        
+        total = sum(timings.values())
+        self.setMetadata("aggregations_ms", str(round(total * 1000)))
+        logger.info(f"Aggregations and prebuilts generated in {total:.1f}s ({', '.join(f'{name} {t:.1f}s' for name, t in timings.items())}).")
+        
+        if self.query_recorder is not None:
+            self.query_recorder.save()
+        return True
         
-
-        raw_connection_new = new_engine.raw_connection()
-        raw_connection_file = self.engine.raw_connection()
-
-        raw_connection_file.backup(raw_connection_new.connection)
+    def _generateCourseDatabase(self, db_path="database/prebuilts/compact.db") -> None:
+        """
+        Build compact.db with only the exported tables and compress it.
         
-        raw_connection_file.close()
-        raw_connection_new.close()
+        The tables are copied straight from database.db through ATTACH instead of
+        copying everything and dropping what we don't want, so nothing has to be vacuumed.
         
-        with Session(new_engine) as session:
-            session.exec(text("DROP TABLE IF EXISTS CourseAttributeDB"))
-            session.exec(text("DROP TABLE IF EXISTS CoursePageDB"))
-            session.exec(text("DROP TABLE IF EXISTS CourseSummaryDB"))
-            
-            session.exec(text("VACUUM;"))
+        Every build is a new generation, and the rows that changed since the previous
+        build are saved as a changeset so clients can sync instead of downloading it again.
+        """
+        logger.info("Saving compact.db...")
+        start = time.perf_counter()
+        
+        previous_generation = readGeneration(db_path)
+        generation = previous_generation + 1
+        # goes into compact.db with the rest of the metadata table
+        self.setMetadata("generation", str(generation))
+        
+        source_path = self.engine.url.database
+        tmp_path = db_path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        
+        connection = sqlite3.connect(tmp_path, isolation_level=None)
+        try:
+            # page size has to be set before the first table is created
+            connection.execute(f"PRAGMA page_size = {COMPACT_DB_PAGE_SIZE}")
+            # a half written file is just thrown away, no need for a journal
+            connection.execute("PRAGMA journal_mode = OFF")
+            connection.execute("PRAGMA synchronous = OFF")
+            connection.execute("ATTACH DATABASE ? AS source", (f"file:{source_path}?mode=ro",))
             
-            session.commit()
-        
-        with open(db_path, "rb") as file_read:
-            with gzip.open(db_path+".gz", 'wb') as file_write:
-                shutil.copyfileobj(file_read, file_write)
+            connection.execute("BEGIN")
+            for table in COMPACT_DB_TABLES:
+                schema = connection.execute(
+                    "SELECT sql FROM source.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+                ).fetchone()
+                if schema is None:
+                    continue
+                
+                connection.execute(schema[0])
+                connection.execute(f"INSERT INTO main.{table} SELECT * FROM source.{table}")
+                
+                # indexes are created after the insert so they are built in one go
+                indexes = connection.execute(
+                    "SELECT sql FROM source.sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+                ).fetchall()
+                for (index_sql,) in indexes:
+                    connection.execute(index_sql)
+            connection.execute("COMMIT")
             
-                    
-        logger.info(f"compact.db saved to {db_path}")
+            connection.execute("DETACH DATABASE source")
+            connection.execute("PRAGMA optimize")
+        finally:
+            connection.close()
+        
+        build_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        changes = None
+        if previous_generation:
+            changes = diffDatabases(db_path, tmp_path, COMPACT_DB_TABLES)
+        changesets = ChangesetLog(CHANGESETS_DIRECTORY).write(generation, changes)
+        diff_time = time.perf_counter() - start
+        
+        os.replace(tmp_path, db_path)
+        
+        start = time.perf_counter()
+        sizes = compressFile(db_path)
+        compress_time = time.perf_counter() - start
+        
+        self.setMetadata("compact_db_build_ms", str(round(build_time * 1000)))
+        self.setMetadata("compact_db_compress_ms", str(round(compress_time * 1000)))
+        self.setMetadata("compact_db_size", str(os.path.getsize(db_path)))
+        self.setMetadata("compact_db_diff_ms", str(round(diff_time * 1000)))
+        for encoding, size in sizes.items():
+            self.setMetadata(f"compact_db_{encoding}_size", str(size))
+        
+        if changes is None:
+            logger.info(f"compact.db generation {generation} has no changeset, clients have to download it again.")
+        else:
+            logger.info(f"compact.db generation {generation}: {len(changes)} changed rows, changesets available since generation {changesets['since']}.")
+        logger.info(f"compact.db saved to {db_path} ({os.path.getsize(db_path) // 1024} KiB, {', '.join(f'{e} {s // 1024} KiB' for e, s in sizes.items())}) in {build_time:.1f}s + {compress_time:.1f}s compression.")
             
     
+    # parquet copies of sections and schedules for analytics, see sdk/api/ColumnarExport.py
+    def _generateColumnarExport(self, semesters: set[tuple[int, int]] | None = None) -> None:
+        if ColumnarExport.pyarrow is None:
+            logger.warning("pyarrow is not installed, skipping the parquet export.")
+            return
+        
+        start = time.perf_counter()
+        with Session(self.engine) as session:
+            stats = ColumnarExport.writeParquetExport(session, PREBUILTS_DIRECTORY + "columnar/", semesters)
+        
+        logger.info(f"Wrote {stats['files']} parquet files ({stats['size'] // 1024} KiB) in {time.perf_counter() - start:.1f}s.")
+    
     # generate the Course
-    def _generateCourseIndexes(self) -> None:
+    def _generateCourseIndexes(self, only: set[tuple[str, str]] | None = None) -> None:
         # get list of courses
         with Session(self.engine) as session:
             statement = select(CourseDB.subject, CourseDB.course_code).distinct()
             results = session.exec(statement)
             courses = results.all() 
             
+            if only is not None:
+                courses = [c for c in courses if tuple(c) in only]
+            
             # logger.info(courses)
             
             i = 0
@@ -673,24 +933,161 @@ class Controller():
                     
                 session.commit()
     
-    def _generatePreBuilds(self) -> None:    
-        
-        out = []
-
-        # get all courses for the given semester
+    # normalized version of CourseMax.transfer_destinations, used to filter courses by destination
+    # same rules: only agreements that give credit count
+    def _generateTransferDestinations(self) -> None:
         with Session(self.engine) as session:
-            statement = select(CourseDB.subject, CourseDB.course_code).distinct()
-            results = session.exec(statement)
-            courses = results.all() 
+            session.exec(delete(CourseTransferDestinationDB))
+            
+            statement = select(
+                TransferDB.destination,
+                TransferDB.id_course,
+                func.max(col(TransferDB.effective_end).is_(None)),
+            ).where(
+                TransferDB.credit != "No credit",
+                TransferDB.credit != "No Credit"
+            ).group_by(TransferDB.destination, TransferDB.id_course)
+            
+            session.exec(insert(CourseTransferDestinationDB).from_select(["destination", "id_course", "active"], statement))
+            session.commit()
+            
+            count = session.exec(select(func.count()).select_from(CourseTransferDestinationDB)).one()
+        logger.info(f"Generated {count} course transfer destinations.")
+    
+    # full text indexes used by the search routes
+    # must run after _generateCourseIndexes
+    def _generateSearchIndexes(self) -> None:
+        with Session(self.engine) as session:
+            count = buildCourseSearchIndex(session)
+        logger.info(f"Course search index built with {count} courses.")
+    
+    # weekly occupancy bitmask of every section, used for time filters
+    def _generateSectionTimes(self, semesters: set[tuple[int, int]] | None = None) -> None:
+        with Session(self.engine) as session:
+            statement = select(ScheduleEntryDB.section_key, ScheduleEntryDB.days, ScheduleEntryDB.time, ScheduleEntryDB.type)
+            delete_statement = delete(SectionTimesDB)
+            if semesters is not None:
+                # the keys of a semester are one range, see sectionKey()
+                in_semesters = lambda key: or_(*[key.between(sectionKey(year, term, 0), sectionKey(year, term, 99999)) for year, term in semesters])
+                statement = statement.where(in_semesters(col(ScheduleEntryDB.section_key)))
+                delete_statement = delete_statement.where(in_semesters(col(SectionTimesDB.section_key)))
+            schedules = session.exec(statement).all()
             
-        # for c in courses:
-        #     out.append(self.buildCourse(c[0], c[1], return_offerings=True))
+            masks: dict[int, int] = {}
+            for section_key, days, time, type in schedules:
+                mask = masks.get(section_key, 0)
+                # exams are one off, they aren't part of the weekly schedule
+                if type != "Exam":
+                    mask |= scheduleMask(days, time)
+                masks[section_key] = mask
+            
+            session.exec(delete_statement)
+            session.add_all(SectionTimesDB(section_key=key, mask=maskToBytes(mask)) for key, mask in masks.items())
+            session.commit()
+        
+        logger.info(f"Generated weekly schedules for {len(masks)} sections.")
+    
+    # prebuilt /v1/courses/{subject}/{course_code} responses so the api only needs a primary key lookup
+    # must run after _generateCourseIndexes
+    def _generateCourseDocuments(self, only: set[tuple[str, str]] | None = None) -> None:
+        count = 0
+        size = 0
         
-        # with open(PREBUILTS_DIRECTORY + "allInfo.json", "w+") as fi:
-        #     fi.write(json.dumps(out, default=pydantic_encoder))   
+        with Session(self.engine) as session:
+            if only is None:
+                session.exec(delete(CourseDocumentDB))
+                subjects = session.exec(select(CourseDB.subject).distinct()).all()
+            else:
+                session.exec(delete(CourseDocumentDB).where(col(CourseDocumentDB.id).in_([f"CRSE-{subject}-{course_code}" for subject, course_code in only])))
+                subjects = sorted({subject for subject, _ in only})
+            
+            # one subject at a time so we never hold every section in memory
+            for subject in subjects:
+                statement = select(CourseDB).where(CourseDB.subject == subject).options(
+                    selectinload(CourseDB.sections).selectinload(SectionDB.schedule)
+                )
+                if only is not None:
+                    statement = statement.where(col(CourseDB.course_code).in_([course_code for s, course_code in only if s == subject]))
+                courses = session.exec(statement).all()
+                
+                for c in courses:
+                    course = CourseAPI(subject=c.subject, course_code=c.course_code, id=c.id, attributes=c.attributes, sections=c.sections, transfers=c.transfers, outlines=c.outlines)
+                    body = orjson.dumps(course.model_dump(mode="json"))
+                    
+                    # mtime=0 so an unchanged course gives the exact same bytes
+                    data = gzip.compress(body, compresslevel=9, mtime=0)
+                    session.add(CourseDocumentDB(id=c.id, etag=hashlib.sha1(body).hexdigest(), data=data))
+                    
+                    count += 1
+                    size += len(data)
+                
+                session.commit()
+                # drop the loaded sections before the next subject
+                session.expunge_all()
         
+        logger.info(f"Generated {count} course documents ({size // 1024} KiB compressed).")
+    
+    # static copies of the index routes, every semester's sections and every course
+    # see sdk/api/Prebuilts.py, must run after _generateCourseDocuments
+    def _generatePreBuilds(self, semesters: set[tuple[int, int]] | None = None, courses: set[tuple[str, str]] | None = None) -> None:
+        writer = PrebuiltWriter(PREBUILTS_DIRECTORY + "static/")
         
+        with Session(self.engine) as session:
+            statement = select(Semester).order_by(col(Semester.year).desc(), col(Semester.term).desc())
+            semesters_all = session.exec(statement).all()
+            writer.add("/v1/index/semesters", IndexSemesterList(count=len(semesters_all), semesters=semesters_all))
+            
+            subjects = session.exec(select(SectionDB.subject).distinct().order_by(SectionDB.subject)).all()
+            writer.add("/v1/index/subjects", IndexSubjectList(count=len(subjects), subjects=subjects))
+            
+            subjects = session.exec(select(CourseMaxDB.subject).distinct().order_by(CourseMaxDB.subject)).all()
+            writer.add("/v1/index/subjects?all=true", IndexSubjectList(count=len(subjects), subjects=subjects))
+            
+            statement = select(
+                CourseMaxDB.subject, 
+                CourseMaxDB.course_code,
+                func.coalesce(CourseMaxDB.title, CourseMaxDB.abbreviated_title).label('title'),
+                CourseMaxDB.on_langara_website
+            ).order_by(CourseMaxDB.subject.asc(), CourseMaxDB.course_code.asc())
+            index_courses = [IndexCourse(subject=r.subject, course_code=r.course_code, title=r.title, on_langara_website=r.on_langara_website) for r in session.exec(statement).all()]
+            writer.add("/v1/index/courses", IndexCourseList(
+                subject_count=len({c.subject for c in index_courses}),
+                course_count=len(index_courses),
+                courses=index_courses
+            ))
+            
+            statement = select(TransferDB.destination, TransferDB.destination_name).distinct().order_by(TransferDB.destination_name)
+            destinations: dict[str, str] = {}
+            for code, name in session.exec(statement).all():
+                destinations.setdefault(code, name)
+            writer.add("/v1/index/transfer_destinations", IndexTransferList(transfers=[IndexTransfer(code=code, name=name) for code, name in destinations.items()]))
+            
+            for s in semesters_all:
+                route = f"/v1/semester/{s.year}/{s.term}/sections"
+                # unchanged semesters keep the file they already have
+                if semesters is not None and (s.year, s.term) not in semesters and writer.keep(route):
+                    continue
+                sections = session.exec(select(SectionDB).where(SectionDB.year == s.year, SectionDB.term == s.term)).all()
+                writer.add(route, SectionAPIList(sections=sections))
+                session.expunge_all()
+            
+            # already rendered by _generateCourseDocuments
+            statement = select(CourseDocumentDB.id, CourseDocumentDB.data)
+            if courses is not None:
+                # unchanged courses keep the file they already have
+                render = []
+                for id in session.exec(select(CourseDocumentDB.id)).all():
+                    _, subject, course_code = id.split("-", 2)
+                    if (subject, course_code) in courses or not writer.keep(f"/v1/courses/{subject}/{course_code}"):
+                        render.append(id)
+                statement = statement.where(col(CourseDocumentDB.id).in_(render))
+            
+            for id, data in session.exec(statement).all():
+                _, subject, course_code = id.split("-", 2)
+                writer.add(f"/v1/courses/{subject}/{course_code}", gzip.decompress(data))
         
+        manifest = writer.finish()
+        logger.info(f"Prebuilt {len(manifest['files'])} responses ({writer.written} changed, {manifest['removed']} old files removed).")
         
     # def buildCourse(self, subject, course_code, return_offerings=True) -> CourseAPIBuild | None:
                 
@@ -1,12 +1,20 @@
+from collections import Counter
 from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import asyncio
+import base64
+import gzip
+import hashlib
 import os
+import sqlite3
 import sys
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Annotated, Any, Optional
 
 from fastapi.encoders import jsonable_encoder
 import orjson
+import httpx
 
 from sqlalchemy import distinct
 import fastapi_cache
@@ -27,18 +35,28 @@ logger.addHandler(screen_handler)
 from fastapi import FastAPI, HTTPException, Query, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
 
-from sqlmodel import SQLModel, Session, col, create_engine, select
+from sqlmodel import Field, SQLModel, Session, col, create_engine, select
 from sqlalchemy.orm import selectinload
-from sqlalchemy import Engine, Integer, and_, cast, exists, func, or_, text
+from sqlalchemy import Engine, event, exists, false, func, or_, tuple_
+from sqlalchemy.pool import QueuePool
+
+from anyio import to_thread
+from fastapi.concurrency import run_in_threadpool
 
 # caching stuff
 from contextlib import asynccontextmanager
 from typing import AsyncIterator, Dict, Optional
 from fastapi_cache import Coder, FastAPICache, KeyBuilder
 from fastapi_cache.backends.inmemory import InMemoryBackend
-from fastapi_cache.decorator import cache
+from sdk.api.SingleFlightBackend import SingleFlightBackend, cache
+from sdk.api.ReferenceCatalog import ReferenceCatalog
+from sdk.api.Prebuilts import PREBUILT_FILE_PATTERN, PREBUILT_MANIFEST
+from sdk.api.Changesets import ChangesetLog, compressedSize, readChangesets
+from sdk.api import ColumnarExport
+from sdk.api.QueryShapes import QUERY_SHAPES_ENV, QueryShapeRecorder
+from sdk.api.ConditionalRequests import ConditionalRequestMiddleware, isNotModified
 
 # DATABASE STUFF
 from sdk.schema.sources.CourseAttribute import CourseAttributeDB
@@ -46,7 +64,7 @@ from sdk.schema.sources.CourseOutline import CourseOutlineDB
 from sdk.schema.sources.CoursePage import CoursePageDB
 from sdk.schema.sources.CourseSummary import CourseSummaryDB
 from sdk.schema.sources.ScheduleEntry import ScheduleEntryDB
-from sdk.schema.sources.Section import SectionAPIList, SectionDB, SectionAPI
+from sdk.schema.sources.Section import SectionAPIList, SectionDB, SectionAPI, SectionStatus
 from sdk.schema.sources.Transfer import TransferAPI, TransferAPIList, TransferDB
 
 from sdk.schema.aggregated.Course import CourseAPI, CourseAPILight, CourseAPILightList, CourseDB
@@ -55,6 +73,13 @@ from sdk.schema.aggregated.Semester import Semester
 # RESPONSE STUFF
 from sdk.schema.aggregated.ApiResponses import ExportCourseList, ExportSectionList, IndexCourse, IndexCourseList, IndexSemesterList, IndexSubjectList, IndexTransfer, IndexTransferList, MetadataFormatted, PaginationPage, SearchCourse, SearchCourseList, SearchSectionList
 from sdk.schema.aggregated.CourseMax import CourseMaxAPI, CourseMaxAPIOnlyTransfers, CourseMaxDB
+from sdk.search.CourseSearchIndex import COURSE_SEARCH_TABLE, courseSearchSubquery, ftsQuery
+from sdk.search.SectionSearchIndex import SectionSearchIndex
+from sdk.search.TimetableBuilder import TimetableSearch
+from sdk.parsers.ScheduleTimes import SLOTS_PER_DAY, maskFromBytes, maskToBytes, maskWithin, parseClockTime, parseDays, windowMask
+from sdk.schema.aggregated.SectionTimes import SectionTimesDB
+from sdk.schema.aggregated.CourseTransferDestination import CourseTransferDestinationDB
+from sdk.schema.aggregated.CourseDocument import CourseDocumentDB
 
 # scalar
 from scalar_fastapi import get_scalar_api_reference
@@ -66,6 +91,9 @@ import threading
 
 DB_LOCATION="database/database.db"
 ARCHIVES_DIRECTORY="database/archives/"
+PREBUILTS_DIRECTORY="database/prebuilts/"
+SNAPSHOTS_DIRECTORY="database/snapshots/"
+CHANGESETS_DIRECTORY="database/prebuilts/changes/"
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -77,76 +105,323 @@ DB_TYPE = "sqlite"
 
 CACHE_DB_TO_MEMORY = True
 
+# open the read-only snapshot published by the backend instead of copying the
+# database into every worker's memory. use this when running multiple workers.
+USE_SHARED_SNAPSHOT = os.getenv("USE_SHARED_SNAPSHOT", "false").lower() == "true"
+
+# how long (seconds) an expired/cleared cache entry can still be served
+# while a single request recomputes it. 0 disables stale serving.
+CACHE_STALE_TTL = 600
+
 sql_address = f'{DB_TYPE}:///{DB_LOCATION}'
 connect_args = {"check_same_thread": False}
+
+# the backend writes to the same file, in WAL mode reading it never waits on the writer
+# but a read can still hit a lock while the WAL is recovered or reset, so wait and retry
+DB_BUSY_TIMEOUT = 30 # seconds
+SNAPSHOT_RETRIES = 3
 engine: Engine = None
 engine_initialized = False
 
-def fetchDB():
-    global engine
-    global engine_initialized
+# route handlers run on a thread pool of this size, each with its own connection
+DB_THREADS = 16
+
+# record the queries that are run for benchmarks/index_advisor.py
+query_recorder = QueryShapeRecorder(os.getenv(QUERY_SHAPES_ENV)) if os.getenv(QUERY_SHAPES_ENV) else None
+
+snapshot_generation = 0
+snapshot_anchor: sqlite3.Connection = None
+snapshot_path: str = None
+# database_source_version() of the database that was copied, when not serving a snapshot
+source_version: tuple = None
+
+# answer /v2/search/sections from an in-memory bitset index instead of sql
+SECTION_SEARCH_INDEX = True
+section_index: SectionSearchIndex = None
+
+# destinations, semesters and subjects of the current database, used to validate requests
+catalog: ReferenceCatalog = None
+
+# limits for /v1/timetable, per request
+TIMETABLE_MAX_COURSES = 10
+TIMETABLE_MAX_RESULTS = 1000
+TIMETABLE_TIME_BUDGET = 2.0 # seconds
+
+# rows fetched from the database at a time by the ndjson export
+EXPORT_BATCH_SIZE = 500
+# bytes collected before a chunk of the ndjson export is sent
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def set_connection_pragmas(new_engine: Engine, pragmas: tuple[str, ...]) -> None:
+    # pragmas are per connection so they need to run on every pooled connection
+    @event.listens_for(new_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+def register_sql_functions(new_engine: Engine) -> None:
+    # python functions available to queries, also per connection
+    @event.listens_for(new_engine, "connect")
+    def create_functions(dbapi_connection, connection_record):
+        dbapi_connection.create_function("mask_within", 2, maskWithin, deterministic=True)
+
+def current_snapshot_path() -> str | None:
+    # the backend writes the file name of the newest published snapshot here
+    pointer = os.path.join(SNAPSHOTS_DIRECTORY, "CURRENT")
+    if not os.path.exists(pointer):
+        return None
+    
+    with open(pointer) as fi:
+        name = fi.read().strip()
+    
+    path = os.path.join(SNAPSHOTS_DIRECTORY, name)
+    if not name or not os.path.exists(path):
+        return None
+    return path
+
+def database_source_version() -> tuple:
+    # commits go to the WAL and checkpoints to the database file, so one of them changes whenever the data does
+    version = []
+    for path in (DB_LOCATION, DB_LOCATION + "-wal"):
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+# numbers every database that is built, cache keys start with it
+database_generation = 0
+# database_generation of the database being served
+served_generation = 0
+
+class ServedDatabase:
+    """One version of the database and everything built from it, swapped in together."""
+    
+    def __init__(
+        self,
+        engine: Engine,
+        generation: int,
+        catalog: ReferenceCatalog,
+        section_index: SectionSearchIndex | None,
+        anchor: sqlite3.Connection | None = None,
+        snapshot_path: str | None = None,
+        source_version: tuple | None = None,
+    ) -> None:
+        self.engine = engine
+        self.generation = generation
+        self.catalog = catalog
+        self.section_index = section_index
+        self.anchor = anchor
+        self.snapshot_path = snapshot_path
+        self.source_version = source_version
+
+# set while the cache is warmed for a database that isn't served yet,
+# the warm-up requests read that one instead of the one being served
+warming_database: ContextVar[ServedDatabase | None] = ContextVar("warming_database", default=None)
+
+def current_engine() -> Engine:
+    warming = warming_database.get()
+    return warming.engine if warming is not None else engine
+
+def current_generation() -> int:
+    warming = warming_database.get()
+    return warming.generation if warming is not None else served_generation
+
+def current_catalog() -> ReferenceCatalog:
+    warming = warming_database.get()
+    return warming.catalog if warming is not None else catalog
+
+def current_section_index() -> SectionSearchIndex | None:
+    warming = warming_database.get()
+    return warming.section_index if warming is not None else section_index
+
+def buildDB() -> ServedDatabase | None:
+    """
+    Open the current database and build the catalog and search index for it,
+    without serving it yet.
+    Returns None if it didn't change since the one being served.
+    """
+    global database_generation
+    global snapshot_generation
     
-    # prevent memory leak of old in-memory database
-    if engine_initialized:
-        engine.dispose()
-        
-    if CACHE_DB_TO_MEMORY:
-        # file system database
-        engine_source = create_engine(sql_address, connect_args=connect_args)
-
-        # in memory database
-        engine_memory = create_engine('sqlite://', connect_args=connect_args)
-
-        raw_connection_memory = engine_memory.raw_connection()
-        raw_connection_source = engine_source.raw_connection()
-
-        raw_connection_source.backup(raw_connection_memory.connection)
-        raw_connection_source.close()
-        
-        engine = engine_memory
+    published_snapshot = current_snapshot_path() if USE_SHARED_SNAPSHOT else None
+    anchor = None
+    version = None
+    
+    if published_snapshot is not None:
+        # nothing new was published since the last refresh
+        if engine_initialized and published_snapshot == snapshot_path:
+            return None
         
-        journal_options = (
-            "PRAGMA synchronous = OFF;",
-            "pragma cache_size = 100000",
+        # published snapshots are never written to again, so sqlite can skip all
+        # locking and change detection, and every worker mmaps the same file
+        # which means they all share one copy in the OS page cache
+        engine_snapshot = create_engine(
+            f"sqlite:///file:{published_snapshot}?mode=ro&immutable=1&uri=true",
+            connect_args=connect_args,
+            poolclass=QueuePool,
+            pool_size=DB_THREADS,
+            max_overflow=4,
         )
+        set_connection_pragmas(engine_snapshot, (
+            "pragma mmap_size = 30000000000",
+            "pragma cache_size = -16000",
+            "pragma query_only = 1",
+        ))
+        register_sql_functions(engine_snapshot)
         
-    else:
-        engine = create_engine(sql_address, connect_args=connect_args)
-        
-        journal_options = (
-            # "pragma synchronous = normal;",
-            # "pragma journal_size_limit = 6144000;",
-            # "pragma mmap_size = 30000000000;",
-            # "pragma page_size = 32768;",
-            # "pragma cache_size = 100000",
-            "pragma vacuum;",
-            "pragma optimize"
-            # "pragma temp_store = memory;",
-        )
+        new_engine = engine_snapshot
+        logger.info(f"Serving shared snapshot {published_snapshot}.")
     
-    # SQLModel.metadata.create_all(engine)
+    else:
+        # read before the copy, a commit during it is picked up by the next refresh
+        version = database_source_version()
+        if engine_initialized and snapshot_path is None and version == source_version:
+            return None
         
-    with Session(engine) as session:
-        for pragma in journal_options:
-            session.exec(text(pragma))
+        if USE_SHARED_SNAPSHOT:
+            logger.warning("USE_SHARED_SNAPSHOT is set but no snapshot has been published yet, falling back.")
+    
+        if CACHE_DB_TO_MEMORY:
+            # file system database
+            engine_source = create_engine(sql_address, connect_args={**connect_args, "timeout": DB_BUSY_TIMEOUT})
+
+            # in memory database
+            # sqlite:// gives every thread its own (empty) database, so we use a named
+            # memdb instead which every pooled connection can open
+            for attempt in range(1, SNAPSHOT_RETRIES + 1):
+                snapshot_generation += 1
+                memory_uri = f"file:/langara-snapshot-{os.getpid()}-{snapshot_generation}?vfs=memdb"
+                
+                # the memdb is freed once its last connection closes, this one keeps it alive
+                anchor = sqlite3.connect(memory_uri, uri=True, check_same_thread=False)
+                
+                # VACUUM INTO is one read transaction, so it copies a consistent version of the
+                # database even while the backend is committing. backup() would also copy the
+                # WAL flag in the header, which a memdb can't open
+                raw_connection_source = engine_source.raw_connection()
+                try:
+                    raw_connection_source.execute("VACUUM INTO ?", (memory_uri,))
+                    break
+                except sqlite3.OperationalError as e:
+                    anchor.close()
+                    if attempt == SNAPSHOT_RETRIES:
+                        raise
+                    logger.warning(f"Copying the database failed ({e}), retrying ({attempt}/{SNAPSHOT_RETRIES}).")
+                    time.sleep(attempt)
+                finally:
+                    raw_connection_source.close()
+            engine_source.dispose()
+
+            engine_memory = create_engine(
+                f"sqlite:///{memory_uri}&uri=true",
+                connect_args=connect_args,
+                poolclass=QueuePool,
+                pool_size=DB_THREADS,
+                max_overflow=4,
+            )
+            set_connection_pragmas(engine_memory, (
+                "PRAGMA synchronous = OFF;",
+                "pragma cache_size = 100000",
+                "pragma query_only = 1",
+            ))
+            register_sql_functions(engine_memory)
+            
+            new_engine = engine_memory
+            
+        else:
+            # the backend writes to this file, only ever read it
+            new_engine = create_engine(sql_address, connect_args={**connect_args, "timeout": DB_BUSY_TIMEOUT})
+            set_connection_pragmas(new_engine, (
+                "pragma query_only = 1",
+            ))
+            register_sql_functions(new_engine)
+    
+    if query_recorder is not None:
+        query_recorder.attach(new_engine)
+    
+    # the search index and catalog are built with the engine so they always match the database being served
+    with Session(new_engine) as session:
+        new_catalog = ReferenceCatalog.build(session)
+    
+    new_section_index = None
+    if SECTION_SEARCH_INDEX:
+        start = time.perf_counter()
+        with Session(new_engine) as session:
+            new_section_index = SectionSearchIndex.build(session)
+        logger.info(f"Section search index built with {new_section_index.size} sections in {(time.perf_counter()-start)*1000:.0f} ms.")
+    
+    database_generation += 1
+    return ServedDatabase(new_engine, database_generation, new_catalog, new_section_index, anchor, published_snapshot, version)
+
+def publishDB(new: ServedDatabase) -> Engine:
+    """Start serving a database from buildDB()."""
+    global engine
+    global engine_initialized
+    global served_generation
+    global snapshot_anchor
+    global snapshot_path
+    global source_version
+    global section_index
+    global catalog
+    
+    old_engine = engine
+    old_anchor = snapshot_anchor
+    
+    engine = new.engine
+    served_generation = new.generation
+    section_index = new.section_index
+    catalog = new.catalog
+    snapshot_anchor = new.anchor
+    snapshot_path = new.snapshot_path
+    source_version = new.source_version
+    
+    # dispose of the old database only after the swap, requests still running
+    # on it keep their connection until they finish
+    if engine_initialized:
+        old_engine.dispose()
+        if old_anchor is not None:
+            old_anchor.close()
     
     engine_initialized = True
     return engine
 
+def fetchDB():
+    new = buildDB()
+    if new is None:
+        return engine
+    return publishDB(new)
+
 engine = fetchDB()
 
 def get_session():
-    with Session(engine) as session:
+    with Session(current_engine()) as session:
         yield session
 
 
 # === We must refresh the in memory db or it will get out of sync ===
+# set in lifespan so the scheduler thread can hand the refresh to the event loop
+main_loop: asyncio.AbstractEventLoop = None
+
 def refresh_db():
-    with get_session() as session:
+    if main_loop is None:
         fetchDB()
+        return
+    
+    future = asyncio.run_coroutine_threadsafe(refresh_snapshot(), main_loop)
+    future.result()
 
 def run_scheduler():
-    schedule.every(30).minutes.do(refresh_db)
+    if USE_SHARED_SNAPSHOT:
+        # only reopens the database when the backend published a new snapshot
+        schedule.every(1).minutes.do(refresh_db)
+    else:
+        schedule.every(30).minutes.do(refresh_db)
+    if query_recorder is not None:
+        schedule.every(5).minutes.do(query_recorder.save)
     while True:
         schedule.run_pending()
         time.sleep(1)
@@ -171,8 +446,13 @@ def better_key_builder(
     # Remove session from kwargs since it changes each request
     cleaned_kwargs = {k: v for k, v in kwargs.get("kwargs", {}).items() if k != "session"}
     
+    if request:
+        record_search_request(request)
+    
     # Build cache key components
     components = [
+        # entries of a database that is being warmed don't mix with the one being served
+        str(current_generation()),
         namespace,
         request.method.lower() if request else "",
         request.url.path if request else "",
@@ -190,6 +470,105 @@ def better_key_builder(
 
 # === STARTUP STUFF ===
 
+# how many of the most requested search urls get precomputed after a snapshot swap
+WARMUP_SEARCH_KEYS = 50
+
+WARMUP_HEADER = "x-cache-warmup"
+
+# url -> number of requests since the last warm-up
+recent_search_requests: Counter[str] = Counter()
+
+warmup_stats: dict = {}
+
+def record_search_request(request: Request) -> None:
+    if request.headers.get(WARMUP_HEADER):
+        return
+    if not request.url.path.startswith(("/v1/search/", "/v2/search/")):
+        return
+    
+    url = request.url.path
+    if request.url.query:
+        url += "?" + request.url.query
+    recent_search_requests[url] += 1
+
+def get_warmup_urls() -> list[str]:
+    # index routes are tiny but hit by every client
+    urls = [
+        "/v1/index/latest_semester",
+        "/v1/index/semesters",
+        "/v1/index/subjects",
+        "/v1/index/subjects?all=true",
+        "/v1/index/courses",
+        "/v1/index/transfer_destinations",
+    ]
+    
+    latest = current_catalog().latest_semester
+    if latest is not None:
+        year, term = latest
+        urls.append(f"/v1/semester/{year}/{term}/sections")
+    
+    for url, _ in recent_search_requests.most_common(WARMUP_SEARCH_KEYS):
+        urls.append(url)
+    
+    return urls
+
+async def warm_cache() -> dict:
+    """
+    Precompute the hot routes into the cache.
+    
+    Requests are replayed against the app in-process with Cache-Control: no-cache,
+    which makes fastapi-cache recompute the route and overwrite whatever is cached.
+    """
+    start = time.perf_counter()
+    urls = get_warmup_urls()
+    failed = 0
+    
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Cache-Control": "no-cache", WARMUP_HEADER: "1"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://warmup", headers=headers) as client:
+        for url in urls:
+            response = await client.get(url)
+            if response.status_code != 200:
+                failed += 1
+                logger.warning(f"Cache warm-up of {url} returned {response.status_code}.")
+    
+    # decay the counts so old traffic patterns fall out over time
+    for url in list(recent_search_requests):
+        recent_search_requests[url] //= 2
+        if recent_search_requests[url] == 0:
+            del recent_search_requests[url]
+    
+    duration = time.perf_counter() - start
+    
+    warmup_stats.update({
+        "last_warmup": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(duration * 1000, 1),
+        "urls": len(urls),
+        "failed": failed,
+    })
+    logger.info(f"Cache warmed with {len(urls)} routes in {duration*1000:.0f} ms.")
+    return warmup_stats
+
+async def refresh_snapshot() -> None:
+    """Warm the cache for the current database, then swap it in."""
+    # copying the database takes a while, don't stall the event loop for it
+    new = await run_in_threadpool(buildDB)
+    if new is None:
+        return
+    
+    # requests keep reading the old database and its cache entries until the new one is warm
+    token = warming_database.set(new)
+    try:
+        await warm_cache()
+    finally:
+        warming_database.reset(token)
+    
+    old_generation = served_generation
+    publishDB(new)
+    
+    # cache keys start with the database generation, nothing reads the old ones anymore
+    await FastAPICache.get_backend().drop(f"{old_generation}:")
+
 
 
 # === FASTAPI STARTUP STUFF ===
@@ -202,12 +581,24 @@ async def lifespan(_: FastAPI) -> AsyncIterator[None]:
         logger.error("Database not found. Exiting.")
         sys.exit(-1)
     
-    FastAPICache.init(InMemoryBackend(), key_builder=better_key_builder,  expire=3600)  
+    FastAPICache.init(SingleFlightBackend(stale_ttl=CACHE_STALE_TTL), key_builder=better_key_builder,  expire=3600)  
     logger.info("Cache initialized.")     
     
+    global main_loop
+    main_loop = asyncio.get_running_loop()
+    
+    # sync route handlers (all the database routes) run in this thread pool
+    to_thread.current_default_thread_limiter().total_tokens = DB_THREADS
+    
+    # don't take traffic until the hot routes are cached
+    await warm_cache()
+    
      
     
     yield
+    
+    if query_recorder is not None:
+        query_recorder.save()
 
 description = "Gets course data from the Langara website. Data refreshes every hour. All data belongs to Langara College or BC Transfer Guide and is summarized here in order to help students. Pull requests welcome!"
 
@@ -230,6 +621,15 @@ app = FastAPI(
 # gzip responses above 500 bytes
 app.add_middleware(GZipMiddleware, minimum_size=500) 
 
+# answer If-None-Match / If-Modified-Since from the database version before any work is done
+app.add_middleware(
+    ConditionalRequestMiddleware,
+    validators=lambda: (current_catalog().version, current_catalog().last_updated) if current_catalog() is not None else None,
+    paths=("/v1/", "/v2/"),
+    # files with their own validators, admin routes and timetables (which can stop early on time)
+    exclude=("/v1/export/database.db", "/v1/export/changes", "/v1/prebuilts", "/v1/admin", "/v1/timetable"),
+)
+
 origins = [
     "*",
 ]
@@ -240,7 +640,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["x-fastapi-cache"]
+    expose_headers=["x-fastapi-cache", "etag", "last-modified", "x-generation"]
 )
 
 FAVICON_PATH = "favicon.ico"
@@ -249,20 +649,18 @@ FAVICON_PATH = "favicon.ico"
 async def favicon():
     return FileResponse(FAVICON_PATH)
 
-def check_year_term_valid_raise_if_not(year: int, term: int, session: Session):
+def check_year_term_valid_raise_if_not(year: int, term: int):
     # Check if term is valid
     if term not in [10, 20, 30]:
         raise HTTPException(status_code=404, detail="Term must be 10 (Spring), 20 (Summer), or 30 (Fall)")
     
-    # Get most recent term from DB
-    statement = select(Semester).order_by(col(Semester.year).desc(), col(Semester.term).desc()).limit(1)
-    results = session.exec(statement)
-    latest = results.first()
+    # Get most recent term from the catalog
+    latest = current_catalog().latest_semester
     
     if latest is None:
         raise HTTPException(status_code=404, detail="No semesters found in database")
         
-    latest_yearterm = latest.year * 100 + latest.term
+    latest_yearterm = latest[0] * 100 + latest[1]
     check_yearterm = year * 100 + term
     
     # Check year/term bounds
@@ -272,14 +670,87 @@ def check_year_term_valid_raise_if_not(year: int, term: int, session: Session):
         raise HTTPException(status_code=404, detail=f"Semester must be before the current latest semester: {latest_yearterm}")
 
     # Check if term exists in DB
-    statement = select(Semester).where(Semester.year == year, Semester.term == term)
-    results = session.exec(statement)
-    if results.first() is None:
+    if not current_catalog().has_semester(year, term):
         raise HTTPException(status_code=404, detail=f"Term {term} {year} not found in database")
         
     return True
 
 
+def get_sections_by_id(session: Session, ids: list[str]) -> list[SectionDB]:
+    # returns the sections (with their schedules) in the same order as ids
+    if not ids:
+        return []
+    
+    statement = select(SectionDB).where(col(SectionDB.id).in_(ids)).options(selectinload(SectionDB.schedule))
+    sections = {s.id: s for s in session.exec(statement).all()}
+    
+    return [sections[id] for id in ids if id in sections]
+
+
+# keyset pagination for /v2/search/sections
+# a cursor holds the sort key of the last section returned, so the next page starts
+# right after it no matter how deep it is. It also carries the total and page number
+# so they aren't recounted on every page, and a hash of the filters it was made for.
+def section_cursor_query_hash(params: dict) -> str:
+    return hashlib.sha1(orjson.dumps(params, option=orjson.OPT_SORT_KEYS)).hexdigest()[:12]
+
+def encode_section_cursor(key: tuple, total: int, page: int, query_hash: str) -> str:
+    data = orjson.dumps({"k": list(key), "n": total, "p": page, "q": query_hash})
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+def decode_section_cursor(cursor: str, query_hash: str) -> tuple[tuple, int, int]:
+    try:
+        data = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        key, total, page = tuple(data["k"]), int(data["n"]), int(data["p"])
+        assert len(key) == 5 and page >= 1
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    
+    if data.get("q") != query_hash:
+        raise HTTPException(status_code=400, detail="Cursor does not belong to this search. Repeat the search without a cursor.")
+    
+    return key, total, page
+
+
+def transfers_to_filter(destination: str):
+    # courses that transfer to destination, an index lookup instead of scanning the csv column
+    return col(CourseMaxDB.id_course).in_(
+        select(CourseTransferDestinationDB.id_course).where(CourseTransferDestinationDB.destination == destination)
+    )
+
+def course_document_response(request: Request, document: CourseDocumentDB) -> Response:
+    etag = f'"{document.etag}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "max-age=3600",
+        "Vary": "Accept-Encoding",
+    }
+    
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    
+    # documents are stored compressed, only clients that can't take gzip make us decompress
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(document.data, media_type="application/json", headers=headers)
+    
+    return Response(gzip.decompress(document.data), media_type="application/json", headers=headers)
+
+def parse_time_window(days: Optional[str], start_after: Optional[str], end_before: Optional[str]) -> int | None:
+    # weekly mask of the allowed times, None if no time constraint was given
+    if days is None and start_after is None and end_before is None:
+        return None
+    
+    try:
+        return windowMask(
+            parseDays(days) if days is not None else list(range(7)),
+            parseClockTime(start_after) if start_after is not None else 0,
+            parseClockTime(end_before, round_up=True) if end_before is not None else SLOTS_PER_DAY,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # ==== ROUTES ====
 
 @app.get("/", include_in_schema=False)
@@ -298,7 +769,7 @@ async def scalar_html():
     response_model=Semester
 )
 @cache()
-async def index_latest_semester(
+def index_latest_semester(
     *,
     session: Session = Depends(get_session),
 ) -> Semester:
@@ -339,7 +810,7 @@ async def index_latest_semester(
     response_model=IndexSemesterList
 )
 @cache()
-async def index_semesters(
+def index_semesters(
     *,
     session: Session = Depends(get_session),
 ) -> IndexSemesterList:
@@ -364,37 +835,22 @@ async def index_semesters(
     response_model=IndexSubjectList
 )
 @cache()
-async def index_semesters(
+def index_semesters(
     *,
-    session: Session = Depends(get_session),
     all: Optional[bool] = False
 ) -> IndexSubjectList:
     
     if not all:
-    
-        statement = select(SectionDB.subject
-            ).order_by( SectionDB.subject.asc()
-            ).distinct()
-        results = session.exec(statement)
-        result = results.all()
-        
-        return IndexSubjectList(
-            count = len(result),
-            subjects = result
-        )
+        result = current_catalog().subjects
         
     else:
         # this will include subjects with no courses
-        statement = select(CourseMaxDB.subject
-            ).order_by( CourseMaxDB.subject.asc()
-            ).distinct()
-        results = session.exec(statement)
-        result = results.all()
-        
-        return IndexSubjectList(
-            count = len(result),
-            subjects = result
-        )
+        result = current_catalog().all_subjects
+    
+    return IndexSubjectList(
+        count = len(result),
+        subjects = result
+    )
 
 
 @app.get(
@@ -405,7 +861,7 @@ async def index_semesters(
     response_model=IndexCourseList,
 )
 @cache()
-async def index_courses(
+def index_courses(
     *,
     session: Session = Depends(get_session),
     # show_inactive: Optional[bool] = False # this is breaking change
@@ -450,18 +906,11 @@ async def index_courses(
     response_model=IndexTransferList,
 )
 @cache()
-async def index_transfer_destinations(
-    *,
-    session: Session = Depends(get_session),
-) -> IndexTransferList:
-    statement = select(TransferDB.destination, TransferDB.destination_name).distinct().order_by(TransferDB.destination_name)
-    results = session.exec(statement)
-    destinations = results.all()
-    
+def index_transfer_destinations() -> IndexTransferList:
     out: list[IndexTransfer] = []
     
-    for dest in destinations:
-        out.append(IndexTransfer(code=dest[0], name=dest[1]))
+    for code, name in current_catalog().destinations.items():
+        out.append(IndexTransfer(code=code, name=name))
     
     return IndexTransferList(transfers=out)
 
@@ -478,7 +927,7 @@ async def index_transfer_destinations(
     deprecated=True,
 )
 @cache()
-async def semester(
+def semester(
     *,
     session: Session = Depends(get_session),
     year: int, 
@@ -515,13 +964,13 @@ async def semester(
     
 )
 @cache()
-async def semester(
+def semester(
     *,
     session: Session = Depends(get_session),
     year: int, 
     term: int
 ) -> SectionAPIList:
-    check_year_term_valid_raise_if_not(year, term, session)
+    check_year_term_valid_raise_if_not(year, term)
     
     
     statement = select(SectionDB).where(
@@ -542,15 +991,22 @@ async def semester(
     description="Get all available information for a given course.",
     response_model=CourseAPI,
 )
-@cache()
-async def semesterCoursesInfo(
+def semesterCoursesInfo(
     *,
     session: Session = Depends(get_session),
+    request: Request,
     subject: str, 
     course_code: str
 ) -> CourseAPI:
     subject = subject.upper()
     
+    # prebuilt during aggregation, this is one primary key lookup and the bytes go out as they are
+    if current_catalog().has_table(CourseDocumentDB.__tablename__):
+        document = session.get(CourseDocumentDB, f"CRSE-{subject}-{course_code}")
+        if document is None:
+            raise HTTPException(status_code=404, detail="Course not found.")
+        return course_document_response(request, document)
+    
     statement = select(CourseDB).where(
         CourseDB.subject == subject,
         CourseDB.course_code == course_code
@@ -573,14 +1029,14 @@ async def semesterCoursesInfo(
     response_model=SectionAPI
 )
 @cache()
-async def semesterSectionsInfo(
+def semesterSectionsInfo(
     *,
     session: Session = Depends(get_session),
     year: int, 
     term: int, 
     crn: int
 ):
-    check_year_term_valid_raise_if_not(year, term, session)
+    check_year_term_valid_raise_if_not(year, term)
     
     statement = select(SectionDB).where(SectionDB.year == year, SectionDB.term == term, SectionDB.crn == crn)
     results = session.exec(statement)
@@ -609,7 +1065,7 @@ async def semesterSectionsInfo(
     response_model=TransferAPIList
 )
 @cache()
-async def semesterSectionsInfo(
+def semesterSectionsInfo(
     *,
     session: Session = Depends(get_session),
     institution_code: str, 
@@ -634,7 +1090,7 @@ async def semesterSectionsInfo(
     response_model=SearchCourseList
 )
 @cache()
-async def semesterSectionsInfo(
+def semesterSectionsInfo(
     *,
     session: Session = Depends(get_session),
     query: str,
@@ -678,49 +1134,55 @@ async def semesterSectionsInfo(
         filters.append(CourseMaxDB.on_langara_website == on_langara_website)
     
     # filter by the query
-    # numbers use the LIKE keyword
-    # words use instr / .contains
+    # use the full text index if this database has one
+    # otherwise numbers use the LIKE keyword and words use instr / .contains
     
-    search_terms = query.strip().split()
+    search = None
+    match = ftsQuery(query)
     
-    text_filters = []
+    if match and current_catalog().has_table(COURSE_SEARCH_TABLE):
+        search = courseSearchSubquery(match)
     
-    for search in search_terms:        
-        if search.isspace():
-            continue
+    else:
+        search_terms = query.strip().split()
         
-        elif search.isnumeric() and len(search) <= 4:
-            filters.append(CourseMaxDB.course_code.like(f"{search}%"))
+        text_filters = []
         
-        elif len(search) == 4:
-            text_filters.append(CourseMaxDB.subject.contains(search))   
-        else:
-            text_filters.append(CourseMaxDB.title.contains(search))
-            text_filters.append(CourseMaxDB.description.contains(search))
+        for search_term in search_terms:        
+            if search_term.isspace():
+                continue
             
-    if text_filters:
-        filters.append(or_(*text_filters))
+            elif search_term.isnumeric() and len(search_term) <= 4:
+                filters.append(CourseMaxDB.course_code.like(f"{search_term}%"))
+            
+            elif len(search_term) == 4:
+                text_filters.append(CourseMaxDB.subject.contains(search_term))   
+            else:
+                text_filters.append(CourseMaxDB.title.contains(search_term))
+                text_filters.append(CourseMaxDB.description.contains(search_term))
+                
+        if text_filters:
+            filters.append(or_(*text_filters))
     
     # filter by transfer destinations
     
-    statement = select(TransferDB.destination).distinct()
-    results = session.exec(statement)
-    transfers = results.all()
-    
-    
-    
     for institution in transfers_to:
         institution = institution.upper()
-        # if institution not in 
         
-        if institution not in transfers:
-            raise HTTPException(404, f"{institution} is not a valid transfer destination. Get the list from /index/transfer_destinations. Valid destinations are {transfers}")
+        if not current_catalog().is_destination(institution):
+            raise HTTPException(404, f"{institution} is not a valid transfer destination. Get the list from /index/transfer_destinations. Valid destinations are {list(current_catalog().destinations)}")
         
-        filters.append(
-            CourseMaxDB.transfer_destinations.icontains(institution)
+        filters.append(transfers_to_filter(institution))
+    
+    if search is not None:
+        statement = (
+            select(CourseMaxDB.on_langara_website, CourseMaxDB.subject, CourseMaxDB.course_code, search.c.snippet)
+            .join(search, search.c.id == CourseMaxDB.id)
+            .where(*filters)
+            .order_by(search.c.rank)
         )
-    
-    statement = select(CourseMaxDB.on_langara_website, CourseMaxDB.subject, CourseMaxDB.course_code).where(*filters)
+    else:
+        statement = select(CourseMaxDB.on_langara_website, CourseMaxDB.subject, CourseMaxDB.course_code).where(*filters)
     results = session.exec(statement)
     courses = results.all()
     
@@ -731,7 +1193,12 @@ async def semesterSectionsInfo(
     for c in courses:
         if (c.subject not in subjects):
             subjects.append(c.subject)
-        out.append(SearchCourse(subject=c.subject, course_code=c.course_code, on_langara_website=c.on_langara_website))
+        out.append(SearchCourse(
+            subject=c.subject,
+            course_code=c.course_code,
+            on_langara_website=c.on_langara_website,
+            snippet=c.snippet if search is not None else None
+        ))
     
     # print(out)
     # TODO: implement real numbers
@@ -742,11 +1209,11 @@ async def semesterSectionsInfo(
     "/v1/search/sections",
     tags=["Search Requests"],
     summary="Search Sections (index).",
-    description="Returns an index of all sections/course offerings that match the search query.",
+    description="Returns an index of all sections/course offerings that match the search query. Instructor names, titles and rooms are matched with typo tolerance, best matches first.",
     response_model=SearchSectionList
 )
 @cache()
-async def semesterSectionsInfo(
+def semesterSectionsInfo(
     *,
     session: Session = Depends(get_session),
     query: Optional[str] = None,
@@ -754,6 +1221,21 @@ async def semesterSectionsInfo(
     term: Optional[int] = None,
     online: Optional[bool] = None
 ) -> SearchSectionList:
+    # fuzzy matching and ranking only work with the search index
+    index = current_section_index()
+    if index is not None:
+        positions = index.quick_search(query, year=year, term=term)
+        
+        subjects = {index.subjects[p] for p in positions}
+        courses = {(index.subjects[p], index.course_codes[p]) for p in positions}
+        
+        return SearchSectionList(
+            subject_count=len(subjects),
+            section_count=len(positions),
+            course_count=len(courses),
+            sections=[index.ids[p] for p in positions]
+        )
+    
     filters = []
     
     if year:
@@ -831,6 +1313,7 @@ class CoursePage(SQLModel):
     # total_sections: int
     # total_pages: int
     courses: list[CourseMaxDB]    
+    snippets: dict[str, str] = Field(default={}, description="Highlighted title matches for `title_search`, keyed by course id.")
 
 @app.get(
     "/v2/search/courses",
@@ -840,7 +1323,7 @@ class CoursePage(SQLModel):
     response_model=CoursePage
 )
 @cache()
-async def search_courses_v2_endpoint(
+def search_courses_v2_endpoint(
     *,
     session: Session = Depends(get_session),
     subject: Optional[str] = None,
@@ -863,19 +1346,21 @@ async def search_courses_v2_endpoint(
     filters = []
     
     # only allow valid transfer destinations
-    statement = select(TransferDB.destination).distinct()
-    results = session.exec(statement)
-    transfer_destination_codes = results.all()
     for code in transfer_destinations:
-        if code not in transfer_destination_codes:
-            raise HTTPException(status_code=404, detail=f"{code} is not a valid transfer destination. Valid destinations are {transfer_destination_codes}")
+        if not current_catalog().is_destination(code):
+            raise HTTPException(status_code=404, detail=f"{code} is not a valid transfer destination. Valid destinations are {list(current_catalog().destinations)}")
     
     if subject:
         filters.append(CourseMaxDB.subject == subject.upper())
     if course_code:
         filters.append(CourseMaxDB.course_code.like(f"{course_code}%"))
+    search = None
     if title_search:
-        filters.append(CourseMaxDB.title.contains(title_search))
+        match = ftsQuery(title_search, column="title", match_all=True)
+        if match and current_catalog().has_table(COURSE_SEARCH_TABLE):
+            search = courseSearchSubquery(match)
+        else:
+            filters.append(CourseMaxDB.title.contains(title_search))
     if attr_ar != None:
         filters.append(CourseMaxDB.attr_ar == attr_ar)
     if attr_sc != None:
@@ -900,15 +1385,28 @@ async def search_courses_v2_endpoint(
         filters.append(CourseMaxDB.desc_prerequisite == None)
     if transfer_destinations:
         for dest in transfer_destinations:
-            filters.append(CourseMaxDB.transfer_destinations.contains(f",{dest},")) # must include separators otherwise there is technically a possibility of a unintended match
+            filters.append(transfers_to_filter(dest))
     
 
-    statement = select(CourseMaxDB).where(*filters)
-    results = session.exec(statement)
-    courses = results.all()
+    if search is not None:
+        statement = (
+            select(CourseMaxDB, search.c.snippet)
+            .join(search, search.c.id == CourseMaxDB.id)
+            .where(*filters)
+            .order_by(search.c.rank)
+        )
+        results = session.exec(statement).all()
+        courses = [r[0] for r in results]
+        snippets = {r[0].id: r[1] for r in results}
+    else:
+        statement = select(CourseMaxDB).where(*filters)
+        results = session.exec(statement)
+        courses = results.all()
+        snippets = {}
 
     return CoursePage(
-        courses=courses
+        courses=courses,
+        snippets=snippets
         )
 
 class SectionPage(SQLModel):
@@ -916,6 +1414,7 @@ class SectionPage(SQLModel):
     sections_per_page: int
     total_sections: int
     total_pages: int
+    next_cursor: Optional[str] = Field(default=None, description="Pass as `cursor` to get the next page. Null on the last page.")
     sections: list[SectionAPI]
 
 @app.get(
@@ -926,7 +1425,7 @@ class SectionPage(SQLModel):
     response_model=SectionPage
 )
 @cache()
-async def search_sections_v2_endpoint(
+def search_sections_v2_endpoint(
     *,
     session: Session = Depends(get_session),
     subject: Optional[str] = None,
@@ -947,7 +1446,11 @@ async def search_sections_v2_endpoint(
     filter_no_waitlist: Optional[bool] = False,
     filter_not_cancelled: Optional[bool] = False,
     page: int = 1,
+    days: Optional[str] = Query(default=None, description="Only sections that meet on these days and no others, e.g. ```TR``` or ```-T-R---```."),
+    start_after: Optional[str] = Query(default=None, description="Only sections whose meetings all start at or after this time (```HHMM```)."),
+    end_before: Optional[str] = Query(default=None, description="Only sections whose meetings all end by this time (```HHMM```)."),
     sections_per_page: int = 100,
+    cursor: Optional[str] = None,
 ) -> SectionPage:
     
     """
@@ -961,7 +1464,87 @@ async def search_sections_v2_endpoint(
     That means filtering by attributes and title_search.
     
     Then we take courses that pass those and search through all sections.
+    
+    If the section search index is loaded all of that is answered in memory
+    and only the sections on the requested page are read from the database.
+    
+    Pages are ordered by (year, term, subject, course_code, crn). Deep pages should
+    be fetched with the `next_cursor` of the previous page instead of `page`,
+    a cursor picks up right after the last section and reuses the total.
+    
+    days/start_after/end_before are checked against the weekly schedule bitmask
+    of each section (exams excluded). Sections without a weekly time (e.g. online)
+    never match them.
     """
+    if page < 1:
+        raise HTTPException(status_code=400, detail="Page number must be greater than or equal to 1")
+    if sections_per_page < 1:
+        raise HTTPException(status_code=400, detail="sections_per_page must be greater than or equal to 1")
+    
+    query_hash = section_cursor_query_hash({
+        "subject": subject, "course_code": course_code, "title_search": title_search,
+        "instructor_search": instructor_search, "year": year, "term": term, "online": online,
+        "attr_ar": attr_ar, "attr_sc": attr_sc, "attr_hum": attr_hum, "attr_lsc": attr_lsc,
+        "attr_sci": attr_sci, "attr_soc": attr_soc, "attr_ut": attr_ut,
+        "filter_open_seats": filter_open_seats, "filter_no_waitlist": filter_no_waitlist,
+        "filter_not_cancelled": filter_not_cancelled, "sections_per_page": sections_per_page,
+        "days": days, "start_after": start_after, "end_before": end_before,
+    })
+    
+    within = parse_time_window(days, start_after, end_before)
+    
+    after = None
+    cached_total = None
+    if cursor is not None:
+        after, cached_total, page = decode_section_cursor(cursor, query_hash)
+    
+    index = current_section_index()
+    if index is not None:
+        bits = index.search(
+            subject=subject,
+            course_code=course_code,
+            title_search=title_search,
+            instructor_search=instructor_search,
+            year=year,
+            term=term,
+            online=online,
+            attributes={
+                "attr_ar": attr_ar,
+                "attr_sc": attr_sc,
+                "attr_hum": attr_hum,
+                "attr_lsc": attr_lsc,
+                "attr_sci": attr_sci,
+                "attr_soc": attr_soc,
+                "attr_ut": attr_ut,
+            },
+            filter_open_seats=filter_open_seats,
+            filter_no_waitlist=filter_no_waitlist,
+            filter_not_cancelled=filter_not_cancelled,
+            within=within,
+        )
+        
+        # a popcount is cheap enough that the total from the cursor isn't needed here
+        total_sections = index.count(bits)
+        total_pages = (total_sections + sections_per_page - 1) // sections_per_page  # Ceiling division
+        
+        if after is None:
+            positions = index.positions(bits, (page - 1) * sections_per_page, sections_per_page)
+        else:
+            positions = index.page_after(bits, after, sections_per_page)
+        
+        next_cursor = None
+        if len(positions) == sections_per_page and page < total_pages:
+            next_cursor = encode_section_cursor(index.key(positions[-1]), total_sections, page + 1, query_hash)
+        
+        return SectionPage(
+            page=page,
+            sections_per_page=sections_per_page,
+            total_sections=total_sections,
+            total_pages=total_pages,
+            next_cursor=next_cursor,
+            sections=get_sections_by_id(session, [index.ids[p] for p in positions])
+        )
+    
     # course search
     filters = []
     
@@ -991,7 +1574,8 @@ async def search_sections_v2_endpoint(
             filters.append(CourseMaxDB.title.contains(title_search))
     
     courses = []
-    if len(filters) > 0:
+    filtered_courses = len(filters) > 0
+    if filtered_courses:
         statement = select(CourseMaxDB.subject, CourseMaxDB.course_code).where(*filters)
         results = session.exec(statement)
         courses = results.all()
@@ -1025,17 +1609,16 @@ async def search_sections_v2_endpoint(
             filters.append(~SectionDB.section.contains("W")) # bitwise not operator
     
     if filter_open_seats:
-        filters.append(and_(cast(SectionDB.seats, Integer) > 0, SectionDB.seats != "Cancel"))
+        filters.append(SectionDB.status == SectionStatus.OPEN)
         # else:
         #     filters.append(SectionDB.seats <= 0)
             
     if filter_no_waitlist:
-        filters.append(or_(SectionDB.waitlist == " ", SectionDB.waitlist == "N/A"))
-        # else:
-        #     filters.append(cast(SectionDB.waitlist, Integer) > 0)
+        # no waitlist at all or nobody on it, same as the section index
+        filters.append(or_(col(SectionDB.waitlist_count).is_(None), SectionDB.waitlist_count == 0))
             
     if filter_not_cancelled:
-        filters.append(SectionDB.seats != "Cancel")
+        filters.append(col(SectionDB.status).in_([SectionStatus.OPEN, SectionStatus.FULL, SectionStatus.INACTIVE]))
         # else:
         #     filters.append(SectionDB.seats != "Cancel")    
     
@@ -1045,10 +1628,20 @@ async def search_sections_v2_endpoint(
     
     if coursematch_filters:
         filters.append(or_(*coursematch_filters))
+    elif filtered_courses:
+        # no course matched, so no section can either (same as the section index)
+        filters.append(false())
+    
+    if within is not None:
+        window = maskToBytes(within)
+        filters.append(col(SectionDB.section_key).in_(
+            select(SectionTimesDB.section_key).where(func.mask_within(SectionTimesDB.mask, window) == 1)
+        ))
     
     
     
     # handle pagination
+    sort_key = (SectionDB.year, SectionDB.term, SectionDB.subject, SectionDB.course_code, SectionDB.crn)
     
     # Base query for total count and paginated results
     base_statement = (
@@ -1056,42 +1649,147 @@ async def search_sections_v2_endpoint(
     .join(SectionDB.schedule)  # Join with schedule table
     .where(*filters)  # Filters applied to SectionDB and Schedule
     .distinct()
+    .order_by(*sort_key)
     .options(selectinload(SectionDB.schedule))  # Eagerly load the schedule relationship
     )
 
-    # Query for counting total sections
-    count_statement = (
-        select(func.count(distinct(SectionDB.id)))  # Count distinct section IDs
-        .select_from(SectionDB)
-        .join(SectionDB.schedule)  # Join still needed for filters
-        .where(*filters)
-    )
-    total_sections = session.scalar(count_statement)
+    # Query for counting total sections, only on the first request of a search
+    if cached_total is not None:
+        total_sections = cached_total
+    else:
+        count_statement = (
+            select(func.count(distinct(SectionDB.id)))  # Count distinct section IDs
+            .select_from(SectionDB)
+            .join(SectionDB.schedule)  # Join still needed for filters
+            .where(*filters)
+        )
+        total_sections = session.scalar(count_statement)
     
     # Pagination calculations
-    offset = (page - 1) * sections_per_page
     total_pages = (total_sections + sections_per_page - 1) // sections_per_page  # Ceiling division
 
     # Paginated query
-    paginated_statement = (
-        base_statement
-        .offset(offset)
-        .limit(sections_per_page)
-    )
+    if after is None:
+        paginated_statement = base_statement.offset((page - 1) * sections_per_page)
+    else:
+        paginated_statement = base_statement.where(tuple_(*sort_key) > tuple_(*after))
+    paginated_statement = paginated_statement.limit(sections_per_page)
 
     # Fetch sections for the current page
     sections = session.exec(paginated_statement).all()
+    
+    next_cursor = None
+    if len(sections) == sections_per_page and page < total_pages:
+        last = sections[-1]
+        key = (last.year, last.term, last.subject, last.course_code, last.crn)
+        next_cursor = encode_section_cursor(key, total_sections, page + 1, query_hash)
 
     return SectionPage(
         page=page,
         sections_per_page=sections_per_page,
         total_sections=total_sections,
         total_pages=total_pages,
+        next_cursor=next_cursor,
         sections=sections
     )
 
 
 
+@app.get(
+    "/v1/timetable",
+    tags=["Search Requests"],
+    summary="Build Timetables",
+    description=(
+        "Streams every conflict-free combination of one section per course as newline delimited JSON. "
+        "Each line is ```{\"sections\": [...], \"crns\": [...]}``` in the order the courses were given, "
+        "the last line is ```{\"count\": n, \"complete\": bool, \"stopped\": reason}```. "
+        "Cancelled sections are never included, exams are not checked for conflicts."
+    ),
+    response_class=StreamingResponse,
+)
+def timetable_endpoint(
+    *,
+    session: Session = Depends(get_session),
+    year: int,
+    term: int,
+    courses: Annotated[list[str], Query(description="Courses to take e.g. ```CPSC 1050```. Repeat the parameter for each course.")],
+    filter_open_seats: bool = False,
+    online: Optional[bool] = None,
+    days: Optional[str] = Query(default=None, description="Only use sections that meet on these days, e.g. ```MWF```."),
+    start_after: Optional[str] = Query(default=None, description="No classes before this time (```HHMM```)."),
+    end_before: Optional[str] = Query(default=None, description="No classes after this time (```HHMM```)."),
+    max_results: int = 100,
+) -> StreamingResponse:
+    
+    if not 1 <= len(courses) <= TIMETABLE_MAX_COURSES:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {TIMETABLE_MAX_COURSES} courses can be given.")
+    if not 1 <= max_results <= TIMETABLE_MAX_RESULTS:
+        raise HTTPException(status_code=400, detail=f"max_results must be between 1 and {TIMETABLE_MAX_RESULTS}.")
+    check_year_term_valid_raise_if_not(year, term)
+    
+    wanted: list[tuple[str, str]] = []
+    for c in courses:
+        # CPSC 1050, CPSC-1050 or CPSC1050
+        c = c.strip().upper().replace("-", " ")
+        subject, course_code = c[:-4].strip(), c[-4:]
+        if not subject.isalpha() or not course_code.isnumeric():
+            raise HTTPException(status_code=400, detail=f"Invalid course {c}, expected e.g. CPSC 1050.")
+        if (subject, course_code) in wanted:
+            raise HTTPException(status_code=400, detail=f"{subject} {course_code} was given twice.")
+        wanted.append((subject, course_code))
+    
+    window = parse_time_window(days, start_after, end_before)
+    
+    # candidate sections, using the weekly masks generated with the database
+    filters = [
+        SectionDB.year == year,
+        SectionDB.term == term,
+        col(SectionDB.status).in_([SectionStatus.OPEN, SectionStatus.FULL, SectionStatus.INACTIVE]),
+        or_(*[(SectionDB.subject == subject) & (SectionDB.course_code == course_code) for subject, course_code in wanted]),
+    ]
+    if filter_open_seats:
+        filters.append(SectionDB.status == SectionStatus.OPEN)
+    if online != None:
+        if online:
+            filters.append(SectionDB.section.contains("W"))
+        else:
+            filters.append(~SectionDB.section.contains("W"))
+    
+    statement = (
+        select(SectionDB.id, SectionDB.crn, SectionDB.subject, SectionDB.course_code, SectionTimesDB.mask)
+        .join(SectionTimesDB, SectionTimesDB.section_key == SectionDB.section_key)
+        .where(*filters)
+        .order_by(SectionDB.crn)
+    )
+    
+    candidates: dict[tuple[str, str], list] = {c: [] for c in wanted}
+    for s in session.exec(statement).all():
+        mask = maskFromBytes(s.mask)
+        # sections without a weekly time (e.g. online) fit anywhere
+        if window is not None and mask & ~window:
+            continue
+        candidates[(s.subject, s.course_code)].append((mask, (s.id, s.crn)))
+    
+    for (subject, course_code), options in candidates.items():
+        if not options:
+            raise HTTPException(status_code=404, detail=f"No sections of {subject} {course_code} in {year}{term} match the given constraints.")
+    
+    search = TimetableSearch(list(candidates.values()), max_results=max_results, time_budget=TIMETABLE_TIME_BUDGET)
+    
+    # runs on the thread pool while the response is sent
+    def stream():
+        for timetable in search:
+            yield orjson.dumps({
+                "sections": [id for id, crn in timetable],
+                "crns": [crn for id, crn in timetable],
+            }) + b"\n"
+        yield orjson.dumps({
+            "count": search.count,
+            "complete": search.stopped is None,
+            "stopped": search.stopped,
+        }) + b"\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 
 # @app.get(
@@ -1129,34 +1827,216 @@ async def search_sections_v2_endpoint(
 #         # elif 
     
 
+@app.get(
+    "/v1/prebuilts/manifest.json",
+    tags=["Misc Requests"],
+    summary="Prebuilt responses.",
+    description="Maps api routes (index routes, semester sections and courses) to static copies of their responses, rebuilt with the database. Get the files from /v1/prebuilts/{file}.",
+)
+async def prebuilt_manifest():
+    path = os.path.join(PREBUILTS_DIRECTORY, "static", PREBUILT_MANIFEST)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No prebuilt responses have been generated.")
+    
+    # the only file that changes, clients revalidate it
+    return FileResponse(path, media_type="application/json", headers={"Cache-Control": "no-cache"})
+
+@app.get(
+    "/v1/prebuilts/{file}",
+    tags=["Misc Requests"],
+    summary="Prebuilt response.",
+    description="A file from the prebuilt manifest. File names contain a hash of their content so they can be cached forever.",
+)
+async def prebuilt_file(request: Request, file: str):
+    if not PREBUILT_FILE_PATTERN.match(file) or not file.endswith(".json"):
+        raise HTTPException(status_code=404, detail="Not a prebuilt file.")
+    
+    path = os.path.join(PREBUILTS_DIRECTORY, "static", file)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Prebuilt file not found, get the current name from the manifest.")
+    
+    headers = {
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Vary": "Accept-Encoding",
+    }
+    
+    # serve the precompressed copy if the client takes it
+    accept_encoding = request.headers.get("accept-encoding", "")
+    for encoding, extension in (("br", ".br"), ("gzip", ".gz")):
+        if encoding in accept_encoding and os.path.exists(path + extension):
+            headers["Content-Encoding"] = encoding
+            return FileResponse(path + extension, media_type="application/json", headers=headers)
+    
+    return FileResponse(path, media_type="application/json", headers=headers)
+
 @app.get(
     "/v1/export/database.db",
     tags=["Misc Requests"],
     summary="Raw database.",
-    description="Gets compacted version of the database with all information.",
+    description="Gets compacted version of the database with all information, as a gzipped SQLite file (```compact.db.gz```). Supports Range requests to resume interrupted downloads.",
     # response_model=Response,
 )
 # @cache()
-async def getDatabase():
+async def getDatabase(request: Request):
     file_path = "database/prebuilts/compact.db.gz"
     
-    if not os.path.exists(file_path):
+    try:
+        stat_result = os.stat(file_path)
+    except FileNotFoundError:
         raise HTTPException(status_code=500, detail="Couldn't find compact.db.gz")
     
-    response = FileResponse(file_path)
-    response.headers["Content-Encoding"] = "gzip"
+    # served as a gzip file rather than with Content-Encoding: gzip, so Range requests
+    # are in bytes of the file and interrupted downloads can be resumed
+    response = FileResponse(
+        file_path,
+        media_type="application/gzip",
+        filename="compact.db.gz",
+        stat_result=stat_result,
+        headers={"Cache-Control": "no-cache"},
+    )
+    
+    last_modified = datetime.fromtimestamp(stat_result.st_mtime, timezone.utc)
+    if isNotModified(request.headers, response.headers["etag"], last_modified):
+        return Response(status_code=304, headers={k: response.headers[k] for k in ("etag", "last-modified", "cache-control")})
+    
     return response
 
+@app.get(
+    "/v1/export/changes",
+    tags=["Misc Requests"],
+    summary="Database changes.",
+    description=(
+        "Changes to the database from /v1/export/database.db since the given generation (```generation``` in its metadata table), "
+        "as newline delimited JSON to apply in order: for every generation a ```{\"generation\": g, \"previous\": g - 1}``` line, "
+        "then ```{\"op\": \"delete\", \"table\": ..., \"key\": {...}}``` and ```{\"op\": \"upsert\", \"table\": ..., \"row\": {...}}``` lines. "
+        "Blob columns are base64 encoded. The current generation is in the ```X-Generation``` header. "
+        "If the changes are no longer kept, or would be bigger than the whole database, this redirects to /v1/export/database.db."
+    ),
+    response_class=StreamingResponse,
+)
+async def getDatabaseChanges(since: int):
+    changesets = ChangesetLog(CHANGESETS_DIRECTORY)
+    index = changesets.index()
+    if index is None:
+        raise HTTPException(status_code=404, detail="No changesets have been generated.")
+    
+    generation = index["generation"]
+    if not 0 <= since <= generation:
+        raise HTTPException(status_code=400, detail=f"since must be between 0 and the current generation ({generation}).")
+    
+    headers = {"X-Generation": str(generation), "Cache-Control": "no-cache"}
+    full_download = RedirectResponse("/v1/export/database.db", status_code=307, headers=headers)
+    
+    if since < index["since"]:
+        return full_download
+    
+    # opened before the response starts, once the headers are sent a missing file can only cut the body short
+    try:
+        files = changesets.open(since, generation)
+    except FileNotFoundError:
+        # pruned by a build that finished after the index was read
+        return full_download
+    
+    full_path = os.path.join(PREBUILTS_DIRECTORY, "compact.db.gz")
+    if os.path.exists(full_path) and compressedSize(files) >= os.path.getsize(full_path):
+        for fi in files:
+            fi.close()
+        return full_download
+    
+    return StreamingResponse(readChangesets(files), media_type="application/x-ndjson", headers=headers)
+
+@app.get(
+    "/v1/export/arrow/{year}/{term}/{table}",
+    tags=["Misc Requests"],
+    summary="Semester as Arrow.",
+    description=(
+        "All ```sections``` or ```schedules``` of a semester as an Arrow IPC stream, "
+        "which loads into pandas (```pyarrow.ipc.open_stream(...).read_pandas()```), polars or DuckDB without parsing. "
+        "Subjects, instructors, rooms and other repeated strings are dictionary encoded. "
+        "Parquet files of every semester are also written to ```prebuilts/columnar/``` by the backend."
+    ),
+    response_class=Response,
+)
+def semesterArrow(
+    *,
+    session: Session = Depends(get_session),
+    year: int,
+    term: int,
+    table: str,
+) -> Response:
+    if ColumnarExport.pyarrow is None:
+        raise HTTPException(status_code=501, detail="Arrow export is not available on this server.")
+    if table not in ColumnarExport.COLUMNAR_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table {table}, expected one of {list(ColumnarExport.COLUMNAR_TABLES)}.")
+    check_year_term_valid_raise_if_not(year, term)
+    
+    arrow_table = ColumnarExport.semesterTable(session, table, year, term)
+    return Response(ColumnarExport.arrowStream(arrow_table), media_type=ColumnarExport.COLUMNAR_MEDIA_TYPE)
+
+def ndjson_chunks(lines):
+    # one message per line would make the gzip middleware flush every line
+    chunk = bytearray()
+    for line in lines:
+        chunk += line
+        chunk += b"\n"
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+def export_course_lines(export_engine: Engine, use_documents: bool):
+    with Session(export_engine) as session:
+        if use_documents:
+            statement = select(CourseDocumentDB.data).order_by(CourseDocumentDB.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+            for data in session.exec(statement):
+                yield gzip.decompress(data)
+            return
+        
+        statement = select(CourseDB).order_by(CourseDB.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        for c in session.exec(statement):
+            course = CourseAPI(subject=c.subject, course_code=c.course_code, id=c.id, attributes=c.attributes, sections=c.sections, transfers=c.transfers, outlines=c.outlines)
+            yield orjson.dumps(course.model_dump(mode="json"))
+
+def export_section_lines(export_engine: Engine):
+    with Session(export_engine) as session:
+        # schedules are selectin loaded for every batch
+        statement = select(SectionDB).order_by(SectionDB.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        for section in session.exec(statement):
+            yield orjson.dumps(SectionAPI.model_validate(section).model_dump(mode="json"))
+
+@app.get(
+    "/v1/export/ndjson/{table}",
+    tags=["Misc Requests"],
+    summary="Stream all courses or sections.",
+    description=(
+        "Every course (same as /v1/courses/{subject}/{course_code}) or every section (same as /v1/section/{year}/{term}/{crn}) "
+        "as newline delimited JSON, one object per line. The response is streamed as it is read from the database, "
+        "so it starts right away and doesn't have to be paged. Use ```courses``` or ```sections```."
+    ),
+    response_class=StreamingResponse,
+)
+async def exportNdjson(table: str) -> StreamingResponse:
+    if table == "courses":
+        lines = export_course_lines(current_engine(), current_catalog().has_table(CourseDocumentDB.__tablename__))
+    elif table == "sections":
+        lines = export_section_lines(current_engine())
+    else:
+        raise HTTPException(status_code=404, detail="Unknown table, expected courses or sections.")
+    
+    # the generator holds on to the engine it started with, a snapshot swap doesn't cut it off
+    return StreamingResponse(ndjson_chunks(lines), media_type="application/x-ndjson")
+
 @app.get(
     "/v1/export/courses",
     tags=["Misc Requests"],
     summary="All courses.",
-    description="Get info of all available courses.",
+    description="Get info of all available courses. Use /v1/export/ndjson/courses instead.",
     response_model=ExportCourseList,
     deprecated=True,
 )
 @cache()
-async def allCourses(
+def allCourses(
     *,
     session: Session = Depends(get_session),
     page:int = 1,
@@ -1196,12 +2076,12 @@ async def allCourses(
     "/v1/export/all",
     tags=["Misc Requests"],
     summary="All information.",
-    description="Get all available information. You probably don't need to use this route.",
+    description="Get all available information. You probably don't need to use this route, /v1/export/ndjson/courses streams the same courses without paging.",
     response_model=PaginationPage,
     deprecated=True,
 )
 @cache()
-async def allInfo(
+def allInfo(
     *,
     session: Session = Depends(get_session),
     page:int = 1,
@@ -1220,7 +2100,7 @@ async def allInfo(
         raise HTTPException(status_code=400, detail="Page number must be equal or lesser than total_pages")
     
     
-    statement = select(CourseDB).order_by(CourseDB.id).limit(COURSES_PER_PAGE).offset(COURSES_PER_PAGE*page-1) # 0-index page
+    statement = select(CourseDB).order_by(CourseDB.id).limit(COURSES_PER_PAGE).offset(COURSES_PER_PAGE*(page-1)) # 0-index page
     results = session.exec(statement)
     courses = results.all()
 
@@ -1241,7 +2121,7 @@ async def allInfo(
     summary="Fetch database metadata",
     description="Returns metadata entries as a dictionary with field names as keys.",
 )
-async def get_metadata(
+def get_metadata(
     session: Session = Depends(get_session),
 ) -> MetadataFormatted:
     # Query all metadata entries
@@ -1263,8 +2143,7 @@ async def refreshInternals(
     *,
     session: Session = Depends(get_session),
 ):  
-    fetchDB()
-    await FastAPICache.clear()
+    await refresh_snapshot()
 
 
 @app.get("/v1/admin/check_cache", include_in_schema=False)
@@ -1273,4 +2152,8 @@ async def check_cache():
 
 @app.get("/v1/admin/clear_cache", include_in_schema=False)
 async def clear_cache():
-    FastAPICache.clear()
+    await FastAPICache.clear()
+
+@app.get("/v1/admin/warmup", include_in_schema=False)
+async def check_warmup():
+    return warmup_stats
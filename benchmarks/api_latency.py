@@ -0,0 +1,97 @@
+"""
+Latency benchmark for the API under mixed concurrent load.
+
+Heavy clients keep hitting the slow routes (bypassing the cache with
+Cache-Control: no-cache) while light clients hit the cheap index routes.
+If database work blocks the event loop, the index routes' tail latency
+balloons to the length of the slowest heavy query.
+
+Start the api first (uvicorn api:app) then run:
+    python benchmarks/api_latency.py --url http://localhost:8000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+HEAVY_ROUTES = [
+    "/v2/search/sections?instructor_search=a",
+    "/v2/search/sections?title_search=intro",
+    "/v1/search/sections?query=a",
+    "/v1/export/all?page=1",
+]
+
+LIGHT_ROUTES = [
+    "/v1/index/latest_semester",
+    "/v1/index/semesters",
+    "/v1/index/subjects",
+    "/v1/index/transfer_destinations",
+]
+
+
+async def client_loop(client: httpx.AsyncClient, routes: list[str], headers: dict, deadline: float, out: list[float]) -> None:
+    i = 0
+    while time.perf_counter() < deadline:
+        route = routes[i % len(routes)]
+        i += 1
+
+        start = time.perf_counter()
+        response = await client.get(route, headers=headers)
+        out.append((time.perf_counter() - start) * 1000)
+
+        if response.status_code != 200:
+            print(f"{route} returned {response.status_code}")
+
+
+def summarize(name: str, samples: list[float]) -> str:
+    if not samples:
+        return f"{name:>6}: no requests completed"
+
+    samples = sorted(samples)
+    def pct(p: float) -> float:
+        return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+    return (f"{name:>6}: n={len(samples):<6} "
+            f"p50={statistics.median(samples):7.1f}ms "
+            f"p95={pct(0.95):7.1f}ms "
+            f"p99={pct(0.99):7.1f}ms "
+            f"max={samples[-1]:7.1f}ms")
+
+
+async def main(url: str, heavy_clients: int, light_clients: int, duration: float) -> None:
+    heavy: list[float] = []
+    light: list[float] = []
+
+    limits = httpx.Limits(max_connections=heavy_clients + light_clients)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        # make sure the light routes are cached so we only measure queueing
+        for route in LIGHT_ROUTES:
+            await client.get(route)
+
+        deadline = time.perf_counter() + duration
+        tasks = [
+            client_loop(client, HEAVY_ROUTES, {"Cache-Control": "no-cache"}, deadline, heavy)
+            for _ in range(heavy_clients)
+        ] + [
+            client_loop(client, LIGHT_ROUTES, {}, deadline, light)
+            for _ in range(light_clients)
+        ]
+        await asyncio.gather(*tasks)
+
+    print(f"{heavy_clients} heavy + {light_clients} light clients for {duration:.0f}s against {url}")
+    print(summarize("heavy", heavy))
+    print(summarize("light", light))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--heavy", type=int, default=4, help="concurrent clients on slow routes")
+    parser.add_argument("--light", type=int, default=16, help="concurrent clients on index routes")
+    parser.add_argument("--duration", type=float, default=20, help="seconds to run")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.url, args.heavy, args.light, args.duration))
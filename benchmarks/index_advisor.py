@@ -0,0 +1,241 @@
+"""
+Index advisor for recorded query shapes.
+
+Replays the queries recorded with QUERY_SHAPES_FILE (see sdk/api/QueryShapes.py)
+against a copy of the database with EXPLAIN QUERY PLAN, flags full table scans
+and temp b-trees (sorting/grouping without an index), proposes composite (and,
+when few enough columns are used, covering) indexes for them, and measures every
+query before and after the proposed indexes are created on the copy.
+
+Proposals that no query ends up using are dropped. The rest are printed as the
+Index(...) lines to add to the model's __table_args__, which is what a new
+database is created with, and as a @migration to add to sdk/schema/Migrations.py,
+which creates them in existing databases and records it in db_version. The
+database itself is never changed.
+
+Record shapes first, e.g.:
+    QUERY_SHAPES_FILE=database/query_shapes.json uvicorn api:app
+then run:
+    python benchmarks/index_advisor.py --db database/database.db --shapes database/query_shapes.json
+"""
+import argparse
+import os
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from sdk.api.QueryShapes import decodeParameters, loadQueryShapes
+from sdk.schema.Migrations import LATEST_DB_VERSION
+
+
+# columns a covering index may have before it's not worth it
+COVERING_MAX_COLUMNS = 6
+
+IDENTIFIER = r"[A-Za-z_][A-Za-z0-9_]*"
+
+
+def explain(connection: sqlite3.Connection, sql: str, parameters: tuple) -> list[str]:
+    return [row[3] for row in connection.execute("EXPLAIN QUERY PLAN " + sql, parameters)]
+
+
+def planProblems(plan: list[str]) -> list[str]:
+    problems = []
+    for detail in plan:
+        if detail.startswith("SCAN ") and " USING " not in detail and "VIRTUAL TABLE" not in detail and "CONSTANT ROW" not in detail:
+            problems.append(detail)
+        elif "USE TEMP B-TREE" in detail:
+            problems.append(detail)
+    return problems
+
+
+def timeQuery(connection: sqlite3.Connection, sql: str, parameter_sets: list[tuple], repeat: int) -> float:
+    """Median milliseconds over every parameter set, run `repeat` times each."""
+    samples = []
+    for parameters in parameter_sets:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            connection.execute(sql, parameters).fetchall()
+            samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def tableAliases(sql: str) -> dict[str, str]:
+    """alias -> table for every table in FROM / JOIN."""
+    aliases = {}
+    for table, alias in re.findall(rf"(?:FROM|JOIN)\s+({IDENTIFIER})(?:\s+AS\s+({IDENTIFIER}))?", sql, re.IGNORECASE):
+        if table.upper() == "SELECT":
+            continue
+        aliases[alias or table] = table
+    return aliases
+
+
+def proposeIndexes(sql: str, table_columns: dict[str, list[str]]) -> list[tuple[str, tuple[str, ...]]]:
+    """
+    Guess indexes for a statement from its WHERE / ORDER BY: equality columns first,
+    then the ORDER BY (or else the first range) columns, then the rest of the
+    referenced columns if that makes a small enough covering index.
+    """
+    proposals = []
+    order_by = re.search(r"ORDER BY (.+?)(?: LIMIT | OFFSET |$)", sql, re.IGNORECASE | re.DOTALL)
+    order_by = order_by.group(1) if order_by else ""
+
+    for alias, table in tableAliases(sql).items():
+        if table not in table_columns:
+            continue
+        prefix = re.escape(alias) + r"\."
+
+        equality = re.findall(rf"{prefix}({IDENTIFIER})\s*(?:(?<![!<>])=|\bIS\b(?!\s+NOT)|\bIN\b)", sql, re.IGNORECASE)
+        ranges = re.findall(rf"{prefix}({IDENTIFIER})\s*(?:<|>|\bLIKE\b|\bBETWEEN\b)", sql, re.IGNORECASE)
+        ordering = re.findall(rf"{prefix}({IDENTIFIER})", order_by)
+        referenced = re.findall(rf"{prefix}({IDENTIFIER})", sql)
+
+        columns: list[str] = []
+        for c in equality:
+            if c not in columns:
+                columns.append(c)
+
+        # the order by can only come from this index if every column of it is in this table
+        other_tables_in_order = re.findall(rf"({IDENTIFIER})\.{IDENTIFIER}", order_by)
+        if ordering and all(a == alias for a in other_tables_in_order):
+            for c in ordering:
+                if c not in columns:
+                    columns.append(c)
+        elif ranges and ranges[0] not in columns:
+            columns.append(ranges[0])
+
+        if not columns:
+            continue
+        proposals.append((table, tuple(columns)))
+
+        rest = [c for c in dict.fromkeys(referenced) if c not in columns]
+        if rest and len(columns) + len(rest) <= COVERING_MAX_COLUMNS:
+            proposals.append((table, tuple(columns + rest)))
+
+    return proposals
+
+
+def existingIndexes(connection: sqlite3.Connection) -> dict[str, list[tuple[str, ...]]]:
+    out: dict[str, list[tuple[str, ...]]] = {}
+    for table, name in connection.execute("SELECT tbl_name, name FROM sqlite_master WHERE type = 'index'"):
+        columns = tuple(r[2] for r in connection.execute(f"PRAGMA index_info({name})"))
+        out.setdefault(table, []).append(columns)
+    return out
+
+
+def indexName(table: str, columns: tuple[str, ...]) -> str:
+    return f"ix_{table}_{'_'.join(columns)}"
+
+
+def main(db: str, shapes_path: str, top: int, repeat: int) -> None:
+    shapes = loadQueryShapes(shapes_path)
+    if not shapes:
+        print(f"No query shapes in {shapes_path}.")
+        return
+    shapes = sorted(shapes.items(), key=lambda s: s[1]["count"], reverse=True)[:top]
+
+    # everything is measured on a copy
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    source = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+    connection = sqlite3.connect(tmp.name)
+    source.backup(connection)
+    source.close()
+    connection.execute("ANALYZE")
+
+    table_columns = {
+        table: [r[1] for r in connection.execute(f"PRAGMA table_info({table})")]
+        for (table,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+
+    before = []
+    candidates: dict[str, tuple[str, tuple[str, ...]]] = {}
+    existing = existingIndexes(connection)
+    for sql, shape in shapes:
+        parameter_sets = [decodeParameters(p) for p in shape["parameters"]] or [()]
+        try:
+            plan = explain(connection, sql, parameter_sets[0])
+        except sqlite3.Error as e:
+            print(f"skipping a shape that doesn't run on this database: {e}")
+            continue
+        problems = planProblems(plan)
+        before.append((sql, shape["count"], parameter_sets, problems, timeQuery(connection, sql, parameter_sets, repeat)))
+
+        if not problems:
+            continue
+        for table, columns in proposeIndexes(sql, table_columns):
+            # an existing index starting with the same columns does the same job
+            if any(idx[:len(columns)] == columns for idx in existing.get(table, [])):
+                continue
+            candidates[indexName(table, columns)] = (table, columns)
+
+    for name, (table, columns) in candidates.items():
+        connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+    connection.execute("ANALYZE")
+
+    used = set()
+    rows = []
+    for sql, count, parameter_sets, problems, before_ms in before:
+        plan = explain(connection, sql, parameter_sets[0])
+        for detail in plan:
+            for name in candidates:
+                if re.search(rf"\b{name}\b", detail):
+                    used.add(name)
+        after_ms = timeQuery(connection, sql, parameter_sets, repeat)
+        rows.append((sql, count, before_ms, after_ms, problems, planProblems(plan)))
+
+    connection.close()
+    os.remove(tmp.name)
+
+    print(f"{len(rows)} query shapes from {shapes_path}, median of {repeat} runs per parameter set\n")
+    print(f"{'count':>7} {'before':>9} {'after':>9}  query")
+    for sql, count, before_ms, after_ms, problems, after_problems in rows:
+        flag = "!" if after_problems else ("*" if problems else " ")
+        short = re.sub(r"\s+", " ", sql)
+        short = re.sub(r"SELECT .+? FROM", "SELECT ... FROM", short, count=1)
+        print(f"{count:>7} {before_ms:>7.2f}ms {after_ms:>7.2f}ms {flag} {short[:140]}")
+        for p in problems:
+            print(f"{'':>29}before: {p}")
+        for p in after_problems:
+            print(f"{'':>29}after:  {p}")
+    total_before = sum(count * before_ms for _, count, before_ms, _, _, _ in rows)
+    total_after = sum(count * after_ms for _, count, _, after_ms, _, _ in rows)
+    print("\n* fixed by a proposed index, ! still scans or sorts")
+    print(f"weighted by count: {total_before:.1f}ms before, {total_after:.1f}ms after")
+
+    proposals = [(name, table, columns) for name, (table, columns) in candidates.items() if name in used]
+    # a used index that starts with the columns of another one makes the other one redundant
+    proposals = [
+        (name, table, columns) for name, table, columns in proposals
+        if not any(t == table and c != columns and c[:len(columns)] == columns for _, t, c in proposals)
+    ]
+    if not proposals:
+        print("\nNo indexes to propose.")
+        return
+
+    print("\nProposed indexes (add to the model's __table_args__):")
+    for name, table, columns in proposals:
+        print(f'    Index("{name}", {", ".join(repr(c) for c in columns)}),  # {table}')
+
+    print("\nand the migration that creates them in existing databases (add to sdk/schema/Migrations.py):\n")
+    print(f'@migration({LATEST_DB_VERSION + 1}, "Add indexes proposed by the index advisor")')
+    print("def _advisorIndexes(connection: sqlite3.Connection) -> None:")
+    print("    createIndexes(")
+    print("        connection,")
+    for name, _, _ in proposals:
+        print(f'        "{name}",')
+    print("    )")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="database/database.db")
+    parser.add_argument("--shapes", default="database/query_shapes.json", help="file written by QUERY_SHAPES_FILE")
+    parser.add_argument("--top", type=int, default=50, help="only the most frequent shapes")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per parameter set")
+    args = parser.parse_args()
+
+    main(args.db, args.shapes, args.top, args.repeat)
@@ -35,6 +35,10 @@ def hourly(use_cache: bool = False):
     c = Controller()
     c.updateLatestSemester(use_cache)
     c.setMetadata("last_updated")
+    # the api workers only reload when there is a new snapshot
+    if c.changed:
+        c.publishSnapshot()
+    c.checkpoint()
 
 
 @repeat(every(24).hours)
@@ -46,6 +50,8 @@ def daily(use_cache: bool = False):
     
     c.buildDatabase(use_cache)
     c.setMetadata("last_updated")
+    c.publishSnapshot()
+    c.checkpoint()
     
     
 
@@ -83,6 +89,7 @@ if __name__ == "__main__":
         controller.create_db_and_tables()
         controller.buildDatabase(use_cache=False)
         controller.setMetadata("last_updated")
+        controller.publishSnapshot()
     
     logger.info("Finished intialization.")
     
@@ -0,0 +1,211 @@
+import base64
+import gzip
+import json
+import os
+import re
+import sqlite3
+from typing import Iterator
+
+import orjson
+
+
+"""
+Changes between consecutive builds of compact.db.
+
+Every build of compact.db gets the next generation number (stored in its
+metadata table as "generation"). When a build has the same tables as the one
+before it, the rows that changed are written to <generation>.jsonl.gz as JSON
+lines, in the order they should be applied:
+
+    {"generation": 12, "previous": 11}
+    {"op": "delete", "table": "sectiondb", "key": {"id": "..."}}
+    {"op": "upsert", "table": "sectiondb", "row": {...}}
+
+Deletes come first, children before parents, then upserts, parents before
+children. Blob columns are base64 encoded.
+
+A client holding generation g applies g+1, g+2, ... up to the current one.
+index.json has the current generation and the oldest one that can still be
+synced from, anything older has to download compact.db again.
+"""
+
+CHANGESET_INDEX = "index.json"
+
+CHANGESET_FILE_PATTERN = re.compile(r"^(\d+)\.jsonl\.gz$")
+
+# a week of hourly updates
+CHANGESET_HISTORY = 168
+
+
+def readGeneration(db_path: str) -> int:
+    """Generation of a built compact.db, 0 if there isn't one."""
+    if not os.path.exists(db_path):
+        return 0
+
+    connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        row = connection.execute("SELECT value FROM metadata WHERE field = 'generation'").fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    finally:
+        connection.close()
+
+    return int(row[0]) if row and row[0] else 0
+
+
+def _primaryKey(connection: sqlite3.Connection, schema: str, table: str) -> list[str]:
+    columns = connection.execute(f"PRAGMA {schema}.table_info({table})").fetchall()
+    return [c[1] for c in sorted(columns, key=lambda c: c[5]) if c[5] > 0]
+
+
+def _jsonRow(columns: list[str], values: tuple) -> dict:
+    return {
+        column: base64.b64encode(value).decode() if isinstance(value, bytes) else value
+        for column, value in zip(columns, values)
+    }
+
+
+def diffDatabases(old_path: str, new_path: str, tables: list[str]) -> list[dict] | None:
+    """
+    Changes that turn the old database into the new one, in the order they have to be applied.
+    Returns None if the tables themselves changed and a changeset can't describe it.
+    """
+    connection = sqlite3.connect(f"file:{new_path}?mode=ro", uri=True)
+    try:
+        connection.execute("ATTACH DATABASE ? AS old", (f"file:{old_path}?mode=ro",))
+
+        present = []
+        for table in tables:
+            new_sql = connection.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+            old_sql = connection.execute("SELECT sql FROM old.sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+            if new_sql != old_sql:
+                return None
+            if new_sql is None:
+                continue
+
+            key = _primaryKey(connection, "main", table)
+            # rows can only be matched up by their primary key
+            if not key:
+                return None
+            present.append((table, key))
+
+        deletes: list[dict] = []
+        upserts: list[dict] = []
+
+        for table, key in present:
+            key_columns = ", ".join(key)
+
+            cursor = connection.execute(f"SELECT {key_columns} FROM old.{table} EXCEPT SELECT {key_columns} FROM main.{table}")
+            table_deletes = [{"op": "delete", "table": table, "key": _jsonRow(key, row)} for row in cursor]
+
+            # new rows and rows with any column changed
+            cursor = connection.execute(f"SELECT * FROM main.{table} EXCEPT SELECT * FROM old.{table}")
+            columns = [d[0] for d in cursor.description]
+            table_upserts = [{"op": "upsert", "table": table, "row": _jsonRow(columns, row)} for row in cursor]
+
+            # tables are given parents first
+            deletes = table_deletes + deletes
+            upserts += table_upserts
+
+        return deletes + upserts
+    finally:
+        connection.close()
+
+
+class ChangesetLog:
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def generations(self) -> list[int]:
+        out = []
+        for file in os.listdir(self.directory):
+            m = CHANGESET_FILE_PATTERN.match(file)
+            if m:
+                out.append(int(m.group(1)))
+        return sorted(out)
+
+    def path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"{generation:08d}.jsonl.gz")
+
+    def write(self, generation: int, changes: list[dict] | None) -> dict:
+        """
+        Record the changes that produced `generation`. None means there is no way to get
+        there from the previous generation, so the history is dropped.
+        """
+        if changes is None:
+            for g in self.generations():
+                os.remove(self.path(g))
+        else:
+            body = orjson.dumps({"generation": generation, "previous": generation - 1}) + b"\n"
+            body += b"".join(orjson.dumps(change) + b"\n" for change in changes)
+
+            tmp = self.path(generation) + ".tmp"
+            with open(tmp, "wb") as fi:
+                fi.write(gzip.compress(body, mtime=0))
+            os.replace(tmp, self.path(generation))
+
+        # only the unbroken run ending at this generation is usable
+        generations = self.generations()
+        usable: list[int] = []
+        for g in reversed(generations):
+            if g != generation - len(usable):
+                break
+            usable.append(g)
+        usable = usable[:CHANGESET_HISTORY]
+
+        for g in generations:
+            if g not in usable:
+                os.remove(self.path(g))
+
+        index = {
+            "generation": generation,
+            # oldest generation a client can sync from
+            "since": min(usable) - 1 if usable else generation,
+            "changes": len(changes) if changes is not None else None,
+        }
+        tmp = os.path.join(self.directory, CHANGESET_INDEX + ".tmp")
+        with open(tmp, "w") as fi:
+            json.dump(index, fi)
+        os.replace(tmp, os.path.join(self.directory, CHANGESET_INDEX))
+
+        return index
+
+    def index(self) -> dict | None:
+        path = os.path.join(self.directory, CHANGESET_INDEX)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as fi:
+            return json.loads(fi.read())
+
+    def open(self, generation: int, current: int) -> list[gzip.GzipFile]:
+        """
+        Open the changesets after `generation` up to `current`, in order. Raises
+        FileNotFoundError if one of them was pruned by a newer build. Once open they
+        stay readable even if they are pruned.
+        """
+        files = []
+        try:
+            for g in range(generation + 1, current + 1):
+                files.append(gzip.open(self.path(g), "rb"))
+        except BaseException:
+            for fi in files:
+                fi.close()
+            raise
+        return files
+
+
+def compressedSize(files: list[gzip.GzipFile]) -> int:
+    return sum(os.fstat(fi.fileno()).st_size for fi in files)
+
+
+def readChangesets(files: list[gzip.GzipFile]) -> Iterator[bytes]:
+    """The decompressed contents of opened changesets, closing them when done."""
+    try:
+        for fi in files:
+            while chunk := fi.read(64 * 1024):
+                yield chunk
+    finally:
+        for fi in files:
+            fi.close()
@@ -0,0 +1,188 @@
+import os
+import shutil
+
+from sqlmodel import Session, col, select
+
+from sdk.schema.aggregated.Semester import Semester
+from sdk.schema.sources.ScheduleEntry import ScheduleEntryDB
+from sdk.schema.sources.Section import SectionDB
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+"""
+Columnar (Parquet / Arrow) copies of the sections and schedules.
+
+The Parquet export is partitioned hive style, one file per table and semester:
+
+    columnar/sections/year=2024/term=10/data.parquet
+    columnar/schedules/year=2024/term=10/data.parquet
+
+so it can be read as a whole with partitioning (pandas, pyarrow.dataset, DuckDB's
+read_parquet(..., hive_partitioning=true)) or one semester at a time.
+
+Columns that only have a few distinct values (subject, instructor, room, ...)
+are dictionary encoded and load as categoricals.
+
+pyarrow is optional, without it nothing is written and the arrow route returns 501.
+"""
+
+# (column, arrow type), "dictionary" is a dictionary encoded string
+COLUMNAR_TABLES: dict[str, tuple[type, list[tuple[str, str]]]] = {
+    "sections": (SectionDB, [
+        ("id", "string"),
+        ("year", "int16"),
+        ("term", "int8"),
+        ("crn", "int32"),
+        ("subject", "dictionary"),
+        ("course_code", "dictionary"),
+        ("section", "dictionary"),
+        ("RP", "dictionary"),
+        ("seats", "dictionary"),
+        ("waitlist", "dictionary"),
+        ("credits", "float32"),
+        ("abbreviated_title", "dictionary"),
+        ("add_fees", "float32"),
+        ("rpt_limit", "int8"),
+        ("notes", "string"),
+        ("id_course", "dictionary"),
+        ("seats_open", "int16"),
+        ("waitlist_count", "int16"),
+        ("status", "dictionary"),
+    ]),
+    "schedules": (ScheduleEntryDB, [
+        ("id", "string"),
+        ("id_section", "string"),
+        ("year", "int16"),
+        ("term", "int8"),
+        ("crn", "int32"),
+        ("subject", "dictionary"),
+        ("course_code", "dictionary"),
+        ("type", "dictionary"),
+        ("days", "dictionary"),
+        ("time", "dictionary"),
+        ("start", "dictionary"),
+        ("end", "dictionary"),
+        ("room", "dictionary"),
+        ("instructor", "dictionary"),
+    ]),
+}
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _arrowType(kind: str):
+    if kind == "dictionary":
+        return pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+    return getattr(pyarrow, kind)()
+
+
+def arrowSchema(table: str):
+    _, columns = COLUMNAR_TABLES[table]
+    return pyarrow.schema([(name, _arrowType(kind)) for name, kind in columns])
+
+
+def semesterTable(session: Session, table: str, year: int, term: int):
+    """One semester of a table as a pyarrow.Table."""
+    model, columns = COLUMNAR_TABLES[table]
+
+    statement = select(*[getattr(model, name) for name, _ in columns]).where(
+        model.year == year, model.term == term
+    ).order_by(col(model.id))
+    rows = session.exec(statement).all()
+
+    schema = arrowSchema(table)
+    data = {}
+    for i, field in enumerate(schema):
+        values = [r[i] for r in rows]
+        # enums come back as enum members
+        if pyarrow.types.is_dictionary(field.type):
+            values = [getattr(v, "value", v) for v in values]
+        data[field.name] = pyarrow.array(values, type=field.type)
+
+    return pyarrow.Table.from_pydict(data, schema=schema)
+
+
+def arrowStream(arrow_table) -> bytes:
+    """Arrow IPC stream of a table."""
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, arrow_table.schema) as writer:
+        writer.write_table(arrow_table)
+    return sink.getvalue().to_pybytes()
+
+
+def _writePartition(session: Session, table: str, year: int, term: int, partition: str) -> int:
+    """Write one semester of a table to partition/data.parquet. Returns its size, 0 if there are no rows."""
+    arrow_table = semesterTable(session, table, year, term)
+    if arrow_table.num_rows == 0:
+        return 0
+
+    # the partition columns are in the path
+    arrow_table = arrow_table.drop_columns(["year", "term"])
+
+    os.makedirs(partition)
+    path = os.path.join(partition, "data.parquet")
+    pyarrow.parquet.write_table(arrow_table, path, compression="zstd")
+    return os.path.getsize(path)
+
+
+def _swapDirectory(tmp_directory: str, directory: str, old_directory: str) -> None:
+    # built next to the old copy and swapped in, so readers never see half of it
+    shutil.rmtree(old_directory, ignore_errors=True)
+    os.makedirs(os.path.dirname(old_directory), exist_ok=True)
+    os.makedirs(os.path.dirname(directory), exist_ok=True)
+    if os.path.exists(directory):
+        os.rename(directory, old_directory)
+    if os.path.exists(tmp_directory):
+        os.rename(tmp_directory, directory)
+    shutil.rmtree(old_directory, ignore_errors=True)
+
+
+def writeParquetExport(session: Session, directory: str, semesters: set[tuple[int, int]] | None = None) -> dict[str, int]:
+    """
+    Write every semester of every table to directory, replacing what was there,
+    or only `semesters` if given. Returns the number of files and bytes written.
+    """
+    all_semesters = session.exec(select(Semester.year, Semester.term)).all()
+
+    files = 0
+    size = 0
+    for table in COLUMNAR_TABLES:
+        table_directory = os.path.join(directory, table)
+
+        if semesters is not None and os.path.exists(table_directory):
+            # replace just the partitions of these semesters, built outside the table
+            # directory so readers listing it never see the temporary ones
+            for year, term in semesters:
+                name = os.path.join(f"year={year}", f"term={term}")
+                tmp_partition = os.path.join(table_directory + ".tmp", name)
+                shutil.rmtree(tmp_partition, ignore_errors=True)
+
+                written = _writePartition(session, table, year, term, tmp_partition)
+                _swapDirectory(tmp_partition, os.path.join(table_directory, name), os.path.join(table_directory + ".old", name))
+                if written:
+                    files += 1
+                    size += written
+            shutil.rmtree(table_directory + ".tmp", ignore_errors=True)
+            shutil.rmtree(table_directory + ".old", ignore_errors=True)
+            continue
+
+        tmp_directory = table_directory + ".tmp"
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+
+        for year, term in all_semesters:
+            partition = os.path.join(tmp_directory, f"year={year}", f"term={term}")
+            written = _writePartition(session, table, year, term, partition)
+            if written:
+                files += 1
+                size += written
+
+        os.makedirs(tmp_directory, exist_ok=True)
+        _swapDirectory(tmp_directory, table_directory, table_directory + ".old")
+
+    return {"files": files, "size": size}
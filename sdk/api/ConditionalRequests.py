@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+"""
+ETag / Last-Modified for routes whose response only depends on the database.
+
+Every response of the same database has the same validators, a weak ETag of the
+database version and Last-Modified of its last_updated. So a request with
+If-None-Match or If-Modified-Since can be answered with a 304 before it is
+routed, without touching the database or the cache.
+
+Routes that set a strong ETag of their own keep it.
+"""
+
+
+def httpDate(dt: datetime) -> str:
+    return format_datetime(dt.astimezone(timezone.utc), usegmt=True)
+
+
+def isNotModified(headers: Headers, etag: str, last_modified: datetime | None) -> bool:
+    # If-None-Match wins over If-Modified-Since when both are sent
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # weak comparison, W/"a" matches "a"
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return etag.removeprefix("W/") in tags
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # http dates only have seconds
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+class ConditionalRequestMiddleware:
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        validators: Callable[[], tuple[str, datetime | None] | None],
+        paths: tuple[str, ...] = ("/",),
+        exclude: tuple[str, ...] = (),
+    ) -> None:
+        """validators returns (version, last_updated) of the database currently served, or None."""
+        self.app = app
+        self.validators = validators
+        self.paths = paths
+        self.exclude = exclude
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in ("GET", "HEAD")
+            or not scope["path"].startswith(self.paths)
+            or scope["path"].startswith(self.exclude)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        validators = self.validators()
+        if validators is None:
+            await self.app(scope, receive, send)
+            return
+
+        version, last_updated = validators
+        etag = f'W/"{version}"'
+        validator_headers = {"etag": etag}
+        if last_updated is not None:
+            validator_headers["last-modified"] = httpDate(last_updated)
+
+        if isNotModified(Headers(scope=scope), etag, last_updated):
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(k.encode(), v.encode()) for k, v in validator_headers.items()],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_validators(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = MutableHeaders(scope=message)
+                # fastapi-cache sets a weak per-process hash, replace it
+                if "etag" not in headers or headers["etag"].startswith("W/"):
+                    headers["etag"] = etag
+                if "last-modified" not in headers and "last-modified" in validator_headers:
+                    headers["last-modified"] = validator_headers["last-modified"]
+            await send(message)
+
+        await self.app(scope, receive, send_with_validators)
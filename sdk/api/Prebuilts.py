@@ -0,0 +1,173 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import orjson
+from sqlmodel import SQLModel
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+"""
+Static, precompressed copies of the read heavy API responses.
+
+Every response is written once per aggregation as <name>.<hash>.json together
+with a .json.gz (and .json.br if brotli is installed) next to it. The hash is of
+the content, so a file never changes once written and can be served with
+immutable caching by the api or any CDN. manifest.json maps each api route to its
+current file and is the only thing that has to be revalidated.
+
+Files whose content didn't change keep their name and aren't rewritten, and
+routes whose data didn't change can keep their file without being rendered.
+"""
+
+PREBUILT_MANIFEST = "manifest.json"
+
+# names in the manifest, anything else is rejected when serving
+PREBUILT_FILE_PATTERN = re.compile(r"^[A-Za-z0-9_\-]+\.[0-9a-f]{16}\.json(\.gz|\.br)?$")
+
+
+class PrebuiltWriter:
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self.files: dict[str, dict] = {}
+        self.written = 0
+
+        self.previous = loadPrebuiltManifest(directory)
+
+    def add(self, route: str, content: SQLModel | bytes) -> None:
+        """Write the response of `route`, either a response model or already encoded JSON."""
+        if isinstance(content, SQLModel):
+            body = orjson.dumps(content.model_dump(mode="json"))
+        else:
+            body = content
+
+        digest = hashlib.sha256(body).hexdigest()
+        name = re.sub(r"[^A-Za-z0-9_]+", "-", route.removeprefix("/v1/")).strip("-")
+        file = f"{name}.{digest[:16]}.json"
+
+        encodings = ["gzip"]
+        if brotli is not None:
+            encodings.append("br")
+
+        path = os.path.join(self.directory, file)
+        # same name means same content, nothing to do
+        if not os.path.exists(path):
+            self._write(path + ".gz", gzip.compress(body, compresslevel=9, mtime=0))
+            if brotli is not None:
+                self._write(path + ".br", brotli.compress(body, quality=11))
+            # the plain file goes last, it marks the set as complete
+            self._write(path, body)
+            self.written += 1
+
+        self.files[route] = {
+            "file": file,
+            "sha256": digest,
+            "size": len(body),
+            "encodings": encodings,
+        }
+
+    def keep(self, route: str) -> bool:
+        """
+        Keep the file `route` has in the current manifest instead of writing it again,
+        for content that didn't change. Returns False if there is no file to keep.
+        """
+        if self.previous is None or route not in self.previous["files"]:
+            return False
+        entry = self.previous["files"][route]
+        if not os.path.exists(os.path.join(self.directory, entry["file"])):
+            return False
+        self.files[route] = entry
+        return True
+
+    def finish(self) -> dict:
+        """Publish the manifest and remove files no longer referenced by it or the one before it."""
+        manifest_path = os.path.join(self.directory, PREBUILT_MANIFEST)
+
+        # clients may still hold the previous manifest, keep its files around for one more round
+        keep = {f["file"] for f in self.files.values()}
+        if self.previous is not None:
+            keep.update(f["file"] for f in self.previous["files"].values())
+
+        manifest = {
+            "generated": datetime.now().isoformat(),
+            "files": self.files,
+        }
+        self._write(manifest_path, json.dumps(manifest, indent=1).encode())
+
+        removed = 0
+        for file in os.listdir(self.directory):
+            if not PREBUILT_FILE_PATTERN.match(file):
+                continue
+            base = re.sub(r"\.(gz|br)$", "", file)
+            if base not in keep:
+                os.remove(os.path.join(self.directory, file))
+                removed += 1
+
+        manifest["removed"] = removed
+        return manifest
+
+    def _write(self, path: str, data: bytes) -> None:
+        # write then rename so a file is never seen half written
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as fi:
+            fi.write(data)
+        os.replace(tmp, path)
+
+
+def loadPrebuiltManifest(directory: str) -> dict | None:
+    path = os.path.join(directory, PREBUILT_MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as fi:
+        return json.loads(fi.read())
+
+
+def compressFile(path: str) -> dict[str, int]:
+    """
+    Write path.gz and, if zstandard is installed, path.zst next to a file.
+    Returns the size of each by encoding.
+
+    zstd runs on every core, gzip is single threaded but zlib lets go of the GIL
+    so both run at the same time.
+    """
+    def writeGzip() -> int:
+        # name the real file and leave the time out of the header, so gunzip -N
+        # restores the right name and the same database compresses to the same bytes
+        with open(path, "rb") as file_read, open(path + ".gz.tmp", "wb") as file_tmp:
+            with gzip.GzipFile(filename=os.path.basename(path), mode="wb", compresslevel=6, fileobj=file_tmp, mtime=0) as file_write:
+                shutil.copyfileobj(file_read, file_write, 1024 * 1024)
+        os.replace(path + ".gz.tmp", path + ".gz")
+        return os.path.getsize(path + ".gz")
+
+    def writeZstd() -> int:
+        compressor = zstandard.ZstdCompressor(level=10, threads=-1)
+        with open(path, "rb") as file_read:
+            with open(path + ".zst.tmp", "wb") as file_write:
+                compressor.copy_stream(file_read, file_write)
+        os.replace(path + ".zst.tmp", path + ".zst")
+        return os.path.getsize(path + ".zst")
+
+    jobs = {"gzip": writeGzip}
+    if zstandard is not None:
+        jobs["zstd"] = writeZstd
+
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = {encoding: pool.submit(job) for encoding, job in jobs.items()}
+        return {encoding: future.result() for encoding, future in futures.items()}
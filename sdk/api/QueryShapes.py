@@ -0,0 +1,88 @@
+import base64
+import fcntl
+import json
+import os
+import threading
+
+from sqlalchemy import Engine, event
+
+
+"""
+Records the SELECT statements a process runs, for benchmarks/index_advisor.py.
+
+Statements are counted by their SQL text (the "shape", parameters are
+placeholders), and the first few parameter sets of each shape are kept so the
+advisor can replay them. Set QUERY_SHAPES_FILE to turn recording on, the api (every
+worker) and the backend all merge what they saw into that file, one at a time.
+"""
+
+QUERY_SHAPES_ENV = "QUERY_SHAPES_FILE"
+
+# parameter sets kept per shape
+QUERY_SHAPE_SAMPLES = 5
+
+
+def _encodeValue(value):
+    if isinstance(value, bytes):
+        return {"$bytes": base64.b64encode(value).decode()}
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return str(value)
+
+
+def decodeParameters(parameters: list) -> tuple:
+    return tuple(
+        base64.b64decode(p["$bytes"]) if isinstance(p, dict) and "$bytes" in p else p
+        for p in parameters
+    )
+
+
+def loadQueryShapes(path: str) -> dict[str, dict]:
+    """sql -> {"count": n, "parameters": [[...], ...]}"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "rb") as fi:
+        return json.loads(fi.read())
+
+
+class QueryShapeRecorder:
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.shapes: dict[str, dict] = {}
+        self.lock = threading.Lock()
+
+    def attach(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, connection, cursor, statement: str, parameters, context, executemany: bool) -> None:
+        if executemany or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            return
+
+        with self.lock:
+            shape = self.shapes.setdefault(statement, {"count": 0, "parameters": []})
+            shape["count"] += 1
+            if len(shape["parameters"]) < QUERY_SHAPE_SAMPLES:
+                shape["parameters"].append([_encodeValue(p) for p in (parameters or ())])
+
+    def save(self) -> int:
+        """Merge what was recorded since the last save into the file. Returns the number of shapes in it."""
+        with self.lock:
+            recorded, self.shapes = self.shapes, {}
+
+        # other processes save to the same file, without the lock they'd overwrite each other's counts.
+        # the file itself is replaced on every save so the lock is on a file next to it
+        with open(self.path + ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            shapes = loadQueryShapes(self.path)
+            for statement, new in recorded.items():
+                shape = shapes.setdefault(statement, {"count": 0, "parameters": []})
+                shape["count"] += new["count"]
+                shape["parameters"] = (shape["parameters"] + new["parameters"])[:QUERY_SHAPE_SAMPLES]
+
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as fi:
+                json.dump(shapes, fi, indent=1)
+            os.replace(tmp, self.path)
+            return len(shapes)
@@ -0,0 +1,85 @@
+import hashlib
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlmodel import Session, col, select
+
+from sdk.schema.aggregated.CourseMax import CourseMaxDB
+from sdk.schema.aggregated.Metadata import Metadata
+from sdk.schema.aggregated.Semester import Semester
+from sdk.schema.sources.Section import SectionDB
+from sdk.schema.sources.Transfer import TransferDB
+
+
+"""
+Small lookup tables that only change when the database does.
+
+Routes used to query these on every request just to validate their parameters
+(is this a known transfer destination, does this semester exist, which one is the
+latest). They are loaded once per snapshot instead, next to the engine, and
+checked with set lookups.
+"""
+class ReferenceCatalog:
+
+    def __init__(self) -> None:
+        # destination code -> full name, ordered by name
+        self.destinations: dict[str, str] = {}
+
+        # (year, term), newest first
+        self.semesters: list[tuple[int, int]] = []
+        self.semester_set: set[tuple[int, int]] = set()
+        self.latest_semester: tuple[int, int] | None = None
+
+        # subjects with at least one section / every subject
+        self.subjects: list[str] = []
+        self.all_subjects: list[str] = []
+
+        # tables in this database, generated tables may be missing from older ones
+        self.tables: set[str] = set()
+
+        # changes whenever the metadata does, which the backend updates after every update
+        self.version: str = ""
+        self.last_updated: datetime | None = None
+
+    @classmethod
+    def build(cls, session: Session) -> "ReferenceCatalog":
+        catalog = cls()
+
+        statement = select(TransferDB.destination, TransferDB.destination_name).distinct().order_by(TransferDB.destination_name)
+        for code, name in session.exec(statement).all():
+            catalog.destinations.setdefault(code, name)
+
+        statement = select(Semester.year, Semester.term).order_by(col(Semester.year).desc(), col(Semester.term).desc())
+        catalog.semesters = [(year, term) for year, term in session.exec(statement).all()]
+        catalog.semester_set = set(catalog.semesters)
+        if catalog.semesters:
+            catalog.latest_semester = catalog.semesters[0]
+
+        catalog.subjects = list(session.exec(select(SectionDB.subject).distinct().order_by(SectionDB.subject)).all())
+        catalog.all_subjects = list(session.exec(select(CourseMaxDB.subject).distinct().order_by(CourseMaxDB.subject)).all())
+
+        catalog.tables = set(session.exec(text("SELECT name FROM sqlite_master WHERE type = 'table'")).scalars().all())
+
+        metadata = sorted((m.field, m.value) for m in session.exec(select(Metadata)).all())
+        catalog.version = hashlib.sha1(repr(metadata).encode()).hexdigest()[:16]
+        for field, value in metadata:
+            if field == "last_updated" and value:
+                try:
+                    last_updated = datetime.fromisoformat(value)
+                except ValueError:
+                    continue
+                # written with utcnow()
+                if last_updated.tzinfo is None:
+                    last_updated = last_updated.replace(tzinfo=timezone.utc)
+                catalog.last_updated = last_updated
+
+        return catalog
+
+    def is_destination(self, code: str) -> bool:
+        return code in self.destinations
+
+    def has_semester(self, year: int, term: int) -> bool:
+        return (year, term) in self.semester_set
+
+    def has_table(self, name: str) -> bool:
+        return name in self.tables
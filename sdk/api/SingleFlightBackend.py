@@ -0,0 +1,179 @@
+import asyncio
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi_cache import decorator
+from fastapi_cache.backends.inmemory import InMemoryBackend, Value
+
+
+"""
+In-memory cache backend that coalesces concurrent cache misses.
+
+fastapi-cache asks the backend for a key and, on a miss, runs the route and
+calls set(). On a cold cache (first boot or right after a refresh) a burst of
+identical requests would all miss and all run the same heavy query.
+
+Here the first request to miss a key gets a "lease" on it. Every other request
+for that key waits until the lease holder calls set() and then reads the fresh
+value. Routes are cached with cache() from this module, which drops the leases a
+call took as soon as that call returns or raises, even if one task runs many
+routes one after another. So if the route fails (404, 500, a response that can't
+be cached, ...) the waiting requests fall back to running the route themselves.
+Leases taken outside of cache() are dropped when the task that took them finishes.
+
+If stale_ttl is set, expired entries are kept around for that many extra seconds.
+While one request is revalidating an expired key, everyone else is served the
+stale value immediately instead of waiting.
+"""
+
+# leases taken by the cache() call that is running, None outside of one
+_call_leases: ContextVar[Optional[list[tuple["SingleFlightBackend", str, "_Lease"]]]] = ContextVar("single_flight_leases", default=None)
+
+
+def cache(*args, **kwargs) -> Callable:
+    """fastapi_cache's cache() decorator that releases the leases of a call when the call is done."""
+    def wrapper(func: Callable) -> Callable:
+        cached = decorator.cache(*args, **kwargs)(func)
+
+        @wraps(cached)
+        async def inner(*call_args, **call_kwargs):
+            leases: list[tuple[SingleFlightBackend, str, _Lease]] = []
+            token = _call_leases.set(leases)
+            try:
+                return await cached(*call_args, **call_kwargs)
+            finally:
+                _call_leases.reset(token)
+                # a no-op for leases that set() already released
+                for backend, key, lease in leases:
+                    backend._release_lease(key, lease)
+
+        return inner
+    return wrapper
+
+
+class SingleFlightBackend(InMemoryBackend):
+
+    def __init__(self, stale_ttl: int = 0, wait_timeout: float = 30) -> None:
+        # InMemoryBackend keeps these at class level, give each backend its own
+        self._store: Dict[str, Value] = {}
+        self._lock = asyncio.Lock()
+
+        self._inflight: Dict[str, "_Lease"] = {}
+
+        self.stale_ttl = stale_ttl
+        self.wait_timeout = wait_timeout
+
+    def _get_with_stale(self, key: str) -> tuple[Optional[Value], bool]:
+        # returns (value, is_fresh)
+        v = self._store.get(key)
+        if v is None:
+            return None, False
+
+        if v.ttl_ts >= self._now:
+            return v, True
+
+        if v.ttl_ts + self.stale_ttl >= self._now:
+            return v, False
+
+        del self._store[key]
+        return None, False
+
+    def _get(self, key: str) -> Optional[Value]:
+        v, fresh = self._get_with_stale(key)
+        return v if fresh else None
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        async with self._lock:
+            v, fresh = self._get_with_stale(key)
+            if fresh:
+                return v.ttl_ts - self._now, v.data
+
+            lease = self._inflight.get(key)
+
+            # nobody is computing this key: the caller becomes the lease holder
+            if lease is None:
+                self._take_lease(key)
+                return 0, None
+
+            # somebody is already revalidating, hand out the old value meanwhile
+            if v is not None:
+                return 0, v.data
+
+        # wait for the lease holder to finish
+        try:
+            await asyncio.wait_for(asyncio.shield(lease.done.wait()), self.wait_timeout)
+        except asyncio.TimeoutError:
+            return 0, None
+
+        async with self._lock:
+            v, fresh = self._get_with_stale(key)
+            if fresh:
+                return v.ttl_ts - self._now, v.data
+
+        # lease holder failed, compute it ourselves rather than queueing up behind each other
+        return 0, None
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        async with self._lock:
+            self._store[key] = Value(value, self._now + (expire or 0))
+            self._release_lease(key)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        count = 0
+        async with self._lock:
+            if key:
+                keys = [key] if key in self._store else []
+            elif namespace is not None:
+                # FastAPICache.clear() passes the (possibly empty) prefix as the namespace
+                keys = [k for k in self._store.keys() if k.startswith(namespace)]
+            else:
+                keys = []
+
+            for k in keys:
+                if self.stale_ttl > 0:
+                    # keep the old value around so it can be served while the key is revalidated
+                    self._store[k].ttl_ts = min(self._store[k].ttl_ts, self._now - 1)
+                else:
+                    del self._store[k]
+                count += 1
+
+        return count
+
+    async def drop(self, prefix: str) -> int:
+        """Delete every entry whose key starts with prefix, without keeping it around as stale."""
+        async with self._lock:
+            keys = [k for k in self._store.keys() if k.startswith(prefix)]
+            for k in keys:
+                del self._store[k]
+        return len(keys)
+
+    def _take_lease(self, key: str) -> None:
+        lease = _Lease()
+        self._inflight[key] = lease
+
+        # if the call ends without calling set(), free everyone waiting on it
+        leases = _call_leases.get()
+        if leases is not None:
+            leases.append((self, key, lease))
+            return
+
+        task = asyncio.current_task()
+        if task is not None:
+            task.add_done_callback(lambda _: self._release_lease(key, lease))
+
+    def _release_lease(self, key: str, lease: Optional["_Lease"] = None) -> None:
+        current = self._inflight.get(key)
+        if current is None:
+            return
+        # a done callback from an old request must not release a newer lease
+        if lease is not None and current is not lease:
+            return
+
+        del self._inflight[key]
+        current.done.set()
+
+
+class _Lease:
+    def __init__(self) -> None:
+        self.done = asyncio.Event()
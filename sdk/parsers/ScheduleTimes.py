@@ -0,0 +1,110 @@
+import re
+
+
+"""
+Weekly occupancy bitmasks for schedule entries.
+
+The days ("M-W----") and time ("1030-1220") of a schedule entry are turned into
+one integer with a bit for every 15 minute slot of the week: bit
+(day * 96 + slot) is set if the entry meets then. Days are in the same order as
+the days column (MTWRFSU).
+
+OR-ing the masks of every entry of a section gives the section's weekly
+schedule. Questions like "only meets tue/thu after 15:00" become
+`mask & ~window == 0`, and two sections conflict if `a & b != 0`.
+"""
+
+DAYS = "MTWRFSU"
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+# size of a stored mask, 7 * 96 bits
+MASK_BYTES = len(DAYS) * SLOTS_PER_DAY // 8
+
+
+def parseClockTime(hhmm: str, round_up: bool = False) -> int:
+    """Slot of a HHMM time. Raises ValueError if it isn't one."""
+    if not re.fullmatch(r"\d{4}", hhmm):
+        raise ValueError(f"Invalid time {hhmm}, expected HHMM.")
+
+    hours, minutes = int(hhmm[:2]), int(hhmm[2:])
+    if hours > 24 or minutes > 59 or (hours == 24 and minutes > 0):
+        raise ValueError(f"Invalid time {hhmm}, expected HHMM.")
+
+    slot, rem = divmod(hours * 60 + minutes, SLOT_MINUTES)
+    if round_up and rem:
+        slot += 1
+    return slot
+
+
+def parseDays(days: str) -> list[int]:
+    """
+    Day numbers (0 = monday) of either the days column ("M-W----")
+    or a list of day letters ("TR"). Raises ValueError otherwise.
+    """
+    days = days.strip().upper()
+
+    if len(days) == len(DAYS) and "-" in days:
+        out = []
+        for i, c in enumerate(days):
+            if c == "-":
+                continue
+            if c != DAYS[i]:
+                raise ValueError(f"Invalid days {days}.")
+            out.append(i)
+        return out
+
+    if not days or any(c not in DAYS for c in days):
+        raise ValueError(f"Invalid days {days}, expected letters from {DAYS}.")
+    return sorted({DAYS.index(c) for c in days})
+
+
+def windowMask(days: list[int], start_slot: int = 0, end_slot: int = SLOTS_PER_DAY) -> int:
+    """Mask of the slots from start_slot up to (not including) end_slot on the given days."""
+    if end_slot <= start_slot:
+        return 0
+
+    day_mask = ((1 << (end_slot - start_slot)) - 1) << start_slot
+    mask = 0
+    for day in days:
+        mask |= day_mask << (day * SLOTS_PER_DAY)
+    return mask
+
+
+def scheduleMask(days: str, time: str) -> int:
+    """
+    Mask of a single schedule entry. Entries without a fixed weekly time
+    (online, TBA, "-") give 0.
+    """
+    if not days or not time:
+        return 0
+
+    m = re.fullmatch(r"\s*(\d{4})\s*-\s*(\d{4})\s*", time)
+    if not m:
+        return 0
+
+    try:
+        day_numbers = parseDays(days)
+        start = parseClockTime(m.group(1))
+        end = parseClockTime(m.group(2), round_up=True)
+    except ValueError:
+        return 0
+
+    return windowMask(day_numbers, start, end)
+
+
+def maskToBytes(mask: int) -> bytes:
+    return mask.to_bytes(MASK_BYTES, "little")
+
+
+def maskFromBytes(data: bytes | None) -> int:
+    if not data:
+        return 0
+    return int.from_bytes(data, "little")
+
+
+def maskWithin(mask: bytes | None, window: bytes) -> int:
+    # registered as a sqlite function: 1 if the section meets and only inside the window
+    m = maskFromBytes(mask)
+    return int(m != 0 and m & ~maskFromBytes(window) == 0)
@@ -2,11 +2,13 @@ from bs4 import BeautifulSoup
 import lxml
 import cchardet
 
+import re
 import unicodedata
 import datetime
+from typing import Optional
 
-from sdk.schema.sources.Section import SectionDB
-from sdk.schema.sources.ScheduleEntry import ScheduleEntryDB
+from sdk.schema.sources.Section import SectionDB, SectionStatus, sectionKey
+from sdk.schema.sources.ScheduleEntry import ScheduleEntryDB, scheduleEntryId
 
 
 import logging
@@ -131,6 +133,9 @@ def parseSemesterHTML(html:str) -> tuple[list[SectionDB], list[ScheduleEntryDB]]
             RP          = rp,
             seats       = rawdata[i+1],
             waitlist    = rawdata[i+2],
+            seats_open  = parseCount(rawdata[i+1]),
+            waitlist_count = parseCount(rawdata[i+2]),
+            status      = parseSectionStatus(rawdata[i+1]),
             # skip the select column
             crn         = crn,
             section     = rawdata[i+7],
@@ -148,6 +153,7 @@ def parseSemesterHTML(html:str) -> tuple[list[SectionDB], list[ScheduleEntryDB]]
             course_code = course_code,
             year=year,
             term=term,
+            section_key=sectionKey(year, term, crn),
         )
         
         if sectionNotes != None:
@@ -160,7 +166,8 @@ def parseSemesterHTML(html:str) -> tuple[list[SectionDB], list[ScheduleEntryDB]]
         sections.append(current_course)
         i += 12
         
-        schedule_count = 0
+        # ids already used in this section
+        schedule_ids: set[str] = set()
         
         while True:
             
@@ -169,10 +176,6 @@ def parseSemesterHTML(html:str) -> tuple[list[SectionDB], list[ScheduleEntryDB]]
                 raise Exception(f"Parsing error: unexpected course type found: {rawdata[i]}. {current_course} in course {current_course.toJSON()}")
                                     
             c = ScheduleEntryDB(
-                # SCHD-subj-code-year-term-crn-section_number
-                # SCHD-ENGL-1123-2024-30-31005-1
-                id = f'SCHD-{subject}-{course_code}-{year}-{term}-{crn}-{schedule_count}',
-                
                 subject    = subject,
                 course_code= course_code,
                 year       = year,
@@ -189,15 +192,19 @@ def parseSemesterHTML(html:str) -> tuple[list[SectionDB], list[ScheduleEntryDB]]
                 
                 id_course=f'CRSE-{subject}-{course_code}',
                 id_semester=f'SMTR-{year}-{term}',
-                id_section=f'SECT-{subject}-{course_code}-{year}-{term}-{crn}'
+                id_section=f'SECT-{subject}-{course_code}-{year}-{term}-{crn}',
+                section_key=current_course.section_key,
             )
-            schedule_count += 1
             
             if c.start.isspace():
                 c.start = None
             if c.end.isspace():
                 c.end = None
             
+            # SCHD-subj-code-year-term-crn-digest
+            # SCHD-ENGL-1123-2024-30-31005-d7f5fa75
+            c.id = scheduleEntryId(c.id_section, c.type, c.days, c.time, c.start, c.end, schedule_ids)
+            
             schedules.append(c)
             i += 7
             
@@ -248,6 +255,28 @@ def formatProp(s:str) -> str | int | float:
             return s.strip()
 
 
+# "12" -> 12, "Inact", "N/A", " " -> None
+def parseCount(s: Optional[str]) -> Optional[int]:
+    if s is None:
+        return None
+    m = re.fullmatch(r"\s*([+-]?\d+)\s*", s)
+    return int(m.group(1)) if m else None
+
+# status of a section from its seats column
+def parseSectionStatus(seats: Optional[str]) -> Optional[SectionStatus]:
+    if seats is None:
+        return None
+    if seats.strip() == "Cancel":
+        return SectionStatus.CANCELLED
+    if seats.strip() == "Inact":
+        return SectionStatus.INACTIVE
+    
+    count = parseCount(seats)
+    if count is not None and count > 0:
+        return SectionStatus.OPEN
+    return SectionStatus.FULL
+
+
 # converts date from "11-Apr-23" to "2023-04-11" (ISO 8601)
 def formatDate(date:str, year:int) -> datetime.date:
     if date == None:
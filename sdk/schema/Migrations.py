@@ -0,0 +1,303 @@
+import logging
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Callable, Iterable
+
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlmodel import Field, SQLModel
+
+from sdk.parsers.SemesterParser import parseCount, parseSectionStatus
+from sdk.schema.sources.Section import sectionKey
+from sdk.schema.sources.ScheduleEntry import scheduleEntryId
+
+
+"""
+Schema migrations keyed on the db_version metadata field.
+
+create_all only creates tables that don't exist yet, so columns, indexes and
+derived data added to an existing table have to be added here instead of
+rebuilding the database. Every migration upgrades the database from
+version - 1 to version. Migrations run in order, each in its own transaction
+together with the db_version update, so a failed migration leaves the database
+at the last version that succeeded.
+
+Backfills are the exception, they commit every MIGRATION_BATCH_SIZE rows so
+they don't hold the write lock (and keep the WAL from being checkpointed) for
+the whole table. A migration that commits part way has to be safe to run again,
+and db_version is still only updated with its last batch.
+
+A new database is created by create_all at the latest schema and is stamped
+with LATEST_DB_VERSION without running anything.
+
+To change the schema, change the model and add a migration with the next
+version that does the same to an existing database.
+"""
+
+logger = logging.getLogger("LangaraCourseWatcherScraper")
+
+# rows read and written at a time by backfills
+MIGRATION_BATCH_SIZE = 5000
+
+
+class SchemaMigration(SQLModel, table=True):
+    version: int            = Field(primary_key=True, description="db_version after the migration.")
+    description: str        = Field(description="What the migration did.")
+    applied_at: str         = Field(description="When the migration finished (UTC).")
+    duration_ms: int        = Field(description="How long the migration took.")
+    rows: int               = Field(default=0, description="Rows backfilled.")
+
+
+class Migration:
+    def __init__(self, version: int, description: str, apply: Callable[[sqlite3.Connection], int | None]) -> None:
+        """apply runs inside the migration's transaction and returns the number of rows it backfilled."""
+        self.version = version
+        self.description = description
+        self.apply = apply
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version: int, description: str):
+    def register(apply: Callable[[sqlite3.Connection], int | None]):
+        # versions 1 and 2 are from before migrations
+        assert version == len(MIGRATIONS) + 3, f"migration {version} is out of order"
+        MIGRATIONS.append(Migration(version, description, apply))
+        return apply
+    return register
+
+
+def columns(connection: sqlite3.Connection, table: str) -> set[str]:
+    return {r[1] for r in connection.execute(f"PRAGMA table_info({table})")}
+
+
+def createIndexes(connection: sqlite3.Connection, *names: str) -> None:
+    """Create indexes declared on the models by name, if they don't exist."""
+    indexes = {index.name: index for table in SQLModel.metadata.tables.values() for index in table.indexes}
+    for name in names:
+        ddl = CreateIndex(indexes[name], if_not_exists=True).compile(dialect=sqlite.dialect())
+        connection.execute(str(ddl))
+
+
+def commitBatch(connection: sqlite3.Connection) -> None:
+    """Commit what the migration did so far and continue in a new transaction."""
+    connection.execute("COMMIT")
+    connection.execute("BEGIN IMMEDIATE")
+
+
+def backfillInBatches(
+    connection: sqlite3.Connection,
+    table: str,
+    key: str,
+    read: list[str],
+    write: list[str],
+    convert: Callable[[tuple], tuple],
+) -> int:
+    """
+    Set the `write` columns of every row of table to convert(values of the `read`
+    columns), MIGRATION_BATCH_SIZE rows at a time in the order of `key`, each
+    batch in its own transaction. Rows that already have a value in one of the
+    `write` columns are skipped, so a backfill that was interrupted continues
+    where it stopped. Returns the number of rows updated.
+    """
+    pending = " AND ".join(f"{c} IS NULL" for c in write)
+    select_sql = f"SELECT {key}, {', '.join(read)} FROM {table} WHERE {key} > ? AND {pending} ORDER BY {key} LIMIT {MIGRATION_BATCH_SIZE}"
+    update_sql = f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in write)} WHERE {key} = ?"
+
+    updated = 0
+    last = ""
+    while True:
+        rows = connection.execute(select_sql, (last,)).fetchall()
+        if not rows:
+            return updated
+        connection.executemany(update_sql, [(*convert(row[1:]), row[0]) for row in rows])
+        commitBatch(connection)
+        updated += len(rows)
+        last = rows[-1][0]
+
+
+def rebuildTable(connection: sqlite3.Connection, name: str, expressions: dict[str, str] | None = None) -> int:
+    """
+    Recreate a table as its model defines it now, for changes ALTER TABLE can't
+    make (primary key, WITHOUT ROWID, ...), and recreate its indexes. Columns
+    the old table doesn't have are filled from `expressions` (column -> SQL over
+    the old columns). Returns the number of rows copied.
+    """
+    table = SQLModel.metadata.tables[name]
+    expressions = expressions or {}
+    old = f"{name}_old"
+
+    connection.execute(f"ALTER TABLE {name} RENAME TO {old}")
+    # the old indexes keep their names after the rename
+    for (index,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (old,)).fetchall():
+        connection.execute(f'DROP INDEX "{index}"')
+
+    connection.execute(str(CreateTable(table).compile(dialect=sqlite.dialect())))
+
+    old_columns = columns(connection, old)
+    targets = [c.name for c in table.columns if c.name in old_columns or c.name in expressions]
+    sources = [f'"{c}"' if c in old_columns else expressions[c] for c in targets]
+    quoted = [f'"{c}"' for c in targets]
+    rows = connection.execute(f"INSERT INTO {name} ({', '.join(quoted)}) SELECT {', '.join(sources)} FROM {old}").rowcount
+
+    connection.execute(f"DROP TABLE {old}")
+    createIndexes(connection, *[index.name for index in table.indexes])
+    return rows
+
+
+@migration(3, "Add typed seat, waitlist and status columns to sectiondb")
+def _sectionStatusColumns(connection: sqlite3.Connection) -> int:
+    existing = columns(connection, "sectiondb")
+    for column, column_type in (("seats_open", "INTEGER"), ("waitlist_count", "INTEGER"), ("status", "VARCHAR(9)")):
+        if column not in existing:
+            connection.execute(f"ALTER TABLE sectiondb ADD COLUMN {column} {column_type}")
+
+    # same functions as the parser so old and new rows agree
+    def convert(values: tuple) -> tuple:
+        seats, waitlist = values
+        status = parseSectionStatus(seats)
+        return (parseCount(seats), parseCount(waitlist), status.name if status else None)
+
+    rows = backfillInBatches(connection, "sectiondb", "id", ["seats", "waitlist"], ["seats_open", "waitlist_count", "status"], convert)
+    createIndexes(connection, "ix_sectiondb_year_term_status_waitlist")
+    return rows
+
+
+@migration(4, "Add composite indexes for the section, schedule, course and transfer lookups")
+def _compositeIndexes(connection: sqlite3.Connection) -> None:
+    createIndexes(
+        connection,
+        "ix_sectiondb_subject_course_code_year_term",
+        "ix_sectiondb_year_term_crn",
+        "ix_scheduleentrydb_year_term_crn",
+        "ix_coursesummarydb_subject_course_code_year_term",
+        "ix_courseattributedb_subject_course_code_year_term",
+        "ix_transferdb_subject_course_code_destination_credit",
+        "ix_semester_year_term",
+    )
+
+
+@migration(5, "Join sections, schedule entries and section times on an integer key")
+def _sectionKeys(connection: sqlite3.Connection) -> int:
+    rows = 0
+    for table in ("sectiondb", "scheduleentrydb"):
+        if "section_key" not in columns(connection, table):
+            connection.execute(f"ALTER TABLE {table} ADD COLUMN section_key INTEGER")
+        rows += backfillInBatches(connection, table, "id", ["year", "term", "crn"], ["section_key"], lambda values: (sectionKey(*values),))
+    createIndexes(connection, "ix_sectiondb_section_key", "ix_scheduleentrydb_section_key")
+    # replaced by ix_scheduleentrydb_section_key
+    connection.execute("DROP INDEX IF EXISTS ix_scheduleentrydb_id_section")
+
+    # keyed by section_key instead of the section id
+    rows += rebuildTable(connection, "sectiontimesdb", {
+        "section_key": "(SELECT section_key FROM sectiondb WHERE sectiondb.id = sectiontimesdb_old.id)",
+    })
+    # WITHOUT ROWID
+    rows += rebuildTable(connection, "coursetransferdestinationdb")
+    return rows
+
+
+@migration(6, "Derive schedule entry ids from their content instead of their position")
+def _scheduleEntryIds(connection: sqlite3.Connection) -> int:
+    # a section's entries have to be numbered together, so batches are whole sections.
+    # running this again over sections that were already done numbers them the same
+    # way (the -2, -3 suffixes sort after the first id) and changes nothing
+    updated = 0
+    last = 0
+    while True:
+        keys = connection.execute(
+            f"SELECT DISTINCT section_key FROM scheduleentrydb WHERE section_key > ? ORDER BY section_key LIMIT {MIGRATION_BATCH_SIZE}",
+            (last,),
+        ).fetchall()
+        if not keys:
+            return updated
+        
+        # old ids end with the position, duplicates are numbered in the order they were listed
+        rows = connection.execute(
+            """SELECT id, section_key, id_section, type, days, time, start, "end" FROM scheduleentrydb
+            WHERE section_key BETWEEN ? AND ? ORDER BY section_key, length(id), id""",
+            (keys[0][0], keys[-1][0]),
+        ).fetchall()
+        
+        updates = []
+        taken: dict[int, set[str]] = {}
+        for id, section_key, id_section, type, days, time, start, end in rows:
+            new_id = scheduleEntryId(id_section, type, days, time, start, end, taken.setdefault(section_key, set()))
+            if new_id != id:
+                updates.append((new_id, id))
+        connection.executemany("UPDATE scheduleentrydb SET id = ? WHERE id = ?", updates)
+        commitBatch(connection)
+        
+        updated += len(updates)
+        last = keys[-1][0]
+
+
+LATEST_DB_VERSION = MIGRATIONS[-1].version
+
+
+def readDbVersion(connection: sqlite3.Connection) -> int | None:
+    row = connection.execute("SELECT value FROM metadata WHERE field = 'db_version'").fetchone()
+    return int(row[0]) if row else None
+
+
+def _setDbVersion(connection: sqlite3.Connection, version: int) -> None:
+    connection.execute(
+        "INSERT INTO metadata (field, value) VALUES ('db_version', ?) ON CONFLICT (field) DO UPDATE SET value = excluded.value",
+        (str(version),),
+    )
+
+
+def runMigrations(db_path: str, migrations: Iterable[Migration] = MIGRATIONS, timeout: float = 5.0) -> list[SchemaMigration]:
+    """
+    Bring the database at db_path up to LATEST_DB_VERSION. Expects create_all to
+    have run already. Returns the migrations that were applied.
+    """
+    # autocommit mode, transactions are started explicitly so DDL is part of them
+    connection = sqlite3.connect(db_path, isolation_level=None, timeout=timeout)
+    applied: list[SchemaMigration] = []
+    try:
+        current = readDbVersion(connection)
+        if current is None:
+            # a new database is created at the latest schema
+            _setDbVersion(connection, LATEST_DB_VERSION)
+            return applied
+
+        for m in migrations:
+            if m.version <= current:
+                continue
+
+            logger.info(f"Migrating database to version {m.version}: {m.description}...")
+            start = time.perf_counter()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = m.apply(connection) or 0
+                duration_ms = round((time.perf_counter() - start) * 1000)
+
+                record = SchemaMigration(
+                    version=m.version,
+                    description=m.description,
+                    applied_at=datetime.now(timezone.utc).isoformat(),
+                    duration_ms=duration_ms,
+                    rows=rows,
+                )
+                connection.execute(
+                    "INSERT OR REPLACE INTO schemamigration (version, description, applied_at, duration_ms, rows) VALUES (?, ?, ?, ?, ?)",
+                    (record.version, record.description, record.applied_at, record.duration_ms, record.rows),
+                )
+                _setDbVersion(connection, m.version)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+            applied.append(record)
+            current = m.version
+            logger.info(f"Migrated database to version {m.version} in {duration_ms}ms ({rows} rows).")
+
+        if applied:
+            connection.execute("PRAGMA optimize")
+        return applied
+    finally:
+        connection.close()
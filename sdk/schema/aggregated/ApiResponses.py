@@ -197,6 +197,7 @@ class SearchCourse(SQLModel):
     subject: str
     course_code: str
     on_langara_website: bool
+    snippet: Optional[str] = Field(default=None, description="Part of the course that matched the query, with matches wrapped in `<b>` tags.")
     
 class SearchCourseList(SQLModel):
     subject_count: int
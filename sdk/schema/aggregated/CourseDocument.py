@@ -0,0 +1,8 @@
+from sqlmodel import Field, SQLModel
+
+
+# the full /v1/courses/{subject}/{course_code} response of every course, built during aggregation
+class CourseDocumentDB(SQLModel, table=True):
+    id: str     = Field(primary_key=True, description="Id of the course e.g. ```CRSE-ENGL-1123```.")
+    etag: str   = Field(description="Hash of the uncompressed document.")
+    data: bytes = Field(description="Gzip compressed JSON of the CourseAPI response.")
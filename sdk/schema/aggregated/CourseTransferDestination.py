@@ -0,0 +1,12 @@
+from sqlmodel import Field, SQLModel
+
+
+# one row per course and institution it transfers to
+# destination comes first in the primary key so "courses that transfer to X" is an index lookup
+# WITHOUT ROWID stores the rows in the primary key itself, ordered by destination
+class CourseTransferDestinationDB(SQLModel, table=True):
+    __table_args__ = {"sqlite_with_rowid": False}
+    
+    destination: str    = Field(primary_key=True, description="Destination institution code e.g. ```SFU```.")
+    id_course: str      = Field(primary_key=True, index=True, foreign_key="coursedb.id", description="Id of the course e.g. ```CRSE-CPSC-1050```.")
+    active: bool        = Field(description="If at least one of the transfer agreements giving credit has not ended.")
@@ -0,0 +1,6 @@
+from sqlmodel import Field, SQLModel
+
+
+class SectionTimesDB(SQLModel, table=True):
+    section_key: int    = Field(primary_key=True, description="sectionKey(year, term, crn) of the section.")
+    mask: bytes         = Field(description="Weekly occupancy of the section, one bit per 15 minute slot of the week (see sdk/parsers/ScheduleTimes.py). Exams are not included.")
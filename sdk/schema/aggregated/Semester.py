@@ -1,8 +1,13 @@
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 
 class Semester(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_semester_year_term", "year", "term"),
+    )
+    
     id: str     = Field(primary_key=True, description="Internal primary key (e.g. SMTR-2024-30).")
     
     year: int   = Field(index=True, description='Year e.g. ```2024```.')
@@ -1,3 +1,4 @@
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 from sdk.schema.aggregated.Course import CourseDB
@@ -19,6 +20,10 @@ class CourseAttribute(SQLModel):
     
 
 class CourseAttributeDB(CourseAttribute, table=True):
+    __table_args__ = (
+        Index("ix_courseattributedb_subject_course_code_year_term", "subject", "course_code", "year", "term"),
+    )
+    
     id: str     = Field(primary_key=True, description="Internal primary and unique key (e.g. ATRB-ENGL-1123-2024-30).")
     
     # 1:many relationship with course    
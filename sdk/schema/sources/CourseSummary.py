@@ -1,4 +1,5 @@
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 from sdk.schema.aggregated.Course import CourseDB
@@ -26,6 +27,10 @@ class CourseSummary(SQLModel):
     
 
 class CourseSummaryDB(CourseSummary, table=True):
+    __table_args__ = (
+        Index("ix_coursesummarydb_subject_course_code_year_term", "subject", "course_code", "year", "term"),
+    )
+    
     id: str     = Field(primary_key=True, description="Internal primary and unique key (e.g. `CSMR-ENGL-1123-2024-30`).")
     
     # 1:many relationship with course
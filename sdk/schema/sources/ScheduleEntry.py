@@ -1,5 +1,7 @@
+import hashlib
 from enum import Enum
 from typing import Optional, TYPE_CHECKING
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -26,6 +28,22 @@ if TYPE_CHECKING:
 #     EI = "Exchange-International"
 #     COOP = "CO-OP(on site work experience)"
 
+# ids come from what the entry is instead of its position in the section, so they
+# stay the same when Langara reorders or inserts rows. Entries of a section that
+# are the same meeting get -2, -3, ... in the order they're listed.
+def scheduleEntryId(id_section: str, type: str, days: str, time: str, start: Optional[str], end: Optional[str], taken: set[str]) -> str:
+    content = "|".join((type, days, time, start or "", end or ""))
+    digest = hashlib.blake2s(content.encode(), digest_size=4).hexdigest()
+    
+    base = f"SCHD-{id_section.removeprefix('SECT-')}-{digest}"
+    id = base
+    n = 2
+    while id in taken:
+        id = f"{base}-{n}"
+        n += 1
+    taken.add(id)
+    return id
+
 class ScheduleEntry(SQLModel):
     type: str               = Field(description='Type of the section.')
     days: str               = Field(description='Days of the week of the session e.g. ```M-W----```.')
@@ -75,10 +93,14 @@ class ScheduleEntry(SQLModel):
     #     }
     
 class ScheduleEntryDB(ScheduleEntry, table=True):
+    __table_args__ = (
+        Index("ix_scheduleentrydb_year_term_crn", "year", "term", "crn"),
+    )
+    
     # 1:many relationship with course
     # 1:many relationship with section
     # 1:many relationship with semester
-    id: str             = Field(primary_key=True, description="Internal primary and unique key (e.g. SCHD-ENGL-1123-2024-30-31005-1).")
+    id: str             = Field(primary_key=True, description="Internal primary and unique key (e.g. SCHD-ENGL-1123-2024-30-31005-d7f5fa75).")
     crn: int            = Field(index=True) # foreign key commented out here to not conflict with id_section
     
     subject: str        = Field(index=True, foreign_key="coursedb.subject")
@@ -87,10 +109,13 @@ class ScheduleEntryDB(ScheduleEntry, table=True):
     term: int           = Field(index=True, foreign_key="semester.term")
     
     
-    id_section: str     = Field(index=True, foreign_key="sectiondb.id")
+    id_section: str     = Field(foreign_key="sectiondb.id")
+    # joined on instead of id_section, see sectionKey()
+    section_key: int    = Field(index=True, description="sectionKey(year, term, crn) of the section.")
     section: Optional["SectionDB"] = Relationship(
         back_populates="schedule",
         sa_relationship_kwargs={
+            "primaryjoin": "SectionDB.section_key==foreign(ScheduleEntryDB.section_key)",
             "lazy": "selectin",
             "viewonly" : True
         }
@@ -1,5 +1,6 @@
 from enum import Enum
 from typing import List, Optional, TYPE_CHECKING
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -14,6 +15,17 @@ class RPEnum(Enum):
     P = "P"
     RP = "RP"
     
+class SectionStatus(Enum):
+    OPEN = "open"
+    FULL = "full"
+    INACTIVE = "inactive"
+    CANCELLED = "cancelled"
+    
+# sections and their schedule entries are joined on (year, term, crn) packed into
+# one integer, e.g. 2024 30 31005 -> 20243031005, instead of the long string ids
+def sectionKey(year: int, term: int, crn: int) -> int:
+    return (year * 100 + term) * 100000 + crn
+    
 class SectionBase(SQLModel):
     id: str = Field(primary_key=True, description="Internal primary and unique key (e.g. SECT-ENGL-1123-2024-30-31005).")
     
@@ -39,6 +51,15 @@ class SectionDB(SectionBase, table=True):
     id_semester: str = Field(index=True, foreign_key="semester.id")
     
     id_course: str = Field(index=True, foreign_key="coursedb.id")
+    
+    # typed copies of seats and waitlist so they can be filtered with an index
+    # (last so that databases that got them with ALTER TABLE have the same column order)
+    seats_open: Optional[int]       = Field(default=None, description="Seats as a number, ```null``` if seats isn't one.")
+    waitlist_count: Optional[int]   = Field(default=None, description="Waitlist as a number, ```null``` if waitlist isn't one.")
+    status: Optional[SectionStatus] = Field(default=None, description="Registration status derived from seats.")
+    
+    section_key: Optional[int]      = Field(default=None, unique=True, index=True, description="sectionKey(year, term, crn).")
+    
     # course: "CourseDB" = Relationship(back_populates="sections")
     
     course: 'CourseDB'    = Relationship(
@@ -51,10 +72,17 @@ class SectionDB(SectionBase, table=True):
     schedule: List["ScheduleEntryDB"] = Relationship(
         back_populates="section",
         sa_relationship_kwargs={
+            "primaryjoin": "SectionDB.section_key==foreign(ScheduleEntryDB.section_key)",
             "lazy": "selectin",
             "viewonly" : True
         })
     
+    __table_args__ = (
+        Index("ix_sectiondb_year_term_status_waitlist", "year", "term", "status", "waitlist_count"),
+        Index("ix_sectiondb_subject_course_code_year_term", "subject", "course_code", "year", "term"),
+        Index("ix_sectiondb_year_term_crn", "year", "term", "crn"),
+    )
+    
     model_config = {
         "json_schema_extra": {
             "examples": [
@@ -1,4 +1,5 @@
 from requests_cache import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 from typing import TYPE_CHECKING
 
@@ -51,6 +52,10 @@ class Transfer(SQLModel):
         
 
 class TransferDB(Transfer, table=True):
+    __table_args__ = (
+        Index("ix_transferdb_subject_course_code_destination_credit", "subject", "course_code", "destination", "credit"),
+    )
+    
     transfer_guide_id: int          = Field(index=True, description="Internal id that BCTransferGuide uses for transfer agreements") 
     
     # 1:many relationship with course
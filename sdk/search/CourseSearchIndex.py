@@ -0,0 +1,100 @@
+import re
+
+from sqlalchemy import Float, String, text
+from sqlmodel import Session
+
+
+"""
+Full text index over CourseMax for the course search routes.
+
+Filtering with title.contains() / description.contains() is a LIKE '%x%' scan
+over every course with no ranking. Instead we keep an FTS5 table next to
+CourseMaxDB that is rebuilt with the rest of the aggregations and shipped in the
+snapshot. Queries are ranked with bm25 and every word is a prefix match.
+"""
+
+COURSE_SEARCH_TABLE = "coursemaxfts"
+
+# column order matters, bm25() weights are given in the same order
+COURSE_SEARCH_COLUMNS = ["id", "subject", "course_code", "title", "abbreviated_title", "description", "desc_prerequisite"]
+COURSE_SEARCH_WEIGHTS = [0, 10.0, 10.0, 5.0, 3.0, 1.0, 0.5]
+
+
+def buildCourseSearchIndex(session: Session) -> int:
+    session.exec(text(f"DROP TABLE IF EXISTS {COURSE_SEARCH_TABLE}"))
+    session.exec(text(f"""
+        CREATE VIRTUAL TABLE {COURSE_SEARCH_TABLE} USING fts5(
+            id UNINDEXED,
+            subject,
+            course_code,
+            title,
+            abbreviated_title,
+            description,
+            desc_prerequisite,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '1 2 3'
+        )
+    """))
+    session.exec(text(f"""
+        INSERT INTO {COURSE_SEARCH_TABLE} ({", ".join(COURSE_SEARCH_COLUMNS)})
+        SELECT {", ".join(COURSE_SEARCH_COLUMNS)} FROM coursemaxdb
+    """))
+    count = session.exec(text(f"SELECT count(*) FROM {COURSE_SEARCH_TABLE}")).one()[0]
+    session.commit()
+    return count
+
+
+def ftsTerm(word: str, column: str | None = None) -> str:
+    # quote everything so user input can't inject FTS syntax (AND, NEAR, column filters...)
+    term = '"' + word.replace('"', '""') + '"*'
+    if column:
+        return f"{column} : {term}"
+    return term
+
+
+def ftsQuery(query: str, column: str | None = None, match_all: bool = False) -> str | None:
+    """
+    Turn a user query into an FTS5 MATCH expression.
+
+    Words are prefix matches in any column, or in `column` if given. A course
+    matches if any of the words do (courses matching more of them rank higher),
+    or only if all of them do with match_all.
+    Numbers of up to 4 digits are treated as (partial) course codes and always
+    have to match.
+    """
+    words = []
+    course_codes = []
+    for word in re.findall(r"\w+", query):
+        if column is None and word.isnumeric() and len(word) <= 4:
+            course_codes.append(ftsTerm(word, "course_code"))
+        else:
+            words.append(ftsTerm(word, column))
+
+    terms = list(course_codes)
+    if match_all:
+        terms.extend(words)
+    elif len(words) == 1:
+        terms.append(words[0])
+    elif words:
+        terms.append("(" + " OR ".join(words) + ")")
+
+    if not terms:
+        return None
+    return " AND ".join(terms)
+
+
+def courseSearchSubquery(match: str):
+    """
+    Selectable of (id, rank, snippet) for every course matching an FTS5 expression.
+    Lower rank is a better match.
+    """
+    weights = ", ".join(str(w) for w in COURSE_SEARCH_WEIGHTS)
+    statement = text(f"""
+        SELECT
+            id,
+            bm25({COURSE_SEARCH_TABLE}, {weights}) AS rank,
+            snippet({COURSE_SEARCH_TABLE}, -1, '<b>', '</b>', '…', 12) AS snippet
+        FROM {COURSE_SEARCH_TABLE}
+        WHERE {COURSE_SEARCH_TABLE} MATCH :match
+    """).bindparams(match=match).columns(id=String, rank=Float, snippet=String)
+    return statement.subquery("course_search")
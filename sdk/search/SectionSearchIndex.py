@@ -0,0 +1,401 @@
+from array import array
+from bisect import bisect_right
+from typing import Iterable, Optional
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from sdk.parsers.ScheduleTimes import scheduleMask
+from sdk.schema.sources.Section import SectionStatus
+from sdk.search.TrigramIndex import TrigramIndex
+
+
+"""
+In-memory bitset index over every section, used by /v2/search/sections.
+
+Doing this search in SQL means building an or_() of every matching
+(subject, course_code) pair, joining to the schedule table with DISTINCT and
+running a second count(distinct) query for the totals.
+
+Instead we load every section once per snapshot in a fixed order and give it a
+position. For every filterable value we keep the set of positions that have it,
+stored as a python int used as a bitset. A search is then a handful of AND/OR
+operations on those ints, the total is a popcount, and a page is the n-th to
+m-th set bit. Only the sections on the requested page are loaded from the database.
+
+Values that only a few sections have (a single course, an instructor, a title)
+are stored as position arrays and turned into a bitset when queried, so memory
+doesn't grow with (number of distinct values * number of sections).
+
+Free text facets (instructors, rooms, titles) also get a trigram index over their
+distinct values so they can be searched with typos.
+"""
+
+# sections are positioned in this order, which is also the order results are returned in
+SECTION_ORDER = "s.year, s.term, s.subject, s.course_code, s.crn"
+
+ATTRIBUTES = ["attr_ar", "attr_sc", "attr_hum", "attr_lsc", "attr_sci", "attr_soc", "attr_ut"]
+
+# facets that can be searched with fuzzy matching
+FUZZY_FACETS = ["instructor", "any_instructor", "room", "abbreviated_title", "title"]
+
+
+class SectionSearchIndex:
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        # round up to whole 64 bit words so pages can be found a word at a time
+        self.nbytes = ((size + 63) // 64) * 8
+        self.all = (1 << size) - 1
+
+        self.ids: list[str] = []
+
+        # sort key of every position, see SECTION_ORDER
+        self.years = array("H")
+        self.terms = array("B")
+        self.subjects: list[str] = []
+        self.course_codes: list[str] = []
+        self.crns = array("I")
+
+        # facet name -> value -> int bitset or array of positions
+        self.facets: dict[str, dict] = {}
+
+        # bitsets for boolean properties of a section
+        self.flags: dict[str, int] = {}
+
+        # facet name -> trigram index over its values
+        self.trigrams: dict[str, TrigramIndex] = {}
+
+    @classmethod
+    def build(cls, session: Session) -> "SectionSearchIndex":
+        # sections without any schedule entries never showed up in the old join based search
+        sections = session.exec(text(f"""
+            SELECT s.id, s.subject, s.course_code, s.year, s.term, s.crn, s.section, s.status, s.waitlist_count, s.abbreviated_title
+            FROM sectiondb s
+            WHERE EXISTS (SELECT 1 FROM scheduleentrydb e WHERE e.section_key = s.section_key)
+            ORDER BY {SECTION_ORDER}
+        """)).all()
+
+        index = cls(len(sections))
+
+        facets: dict[str, dict[object, list[int]]] = {
+            name: {} for name in ["year", "yearterm", "subject", "course_code", "course", "abbreviated_title", "title", "instructor", "any_instructor", "room", "times"]
+        }
+        for attr in ATTRIBUTES:
+            facets[attr] = {}
+
+        flags: dict[str, list[int]] = {
+            "online": [],
+            "open_seats": [],
+            "no_waitlist": [],
+            "not_cancelled": [],
+        }
+
+        positions: dict[str, int] = {}
+
+        for i, s in enumerate(sections):
+            index.ids.append(s.id)
+            positions[s.id] = i
+
+            index.years.append(s.year)
+            index.terms.append(s.term)
+            index.subjects.append(s.subject)
+            index.course_codes.append(s.course_code)
+            index.crns.append(s.crn)
+
+            facets["year"].setdefault(s.year, []).append(i)
+            facets["yearterm"].setdefault((s.year, s.term), []).append(i)
+            facets["course_code"].setdefault(s.course_code, []).append(i)
+            facets["course"].setdefault((s.subject, s.course_code), []).append(i)
+            if s.abbreviated_title:
+                facets["abbreviated_title"].setdefault(s.abbreviated_title.lower(), []).append(i)
+
+            if s.section and "W" in s.section.upper():
+                flags["online"].append(i)
+            if s.status == SectionStatus.OPEN.name:
+                flags["open_seats"].append(i)
+            if not s.waitlist_count:
+                flags["no_waitlist"].append(i)
+            if s.status is not None and s.status != SectionStatus.CANCELLED.name:
+                flags["not_cancelled"].append(i)
+
+        # course level values come from CourseMax and apply to every section of the course
+        courses = session.exec(text(f"""
+            SELECT subject, course_code, title, {", ".join(ATTRIBUTES)} FROM coursemaxdb
+        """)).all()
+        for c in courses:
+            course_positions = facets["course"].get((c.subject, c.course_code))
+            if not course_positions:
+                continue
+
+            facets["subject"].setdefault(c.subject, []).extend(course_positions)
+            if c.title:
+                facets["title"].setdefault(c.title.lower(), []).extend(course_positions)
+            for attr in ATTRIBUTES:
+                value = getattr(c, attr)
+                if value is not None:
+                    facets[attr].setdefault(bool(value), []).extend(course_positions)
+
+        schedules = session.exec(text("""
+            SELECT id_section, instructor, room, type, days, time FROM scheduleentrydb
+        """)).all()
+        # weekly occupancy of every section, see sdk/parsers/ScheduleTimes.py
+        times = [0] * index.size
+        for e in schedules:
+            i = positions.get(e.id_section)
+            if i is None:
+                continue
+            if e.type != "Exam":
+                times[i] |= scheduleMask(e.days, e.time)
+            if e.room:
+                facets["room"].setdefault(e.room.lower(), []).append(i)
+            if not e.instructor:
+                continue
+            facets["any_instructor"].setdefault(e.instructor.lower(), []).append(i)
+            # editorial choice to exclude exams where the professor is a proctor
+            if e.type != "Exam":
+                facets["instructor"].setdefault(e.instructor.lower(), []).append(i)
+
+        for i, mask in enumerate(times):
+            facets["times"].setdefault(mask, []).append(i)
+
+        for name, values in facets.items():
+            index.facets[name] = {value: index._compact(p) for value, p in values.items()}
+        for name, p in flags.items():
+            index.flags[name] = index._mask(p)
+        for name in FUZZY_FACETS:
+            index.trigrams[name] = TrigramIndex(index.facets[name].keys())
+
+        return index
+
+    def _compact(self, positions: list[int]):
+        positions = sorted(set(positions))
+        # dense values are cheaper to keep as a bitset than to rebuild one every query
+        if len(positions) * 64 >= self.size:
+            return self._mask(positions)
+        return array("I", positions)
+
+    def _mask(self, positions) -> int:
+        buf = bytearray(self.nbytes)
+        for p in positions:
+            buf[p >> 3] |= 1 << (p & 7)
+        return int.from_bytes(buf, "little")
+
+    def _bits(self, facet: str, value) -> int:
+        stored = self.facets[facet].get(value)
+        if stored is None:
+            return 0
+        if isinstance(stored, int):
+            return stored
+        return self._mask(stored)
+
+    def _bits_where(self, facet: str, predicate) -> int:
+        # OR of every value of a facet that matches the predicate
+        bits = 0
+        positions = []
+        for value, stored in self.facets[facet].items():
+            if not predicate(value):
+                continue
+            if isinstance(stored, int):
+                bits |= stored
+            else:
+                positions.extend(stored)
+        if positions:
+            bits |= self._mask(positions)
+        return bits
+
+    def _bits_of(self, facet: str, values: Iterable) -> int:
+        # OR of the given values of a facet
+        bits = 0
+        positions = []
+        for value in values:
+            stored = self.facets[facet].get(value)
+            if stored is None:
+                continue
+            if isinstance(stored, int):
+                bits |= stored
+            else:
+                positions.extend(stored)
+        if positions:
+            bits |= self._mask(positions)
+        return bits
+
+    def _fuzzy(self, facet: str, query: str) -> dict[str, float]:
+        # facet values matching query, with their similarity
+        return self.trigrams[facet].search(query)
+
+    def search(
+        self,
+        subject: Optional[str] = None,
+        course_code: Optional[int] = None,
+        title_search: Optional[str] = None,
+        instructor_search: Optional[str] = None,
+        year: Optional[int] = None,
+        term: Optional[int] = None,
+        online: Optional[bool] = None,
+        attributes: dict[str, Optional[bool]] = {},
+        filter_open_seats: bool = False,
+        filter_no_waitlist: bool = False,
+        filter_not_cancelled: bool = False,
+        within: Optional[int] = None,
+    ) -> int:
+        """
+        Returns the bitset of all sections matching every given filter.
+        `within` is a weekly mask, sections have to meet and only inside of it.
+        """
+        bits = self.all
+
+        if subject is not None:
+            bits &= self._bits("subject", subject)
+
+        if course_code is not None:
+            code = str(course_code)
+            if len(code) == 4:
+                bits &= self._bits("course_code", code)
+            else:
+                bits &= self._bits_where("course_code", lambda c: c.startswith(code))
+
+        for attr, value in attributes.items():
+            if value is not None:
+                bits &= self._bits(attr, value)
+
+        if title_search is not None:
+            needle = title_search.lower()
+            # short searches only look at the abbreviated section title
+            if len(title_search) >= 3:
+                bits &= self._bits_of("title", self._fuzzy("title", needle))
+            else:
+                bits &= self._bits_where("abbreviated_title", lambda t: needle in t)
+
+        if instructor_search is not None:
+            bits &= self._bits_of("instructor", self._fuzzy("instructor", instructor_search))
+
+        if year is not None and term is not None:
+            bits &= self._bits("yearterm", (year, term))
+        elif year is not None:
+            bits &= self._bits("year", year)
+        elif term is not None:
+            bits &= self._bits_where("yearterm", lambda yt: yt[1] == term)
+
+        if online is not None:
+            if online:
+                bits &= self.flags["online"]
+            else:
+                bits &= ~self.flags["online"] & self.all
+
+        if filter_open_seats:
+            bits &= self.flags["open_seats"]
+        if filter_no_waitlist:
+            bits &= self.flags["no_waitlist"]
+        if filter_not_cancelled:
+            bits &= self.flags["not_cancelled"]
+
+        if within is not None:
+            # there are only a few hundred distinct weekly schedules
+            bits &= self._bits_where("times", lambda m: m != 0 and m & ~within == 0)
+
+        return bits
+
+    def quick_search(self, query: Optional[str] = None, year: Optional[int] = None, term: Optional[int] = None) -> list[int]:
+        """
+        Positions of the sections matching a free text query, best matches first.
+
+        Same heuristics as /v1/search/sections: "CPSC 1050" is a course lookup,
+        4 letter words are subjects, other words are instructors or titles and
+        anything with a digit is a room or a course code. A section matches if
+        any word matches.
+        """
+        bits = self.all
+        if year and term:
+            bits &= self._bits("yearterm", (year, term))
+        elif year:
+            bits &= self._bits("year", year)
+        elif term:
+            bits &= self._bits_where("yearterm", lambda yt: yt[1] == term)
+
+        words = query.strip().split() if query else []
+
+        if len(words) == 2 and len(words[0]) == 4 and words[0].isalpha() and words[1].isnumeric():
+            subject, code = words[0].upper(), words[1]
+            return self.positions(bits & self._bits_where("course", lambda c: c[0] == subject and c[1].startswith(code)))
+
+        if not words:
+            return self.positions(bits)
+
+        # (score, bitset) of everything that matched
+        matches: list[tuple[float, int]] = []
+        for word in words:
+            if word.isalpha():
+                if len(word) == 4:
+                    subject = word.upper()
+                    matches.append((1.0, self._bits_where("course", lambda c: c[0] == subject)))
+                else:
+                    for facet in ("any_instructor", "abbreviated_title"):
+                        for value, score in self._fuzzy(facet, word).items():
+                            matches.append((score, self._bits(facet, value)))
+            else:
+                needle = word.lower()
+                matches.append((1.0, self._bits_where("course_code", lambda c: needle in c)))
+                for value, score in self._fuzzy("room", word).items():
+                    matches.append((score, self._bits("room", value)))
+
+        # best score first, ties and sections of the same score keep index order
+        out = []
+        seen = 0
+        for score, matched in sorted(matches, key=lambda m: -m[0]):
+            new = matched & bits & ~seen
+            if new:
+                out.extend(self.positions(new))
+                seen |= new
+        return out
+
+    def count(self, bits: int) -> int:
+        return bits.bit_count()
+
+    def positions(self, bits: int, offset: int = 0, limit: Optional[int] = None) -> list[int]:
+        """Positions of set bits, skipping the first `offset` of them."""
+        out = []
+        words = memoryview(bits.to_bytes(self.nbytes, "little")).cast("Q")
+
+        for w_i, word in enumerate(words):
+            if not word:
+                continue
+
+            c = word.bit_count()
+            if offset >= c:
+                offset -= c
+                continue
+
+            while word:
+                low = word & -word
+                word ^= low
+                if offset > 0:
+                    offset -= 1
+                    continue
+
+                out.append(w_i * 64 + low.bit_length() - 1)
+                if limit is not None and len(out) >= limit:
+                    return out
+
+        return out
+
+    def page(self, bits: int, offset: int, limit: int) -> list[str]:
+        return [self.ids[p] for p in self.positions(bits, offset, limit)]
+
+    def key(self, position: int) -> tuple[int, int, str, str, int]:
+        return (self.years[position], self.terms[position], self.subjects[position], self.course_codes[position], self.crns[position])
+
+    def first_after(self, key: tuple) -> int:
+        """First position whose sort key is greater than key."""
+        return bisect_right(range(self.size), tuple(key), key=self.key)
+
+    def page_after(self, bits: int, key: tuple, limit: int) -> list[int]:
+        """
+        Positions of the first `limit` matches after `key`.
+
+        Unlike an offset this doesn't have to walk past the earlier pages,
+        so every page costs the same.
+        """
+        start = self.first_after(key)
+        bits &= ~((1 << start) - 1)
+        return self.positions(bits, 0, limit)
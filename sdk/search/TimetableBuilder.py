@@ -0,0 +1,101 @@
+import itertools
+import time
+from typing import Generic, Iterator, Optional, TypeVar
+
+
+"""
+Enumerates conflict-free timetables for a list of courses.
+
+Every course comes with its candidate sections and their weekly schedule masks
+(see sdk/parsers/ScheduleTimes.py), so two sections conflict iff `a & b != 0`.
+
+Sections of a course that meet at exactly the same times are interchangeable,
+so they are grouped by mask and the search runs over the groups. Courses with the
+fewest groups are placed first, and after every choice each remaining course
+must still have at least one group that fits (forward checking), otherwise the
+branch is cut right away instead of after trying every combination below it.
+
+The search is a generator so results can be streamed as they are found, and it
+stops after max_results timetables or time_budget seconds.
+"""
+
+T = TypeVar("T")
+
+# how often (in search nodes) the time budget is checked
+BUDGET_CHECK_INTERVAL = 256
+
+
+class TimetableSearch(Generic[T]):
+
+    def __init__(self, courses: list[list[tuple[int, T]]], max_results: int = 100, time_budget: float = 2.0) -> None:
+        """courses: for every course, a list of (mask, section) candidates."""
+        self.max_results = max_results
+        self.time_budget = time_budget
+
+        self.count = 0
+        self.nodes = 0
+        # why the search ended early: "max_results", "time_budget" or None if every timetable was found
+        self.stopped: Optional[str] = None
+
+        groups: list[list[tuple[int, list[T]]]] = []
+        for candidates in courses:
+            by_mask: dict[int, list[T]] = {}
+            for mask, section in candidates:
+                by_mask.setdefault(mask, []).append(section)
+            groups.append(list(by_mask.items()))
+
+        # most constrained course first, results are put back in the caller's order
+        self.order = sorted(range(len(groups)), key=lambda i: len(groups[i]))
+        self.groups = [groups[i] for i in self.order]
+
+    def __iter__(self) -> Iterator[list[T]]:
+        self.deadline = time.perf_counter() + self.time_budget
+        if self.max_results <= 0:
+            self.stopped = "max_results"
+            return
+        if any(not g for g in self.groups):
+            return
+        yield from self._search(0, 0, [])
+
+    def _out_of_time(self) -> bool:
+        if time.perf_counter() > self.deadline:
+            self.stopped = "time_budget"
+            return True
+        return False
+
+    def _search(self, depth: int, used: int, chosen: list[list[T]]) -> Iterator[list[T]]:
+        if depth == len(self.groups):
+            for combination in itertools.product(*chosen):
+                # back to the order the courses were given in
+                out: list[T] = [None] * len(combination)
+                for i, section in zip(self.order, combination):
+                    out[i] = section
+                yield out
+
+                self.count += 1
+                if self.count >= self.max_results:
+                    self.stopped = "max_results"
+                    return
+                if self.count % BUDGET_CHECK_INTERVAL == 0 and self._out_of_time():
+                    return
+            return
+
+        for mask, sections in self.groups[depth]:
+            if self.stopped is not None:
+                return
+
+            self.nodes += 1
+            if self.nodes % BUDGET_CHECK_INTERVAL == 0 and self._out_of_time():
+                return
+
+            if mask & used:
+                continue
+
+            new_used = used | mask
+            # every course after this one still needs something that fits
+            if any(all(m & new_used for m, _ in self.groups[d]) for d in range(depth + 1, len(self.groups))):
+                continue
+
+            chosen.append(sections)
+            yield from self._search(depth + 1, new_used, chosen)
+            chosen.pop()
@@ -0,0 +1,113 @@
+import re
+from array import array
+from collections import Counter
+from typing import Iterable
+
+
+"""
+Trigram index over a set of strings (instructor names, rooms, titles) for fuzzy search.
+
+Every word of every value is split into trigrams ("holditch" -> "  h", " ho", "hol",
+"old", ..., "ch "), and each trigram points to the words that contain it. A query
+word only gets compared to the words it shares a trigram with, and is scored with
+the same similarity as postgres' pg_trgm: shared trigrams / all distinct trigrams.
+
+That gives typo tolerance ("holdich" still finds "Gregory Holditch") without
+comparing against every value. Plain substring matches score 1.0, so anything the
+old contains() search found is still found.
+"""
+
+# pg_trgm defaults to 0.3, that lets through too much for short names
+SIMILARITY_THRESHOLD = 0.4
+
+
+def trigrams(word: str) -> set[str]:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+
+    def __init__(self, values: Iterable[str]) -> None:
+        # values are expected to be lowercase already
+        self.values: list[str] = list(dict.fromkeys(values))
+
+        self.words: list[str] = []
+        self.word_trigrams: list[int] = []
+        self.word_values: list[list[int]] = []
+
+        postings: dict[str, list[int]] = {}
+        word_ids: dict[str, int] = {}
+
+        for v_i, value in enumerate(self.values):
+            for word in set(re.findall(r"\w+", value)):
+                w_i = word_ids.get(word)
+                if w_i is None:
+                    w_i = word_ids[word] = len(self.words)
+                    self.words.append(word)
+                    self.word_values.append([])
+
+                    grams = trigrams(word)
+                    self.word_trigrams.append(len(grams))
+                    for gram in grams:
+                        postings.setdefault(gram, []).append(w_i)
+
+                self.word_values[w_i].append(v_i)
+
+        self.postings: dict[str, array] = {gram: array("I", w) for gram, w in postings.items()}
+
+    def similar_words(self, word: str, threshold: float = SIMILARITY_THRESHOLD) -> dict[int, float]:
+        """Ids of indexed words at least `threshold` similar to word, with their similarity."""
+        grams = trigrams(word)
+
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+
+        out = {}
+        for w_i, n in shared.items():
+            similarity = n / (len(grams) + self.word_trigrams[w_i] - n)
+            if similarity >= threshold:
+                out[w_i] = similarity
+        return out
+
+    def search(self, query: str, threshold: float = SIMILARITY_THRESHOLD) -> dict[str, float]:
+        """
+        Values matching query with a score between 0 and 1.
+
+        A value matches if it contains the query, or if every word of the query
+        is similar to some word of the value. The score is then the average
+        similarity of the query words.
+        """
+        query = query.lower().strip()
+        if not query:
+            return {}
+
+        # only looks at distinct values, not at every row they came from
+        scores = {self.values[v_i]: 1.0 for v_i in range(len(self.values)) if query in self.values[v_i]}
+
+        words = re.findall(r"\w+", query)
+        if not words:
+            return scores
+
+        totals: dict[int, float] | None = None
+        for word in words:
+            best: dict[int, float] = {}
+            for w_i, similarity in self.similar_words(word, threshold).items():
+                for v_i in self.word_values[w_i]:
+                    if similarity > best.get(v_i, 0):
+                        best[v_i] = similarity
+
+            if totals is None:
+                totals = best
+            else:
+                totals = {v_i: totals[v_i] + s for v_i, s in best.items() if v_i in totals}
+
+            if not totals:
+                break
+
+        for v_i, total in (totals or {}).items():
+            value = self.values[v_i]
+            scores[value] = max(scores.get(value, 0), total / len(words))
+
+        return scores
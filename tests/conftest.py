@@ -0,0 +1,110 @@
+import os
+import random
+import sys
+
+import pytest
+
+# the backend and api are imported from the repository root, like main.py and api.py do
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlmodel import Session
+
+from Controller import Controller
+from sdk.parsers.SemesterParser import parseCount, parseSectionStatus
+from sdk.schema.aggregated.Semester import Semester
+from sdk.schema.sources.CourseSummary import CourseSummaryDB
+from sdk.schema.sources.ScheduleEntry import ScheduleEntryDB, scheduleEntryId
+from sdk.schema.sources.Section import SectionDB, sectionKey
+from sdk.schema.sources.Transfer import TransferDB
+
+
+SUBJECTS = ["CPSC", "ENGL", "MATH", "BIOL", "CHEM", "HIST"]
+COURSE_CODES = ["1050", "1150", "1181", "2150", "2280"]
+SEMESTERS = [(2023, 10), (2023, 20), (2023, 30), (2024, 10), (2024, 20), (2024, 30), (2025, 10)]
+INSTRUCTORS = ["Gregory Holditch", "Bob Ross", "Jane Smith", "Ada Lovelace", "Alan Turing", "Grace Hopper"]
+DESTINATIONS = ["UBCV", "SFU", "UVIC", "KPU", "DOUG"]
+
+
+def buildDatabase(db_path: str) -> None:
+    """Fill a new database with a few semesters of made up (but deterministic) sections."""
+    rng = random.Random(1)
+    c = Controller(db_path)
+    c.create_db_and_tables()
+
+    with Session(c.engine) as session:
+        for subject in SUBJECTS:
+            for code in COURSE_CODES:
+                c.checkCourseExists(session, subject, code, None)
+                session.add(CourseSummaryDB(
+                    id=f"SUMM-{subject}-{code}-2024-30", subject=subject, course_code=code, year=2024, term=30,
+                    title=f"{subject} course {code} introduction", description=f"Students learn about {subject.lower()} topics for {code}.",
+                    credits=3.0, hours_lecture=3, hours_seminar=0, hours_lab=1,
+                ))
+                for destination in rng.sample(DESTINATIONS, 3):
+                    session.add(TransferDB(
+                        id=f"TNFR-{subject}-{code}-{destination}-1", transfer_guide_id=1, subject=subject, course_code=code,
+                        id_course=f"CRSE-{subject}-{code}", source="LANG", source_credits=3.0, source_title=None,
+                        destination=destination, destination_name=f"{destination} University",
+                        credit="No credit" if destination == "DOUG" else f"{destination} {subject} 1XX (3)",
+                        condition=None, effective_start="Sep/15", effective_end="Aug/20" if destination == "KPU" else None,
+                    ))
+
+        for year, term in SEMESTERS:
+            session.add(Semester(id=f"SMTR-{year}-{term}", year=year, term=term))
+            crn = 10000 + term * 100
+            for subject in SUBJECTS:
+                for code in COURSE_CODES:
+                    for section in ["001", "002", "W01"]:
+                        crn += 1
+                        id_section = f"SECT-{subject}-{code}-{year}-{term}-{crn}"
+                        seats = rng.choice(["0", "5", "12", "Inact", "Cancel", "-1"])
+                        waitlist = rng.choice([" ", "N/A", "3", "0", None])
+                        session.add(SectionDB(
+                            id=id_section, crn=crn, RP=None, seats=seats, waitlist=waitlist, section=section, credits=3.0,
+                            abbreviated_title=f"{subject} Topics {code}", add_fees=None, rpt_limit=2, notes=None,
+                            subject=subject, course_code=code, year=year, term=term,
+                            id_semester=f"SMTR-{year}-{term}", id_course=f"CRSE-{subject}-{code}",
+                            seats_open=parseCount(seats), waitlist_count=parseCount(waitlist), status=parseSectionStatus(seats),
+                            section_key=sectionKey(year, term, crn),
+                        ))
+
+                        meetings = [
+                            ("Lecture", rng.choice(["M-W----", "-T-R---", "----F--"]), rng.choice(["0830-1020", "1030-1220", "1530-1720", "1830-2120"])),
+                            ("Lab", rng.choice(["--W----", "---R---"]), rng.choice(["1230-1420", "0830-1020"])),
+                            ("Exam", "-------", "-"),
+                        ]
+                        taken: set[str] = set()
+                        for type, days, time in meetings:
+                            session.add(ScheduleEntryDB(
+                                id=scheduleEntryId(id_section, type, days, time, None, None, taken),
+                                crn=crn, subject=subject, course_code=code, year=year, term=term,
+                                id_section=id_section, section_key=sectionKey(year, term, crn),
+                                type=type, days=days, time=time, start=None, end=None,
+                                room=rng.choice(["A306", "B101", "WWW", "T224"]), instructor=rng.choice(INSTRUCTORS),
+                            ))
+        session.commit()
+
+    c._generateCourseIndexes()
+    c._generateTransferDestinations()
+    c._generateSearchIndexes()
+    c._generateSectionTimes()
+    c._generateCourseDocuments()
+    c.setMetadata("last_updated")
+    c.engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def api(tmp_path_factory):
+    """api.py serving a generated database. api opens database/ relative to the working directory."""
+    directory = tmp_path_factory.mktemp("backend")
+    os.makedirs(directory / "database" / "prebuilts")
+    buildDatabase(str(directory / "database" / "database.db"))
+
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        import api as api_module
+        yield api_module
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,296 @@
+-- schema of database.db as created before schema migrations existed (db_version 2)
+
+CREATE TABLE coursedb (
+	subject VARCHAR NOT NULL, 
+	course_code VARCHAR NOT NULL, 
+	id VARCHAR NOT NULL, 
+	PRIMARY KEY (id)
+);
+
+CREATE INDEX ix_coursedb_subject ON coursedb (subject);
+
+CREATE INDEX ix_coursedb_course_code ON coursedb (course_code);
+
+CREATE TABLE semester (
+	id VARCHAR NOT NULL, 
+	year INTEGER NOT NULL, 
+	term INTEGER NOT NULL, 
+	courses_first_day VARCHAR, 
+	courses_last_day VARCHAR, 
+	PRIMARY KEY (id)
+);
+
+CREATE INDEX ix_semester_year ON semester (year);
+
+CREATE INDEX ix_semester_term ON semester (term);
+
+CREATE TABLE metadata (
+	field VARCHAR NOT NULL, 
+	value VARCHAR NOT NULL, 
+	PRIMARY KEY (field)
+);
+
+CREATE TABLE courseoutlinedb (
+	url VARCHAR NOT NULL, 
+	file_name VARCHAR NOT NULL, 
+	id VARCHAR NOT NULL, 
+	subject VARCHAR NOT NULL, 
+	course_code VARCHAR NOT NULL, 
+	id_course VARCHAR NOT NULL, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(subject) REFERENCES coursedb (subject), 
+	FOREIGN KEY(course_code) REFERENCES coursedb (course_code), 
+	FOREIGN KEY(id_course) REFERENCES coursedb (id)
+);
+
+CREATE INDEX ix_courseoutlinedb_course_code ON courseoutlinedb (course_code);
+
+CREATE INDEX ix_courseoutlinedb_id_course ON courseoutlinedb (id_course);
+
+CREATE INDEX ix_courseoutlinedb_subject ON courseoutlinedb (subject);
+
+CREATE TABLE sectiondb (
+	id VARCHAR NOT NULL, 
+	crn INTEGER NOT NULL, 
+	"RP" VARCHAR(2), 
+	seats VARCHAR, 
+	waitlist VARCHAR, 
+	section VARCHAR, 
+	credits FLOAT NOT NULL, 
+	abbreviated_title VARCHAR, 
+	add_fees FLOAT, 
+	rpt_limit INTEGER, 
+	notes VARCHAR, 
+	subject VARCHAR NOT NULL, 
+	course_code VARCHAR NOT NULL, 
+	year INTEGER NOT NULL, 
+	term INTEGER NOT NULL, 
+	id_semester VARCHAR NOT NULL, 
+	id_course VARCHAR NOT NULL, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(subject) REFERENCES coursedb (subject), 
+	FOREIGN KEY(course_code) REFERENCES coursedb (course_code), 
+	FOREIGN KEY(year) REFERENCES semester (year), 
+	FOREIGN KEY(term) REFERENCES semester (term), 
+	FOREIGN KEY(id_semester) REFERENCES semester (id), 
+	FOREIGN KEY(id_course) REFERENCES coursedb (id)
+);
+
+CREATE INDEX ix_sectiondb_crn ON sectiondb (crn);
+
+CREATE INDEX ix_sectiondb_subject ON sectiondb (subject);
+
+CREATE INDEX ix_sectiondb_year ON sectiondb (year);
+
+CREATE INDEX ix_sectiondb_term ON sectiondb (term);
+
+CREATE INDEX ix_sectiondb_id_semester ON sectiondb (id_semester);
+
+CREATE INDEX ix_sectiondb_id_course ON sectiondb (id_course);
+
+CREATE INDEX ix_sectiondb_course_code ON sectiondb (course_code);
+
+CREATE TABLE transferdb (
+	id VARCHAR NOT NULL, 
+	source VARCHAR NOT NULL, 
+	source_credits FLOAT, 
+	source_title VARCHAR, 
+	destination VARCHAR NOT NULL, 
+	destination_name VARCHAR NOT NULL, 
+	credit VARCHAR NOT NULL, 
+	condition VARCHAR, 
+	effective_start VARCHAR NOT NULL, 
+	effective_end VARCHAR, 
+	transfer_guide_id INTEGER NOT NULL, 
+	subject VARCHAR NOT NULL, 
+	course_code VARCHAR NOT NULL, 
+	id_course VARCHAR NOT NULL, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(subject) REFERENCES coursedb (subject), 
+	FOREIGN KEY(course_code) REFERENCES coursedb (course_code), 
+	FOREIGN KEY(id_course) REFERENCES coursedb (id)
+);
+
+CREATE INDEX ix_transferdb_destination ON transferdb (destination);
+
+CREATE INDEX ix_transferdb_subject ON transferdb (subject);
+
+CREATE INDEX ix_transferdb_credit ON transferdb (credit);
+
+CREATE INDEX ix_transferdb_course_code ON transferdb (course_code);
+
+CREATE INDEX ix_transferdb_effective_end ON transferdb (effective_end);
+
+CREATE INDEX ix_transferdb_id_course ON transferdb (id_course);
+
+CREATE INDEX ix_transferdb_transfer_guide_id ON transferdb (transfer_guide_id);
+
+CREATE TABLE coursemaxdb (
+	credits FLOAT, 
+	title VARCHAR, 
+	desc_replacement_course VARCHAR, 
+	description VARCHAR, 
+	desc_duplicate_credit VARCHAR, 
+	desc_registration_restriction VARCHAR, 
+	desc_prerequisite VARCHAR, 
+	hours_lecture FLOAT, 
+	hours_seminar FLOAT, 
+	hours_lab FLOAT, 
+	offered_online BOOLEAN, 
+	preparatory_course BOOLEAN, 
+	"RP" VARCHAR(2), 
+	abbreviated_title VARCHAR, 
+	add_fees FLOAT, 
+	rpt_limit INTEGER, 
+	attr_ar BOOLEAN, 
+	attr_sc BOOLEAN, 
+	attr_hum BOOLEAN, 
+	attr_lsc BOOLEAN, 
+	attr_sci BOOLEAN, 
+	attr_soc BOOLEAN, 
+	attr_ut BOOLEAN, 
+	first_offered_year INTEGER, 
+	first_offered_term INTEGER, 
+	last_offered_year INTEGER, 
+	last_offered_term INTEGER, 
+	on_langara_website BOOLEAN, 
+	discontinued BOOLEAN, 
+	transfer_destinations VARCHAR, 
+	id VARCHAR NOT NULL, 
+	subject VARCHAR NOT NULL, 
+	course_code VARCHAR NOT NULL, 
+	id_course VARCHAR NOT NULL, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(subject) REFERENCES coursedb (subject), 
+	FOREIGN KEY(course_code) REFERENCES coursedb (course_code), 
+	FOREIGN KEY(id_course) REFERENCES coursedb (id)
+);
+
+CREATE INDEX ix_coursemaxdb_course_code ON coursemaxdb (course_code);
+
+CREATE INDEX ix_coursemaxdb_id_course ON coursemaxdb (id_course);
+
+CREATE INDEX ix_coursemaxdb_subject ON coursemaxdb (subject);
+
+CREATE TABLE courseattributedb (
+	attr_ar BOOLEAN NOT NULL, 
+	attr_sc BOOLEAN NOT NULL, 
+	attr_hum BOOLEAN NOT NULL, 
+	attr_lsc BOOLEAN NOT NULL, 
+	attr_sci BOOLEAN NOT NULL, 
+	attr_soc BOOLEAN NOT NULL, 
+	attr_ut BOOLEAN NOT NULL, 
+	id VARCHAR NOT NULL, 
+	subject VARCHAR NOT NULL, 
+	course_code VARCHAR NOT NULL, 
+	year INTEGER NOT NULL, 
+	term INTEGER NOT NULL, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(subject) REFERENCES coursedb (subject), 
+	FOREIGN KEY(course_code) REFERENCES coursedb (course_code), 
+	FOREIGN KEY(year) REFERENCES semester (year), 
+	FOREIGN KEY(term) REFERENCES semester (term)
+);
+
+CREATE INDEX ix_courseattributedb_course_code ON courseattributedb (course_code);
+
+CREATE INDEX ix_courseattributedb_year ON courseattributedb (year);
+
+CREATE INDEX ix_courseattributedb_term ON courseattributedb (term);
+
+CREATE INDEX ix_courseattributedb_subject ON courseattributedb (subject);
+
+CREATE TABLE coursepagedb (
+	title VARCHAR NOT NULL, 
+	description VARCHAR, 
+	credits FLOAT NOT NULL, 
+	hours_lecture FLOAT NOT NULL, 
+	hours_seminar FLOAT NOT NULL, 
+	hours_lab FLOAT NOT NULL, 
+	desc_replacement_course VARCHAR, 
+	desc_duplicate_credit VARCHAR, 
+	desc_registration_restriction VARCHAR, 
+	desc_prerequisite VARCHAR, 
+	university_transferrable BOOLEAN NOT NULL, 
+	offered_online BOOLEAN NOT NULL, 
+	preparatory_course BOOLEAN NOT NULL, 
+	id VARCHAR NOT NULL, 
+	subject VARCHAR NOT NULL, 
+	course_code VARCHAR NOT NULL, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(subject) REFERENCES coursedb (subject), 
+	FOREIGN KEY(course_code) REFERENCES coursedb (course_code)
+);
+
+CREATE INDEX ix_coursepagedb_subject ON coursepagedb (subject);
+
+CREATE INDEX ix_coursepagedb_course_code ON coursepagedb (course_code);
+
+CREATE TABLE coursesummarydb (
+	title VARCHAR NOT NULL, 
+	desc_replacement_course VARCHAR, 
+	description VARCHAR, 
+	desc_last_updated VARCHAR, 
+	desc_requisites VARCHAR, 
+	credits FLOAT NOT NULL, 
+	hours_lecture FLOAT NOT NULL, 
+	hours_seminar FLOAT NOT NULL, 
+	hours_lab FLOAT NOT NULL, 
+	id VARCHAR NOT NULL, 
+	subject VARCHAR NOT NULL, 
+	course_code VARCHAR NOT NULL, 
+	year INTEGER NOT NULL, 
+	term INTEGER NOT NULL, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(subject) REFERENCES coursedb (subject), 
+	FOREIGN KEY(course_code) REFERENCES coursedb (course_code), 
+	FOREIGN KEY(year) REFERENCES semester (year), 
+	FOREIGN KEY(term) REFERENCES semester (term)
+);
+
+CREATE INDEX ix_coursesummarydb_course_code ON coursesummarydb (course_code);
+
+CREATE INDEX ix_coursesummarydb_year ON coursesummarydb (year);
+
+CREATE INDEX ix_coursesummarydb_subject ON coursesummarydb (subject);
+
+CREATE INDEX ix_coursesummarydb_term ON coursesummarydb (term);
+
+CREATE INDEX ix_coursesummarydb_title ON coursesummarydb (title);
+
+CREATE TABLE scheduleentrydb (
+	type VARCHAR NOT NULL, 
+	days VARCHAR NOT NULL, 
+	time VARCHAR NOT NULL, 
+	start VARCHAR, 
+	"end" VARCHAR, 
+	room VARCHAR NOT NULL, 
+	instructor VARCHAR NOT NULL, 
+	id VARCHAR NOT NULL, 
+	crn INTEGER NOT NULL, 
+	subject VARCHAR NOT NULL, 
+	course_code VARCHAR NOT NULL, 
+	year INTEGER NOT NULL, 
+	term INTEGER NOT NULL, 
+	id_section VARCHAR NOT NULL, 
+	PRIMARY KEY (id), 
+	FOREIGN KEY(subject) REFERENCES coursedb (subject), 
+	FOREIGN KEY(course_code) REFERENCES coursedb (course_code), 
+	FOREIGN KEY(year) REFERENCES semester (year), 
+	FOREIGN KEY(term) REFERENCES semester (term), 
+	FOREIGN KEY(id_section) REFERENCES sectiondb (id)
+);
+
+CREATE INDEX ix_scheduleentrydb_crn ON scheduleentrydb (crn);
+
+CREATE INDEX ix_scheduleentrydb_id_section ON scheduleentrydb (id_section);
+
+CREATE INDEX ix_scheduleentrydb_subject ON scheduleentrydb (subject);
+
+CREATE INDEX ix_scheduleentrydb_term ON scheduleentrydb (term);
+
+CREATE INDEX ix_scheduleentrydb_course_code ON scheduleentrydb (course_code);
+
+CREATE INDEX ix_scheduleentrydb_year ON scheduleentrydb (year);
+
+INSERT INTO metadata (field, value) VALUES ('db_version', '2');
@@ -0,0 +1,54 @@
+import asyncio
+import contextvars
+import sqlite3
+
+import httpx
+from fastapi_cache import FastAPICache
+
+
+def test_refresh_warms_the_new_database_before_serving_it(api):
+    async def main():
+        async with api.lifespan(api.app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test") as client:
+                # warmed at startup
+                r = await client.get("/v1/index/semesters")
+                assert r.headers["x-fastapi-cache"] == "HIT"
+                before = r.json()
+
+                connection = sqlite3.connect(api.DB_LOCATION)
+                connection.execute("INSERT INTO semester (id, year, term) VALUES ('SMTR-2030-10', 2030, 10)")
+                connection.commit()
+                try:
+                    seen_during_warmup = []
+                    warm_cache = api.warm_cache
+
+                    async def warm_cache_and_look():
+                        stats = await warm_cache()
+                        # a request from outside of the refresh still gets the database being served
+                        request = asyncio.create_task(client.get("/v1/index/semesters"), context=contextvars.Context())
+                        seen_during_warmup.append((await request).json())
+                        return stats
+
+                    api.warm_cache = warm_cache_and_look
+                    try:
+                        old_generation = api.served_generation
+                        await api.refresh_snapshot()
+                    finally:
+                        api.warm_cache = warm_cache
+
+                    assert seen_during_warmup == [before]
+
+                    r = await client.get("/v1/index/semesters")
+                    assert r.headers["x-fastapi-cache"] == "HIT"
+                    assert r.json() != before
+                    assert r.json()["semesters"][0]["year"] == 2030
+
+                    # entries of the old database are gone
+                    assert not [key for key in FastAPICache.get_backend()._store if key.startswith(f"{old_generation}:")]
+                finally:
+                    connection.execute("DELETE FROM semester WHERE id = 'SMTR-2030-10'")
+                    connection.commit()
+                    connection.close()
+                    await api.refresh_snapshot()
+
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+import asyncio
+import base64
+import gzip
+import os
+import shutil
+import sqlite3
+
+import httpx
+import orjson
+from sqlmodel import Session, select
+
+from conftest import buildDatabase
+from Controller import CHANGESETS_DIRECTORY, COMPACT_DB_TABLES, Controller
+from sdk.api.Changesets import ChangesetLog
+from sdk.schema.sources.Section import SectionDB
+
+
+def applyChangeset(db_path: str, body: bytes) -> None:
+    """What a client does with /v1/export/changes."""
+    connection = sqlite3.connect(db_path)
+    for line in body.splitlines()[1:]:
+        change = orjson.loads(line)
+        table = change["table"]
+        blobs = {c[1] for c in connection.execute(f"PRAGMA table_info({table})") if c[2].upper() == "BLOB"}
+        if change["op"] == "delete":
+            key = change["key"]
+            connection.execute(f"DELETE FROM {table} WHERE " + " AND ".join(f"{c} = ?" for c in key), list(key.values()))
+        else:
+            row = {c: base64.b64decode(v) if c in blobs and v is not None else v for c, v in change["row"].items()}
+            connection.execute(f"INSERT OR REPLACE INTO {table} ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})", list(row.values()))
+    connection.commit()
+    connection.close()
+
+
+def dumpTables(db_path: str) -> dict[str, set]:
+    connection = sqlite3.connect(db_path)
+    tables = {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    out = {table: set(connection.execute(f"SELECT * FROM {table}")) for table in COMPACT_DB_TABLES if table in tables}
+    connection.close()
+    return out
+
+
+def test_changeset_turns_the_previous_build_into_the_next(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    buildDatabase(str(tmp_path / "database.db"))
+    controller = Controller(str(tmp_path / "database.db"))
+    path = str(tmp_path / "compact.db")
+
+    controller._generateCourseDatabase(path)
+    shutil.copy(path, tmp_path / "client.db")
+    # the first build has nothing to diff against
+    log = ChangesetLog(CHANGESETS_DIRECTORY)
+    assert log.index() == {"generation": 1, "since": 1, "changes": None}
+
+    with Session(controller.engine) as session:
+        section = session.exec(select(SectionDB).where(SectionDB.subject == "CPSC")).first()
+        section_id = section.id
+        section.seats = "41" if section.seats != "41" else "40"
+        session.delete(session.exec(select(SectionDB).where(SectionDB.subject == "HIST")).first())
+        session.commit()
+
+    controller._generateCourseDatabase(path)
+    controller.engine.dispose()
+    assert log.index()["generation"] == 2 and log.index()["since"] == 1
+
+    with gzip.open(log.path(2), "rb") as fi:
+        body = fi.read()
+    changes = [orjson.loads(line) for line in body.splitlines()]
+    assert changes[0] == {"generation": 2, "previous": 1}
+    changes = changes[1:]
+    assert any(c["op"] == "upsert" and c["table"] == "sectiondb" and c["row"]["id"] == section_id for c in changes)
+    assert any(c["op"] == "delete" and c["table"] == "sectiondb" for c in changes)
+
+    applyChangeset(str(tmp_path / "client.db"), body)
+    assert dumpTables(str(tmp_path / "client.db")) == dumpTables(path)
+
+
+def test_changes_route_falls_back_to_the_full_download(api):
+    log = ChangesetLog(api.CHANGESETS_DIRECTORY)
+    log.write(1, None)
+    log.write(2, [])
+    log.write(3, [{"op": "delete", "table": "sectiondb", "key": {"id": "SECT-X"}}])
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test") as client:
+            r = await client.get("/v1/export/changes", params={"since": 1})
+            assert r.status_code == 200
+            assert r.headers["x-generation"] == "3"
+            assert [orjson.loads(line) for line in r.content.splitlines()] == [
+                {"generation": 2, "previous": 1},
+                {"generation": 3, "previous": 2},
+                {"op": "delete", "table": "sectiondb", "key": {"id": "SECT-X"}},
+            ]
+
+            # older than the history that is kept
+            r = await client.get("/v1/export/changes", params={"since": 0})
+            assert r.status_code == 307
+            assert r.headers["location"] == "/v1/export/database.db"
+
+            r = await client.get("/v1/export/changes", params={"since": 4})
+            assert r.status_code == 400
+
+            # pruned by a newer build after index.json was read
+            os.remove(log.path(3))
+            r = await client.get("/v1/export/changes", params={"since": 1})
+            assert r.status_code == 307
+
+    try:
+        asyncio.run(main())
+    finally:
+        shutil.rmtree(api.CHANGESETS_DIRECTORY)
@@ -0,0 +1,48 @@
+import asyncio
+import os
+
+import httpx
+import pyarrow.dataset
+import pyarrow.ipc
+from sqlmodel import Session, func, select
+
+from sdk.api import ColumnarExport
+from sdk.schema.sources.Section import SectionDB
+
+
+def test_parquet_export_is_partitioned_by_semester(api, tmp_path):
+    directory = str(tmp_path / "columnar")
+    with Session(api.engine) as session:
+        stats = ColumnarExport.writeParquetExport(session, directory)
+        count = session.exec(select(func.count()).select_from(SectionDB)).one()
+    assert stats["files"] > 0
+
+    sections = pyarrow.dataset.dataset(os.path.join(directory, "sections"), format="parquet", partitioning="hive").to_table()
+    assert sections.num_rows == count
+    assert pyarrow.types.is_dictionary(sections.schema.field("subject").type)
+
+    untouched = os.path.join(directory, "sections", "year=2024", "term=10", "data.parquet")
+    replaced = os.path.join(directory, "sections", "year=2025", "term=10", "data.parquet")
+    before = os.stat(untouched).st_ino, os.stat(replaced).st_ino
+
+    # an hourly update only rewrites the semesters it changed
+    with Session(api.engine) as session:
+        ColumnarExport.writeParquetExport(session, directory, {(2025, 10)})
+    assert os.stat(untouched).st_ino == before[0]
+    assert os.stat(replaced).st_ino != before[1]
+    assert not os.path.exists(os.path.join(directory, "sections.tmp"))
+
+
+def test_arrow_route_streams_a_semester(api):
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test") as client:
+            r = await client.get("/v1/export/arrow/2024/30/schedules")
+            assert r.status_code == 200
+            table = pyarrow.ipc.open_stream(r.content).read_all()
+            assert table.num_rows > 0
+            assert set(table.column("term").to_pylist()) == {30}
+
+            r = await client.get("/v1/export/arrow/2024/30/nothing")
+            assert r.status_code == 404
+
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+import gzip
+import sqlite3
+
+from conftest import buildDatabase
+from Controller import COMPACT_DB_PAGE_SIZE, COMPACT_DB_TABLES, Controller
+from sdk.api.Prebuilts import compressFile
+
+
+def test_compact_db_only_has_the_exported_tables(tmp_path, monkeypatch):
+    # changesets are written relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    buildDatabase(str(tmp_path / "database.db"))
+    controller = Controller(str(tmp_path / "database.db"))
+    path = str(tmp_path / "compact.db")
+    controller._generateCourseDatabase(path)
+    controller.engine.dispose()
+
+    connection = sqlite3.connect(path)
+    tables = {name for (name,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert tables <= set(COMPACT_DB_TABLES)
+    assert "sectiondb" in tables and "coursesummarydb" not in tables
+    assert connection.execute("PRAGMA page_size").fetchone()[0] == COMPACT_DB_PAGE_SIZE
+    assert connection.execute("SELECT count(*) FROM sectiondb").fetchone()[0] > 0
+    connection.close()
+
+    with open(path, "rb") as fi:
+        data = fi.read()
+    with gzip.open(path + ".gz", "rb") as fi:
+        assert fi.read() == data
+
+
+def test_gzip_is_deterministic(tmp_path):
+    path = tmp_path / "compact.db"
+    path.write_bytes(b"sqlite pages " * 10000)
+
+    compressFile(str(path))
+    first = (tmp_path / "compact.db.gz").read_bytes()
+    compressFile(str(path))
+    assert (tmp_path / "compact.db.gz").read_bytes() == first
+
+    # the header has no timestamp and names the real file, see RFC 1952
+    assert first[4:8] == b"\x00\x00\x00\x00"
+    assert first[10:].startswith(b"compact.db\x00")
@@ -0,0 +1,57 @@
+import asyncio
+import os
+
+import httpx
+
+
+def test_database_routes_answer_304_before_routing(api):
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test") as client:
+            for path, params in [("/v1/index/semesters", {}), ("/v2/search/courses", {"q": "cpsc"})]:
+                r = await client.get(path, params=params)
+                assert r.status_code == 200
+                etag = r.headers["etag"]
+                last_modified = r.headers["last-modified"]
+                assert etag == f'W/"{api.current_catalog().version}"'
+
+                r = await client.get(path, params=params, headers={"If-None-Match": etag})
+                assert r.status_code == 304
+                assert r.content == b""
+                assert r.headers["etag"] == etag
+
+                r = await client.get(path, params=params, headers={"If-Modified-Since": last_modified})
+                assert r.status_code == 304
+
+                r = await client.get(path, params=params, headers={"If-None-Match": 'W/"something else"'})
+                assert r.status_code == 200
+
+    asyncio.run(main())
+
+
+def test_database_download_can_be_resumed(api):
+    path = "database/prebuilts/compact.db.gz"
+    data = os.urandom(4096)
+    with open(path, "wb") as fi:
+        fi.write(data)
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test") as client:
+            r = await client.get("/v1/export/database.db")
+            assert r.status_code == 200
+            assert r.content == data
+            # a gzip file, not a gzip encoded response
+            assert "content-encoding" not in r.headers
+            etag = r.headers["etag"]
+
+            r = await client.get("/v1/export/database.db", headers={"Range": "bytes=1000-", "If-Range": etag})
+            assert r.status_code == 206
+            assert r.headers["content-range"] == "bytes 1000-4095/4096"
+            assert r.content == data[1000:]
+
+            r = await client.get("/v1/export/database.db", headers={"If-None-Match": etag})
+            assert r.status_code == 304
+
+    try:
+        asyncio.run(main())
+    finally:
+        os.remove(path)
@@ -0,0 +1,39 @@
+import asyncio
+
+import httpx
+
+from sdk.schema.aggregated.CourseDocument import CourseDocumentDB
+
+
+def test_prebuilt_document_matches_the_relational_route(api):
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test") as client:
+            r = await client.get("/v1/courses/CPSC/1050", headers={"Accept-Encoding": "gzip"})
+            assert r.status_code == 200
+            assert r.headers["content-encoding"] == "gzip"
+            etag = r.headers["etag"]
+            prebuilt = r.json()
+
+            # clients without gzip get the same document decompressed
+            r = await client.get("/v1/courses/cpsc/1050", headers={"Accept-Encoding": "identity"})
+            assert "content-encoding" not in r.headers
+            assert r.json() == prebuilt
+
+            r = await client.get("/v1/courses/CPSC/1050", headers={"If-None-Match": etag})
+            assert r.status_code == 304
+
+            r = await client.get("/v1/courses/CPSC/9999")
+            assert r.status_code == 404
+
+            tables = api.catalog.tables
+            api.catalog.tables = tables - {CourseDocumentDB.__tablename__}
+            try:
+                r = await client.get("/v1/courses/CPSC/1050")
+            finally:
+                api.catalog.tables = tables
+            assert r.status_code == 200
+            # only the database wide validator, not the document's own
+            assert r.headers["etag"].startswith("W/") and r.headers["etag"] != etag
+            assert r.json() == prebuilt
+
+    asyncio.run(main())
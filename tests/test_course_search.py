@@ -0,0 +1,41 @@
+import inspect
+
+from sqlmodel import Session
+
+from sdk.search.CourseSearchIndex import ftsQuery
+
+
+def route(api, path):
+    endpoint = next(r.endpoint for r in api.app.routes if getattr(r, "path", None) == path)
+    return inspect.unwrap(endpoint)
+
+
+def test_fts_query_restricts_numbers_to_course_codes():
+    assert ftsQuery("cpsc 1050") == 'course_code : "1050"* AND "cpsc"*'
+
+
+def test_fts_query_matches_any_word_unless_match_all():
+    assert ftsQuery("intro biol") == '("intro"* OR "biol"*)'
+    assert ftsQuery("intro biol", column="title", match_all=True) == 'title : "intro"* AND title : "biol"*'
+
+
+def test_fts_query_quotes_user_input():
+    assert ftsQuery('data" OR NEAR(x') == '("data"* OR "OR"* OR "NEAR"* OR "x"*)'
+    assert ftsQuery("  ...  ") is None
+
+
+def test_search_courses_uses_the_index(api):
+    search = route(api, "/v1/search/courses")
+    with Session(api.engine) as session:
+        result = search(session=session, query="CPSC 1050", transfers_to=[])
+        assert [(c.subject, c.course_code) for c in result.courses] == [("CPSC", "1050")]
+        assert "<b>" in result.courses[0].snippet
+
+        # words match any column, courses matching either word are returned
+        result = search(session=session, query="biol chem", transfers_to=[])
+        assert {c.subject for c in result.courses} == {"BIOL", "CHEM"}
+        assert result.course_count == 10
+
+        # FTS syntax in the query is searched for, not run
+        result = search(session=session, query='"NEAR(', transfers_to=[])
+        assert result.courses == []
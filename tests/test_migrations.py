@@ -0,0 +1,162 @@
+import os
+import sqlite3
+
+import pytest
+
+from Controller import Controller
+from sdk.parsers.SemesterParser import parseCount, parseSectionStatus
+from sdk.schema import Migrations
+from sdk.schema.Migrations import LATEST_DB_VERSION, MIGRATIONS
+from sdk.schema.sources.ScheduleEntry import scheduleEntryId
+from sdk.schema.sources.Section import sectionKey
+
+
+BASELINE_SCHEMA = os.path.join(os.path.dirname(__file__), "fixtures", "baseline_schema.sql")
+
+BASELINE_SECTIONS = [
+    # crn, seats, waitlist
+    (31005, "5", "3"),
+    (31006, "Cancel", None),
+    (31007, "Inact", "N/A"),
+]
+
+BASELINE_SCHEDULE = [
+    # crn, type, days, time
+    (31005, "Lecture", "M-W----", "1030-1220"),
+    (31005, "Lab", "--W----", "1230-1420"),
+    (31005, "Lab", "--W----", "1230-1420"),
+    (31006, "Lecture", "-T-R---", "0830-1020"),
+    (31007, "Exam", "-------", "-"),
+]
+
+
+def baselineDatabase(db_path: str) -> None:
+    """A database as it was before schema migrations existed (db_version 2), with a few rows."""
+    connection = sqlite3.connect(db_path)
+    with open(BASELINE_SCHEMA) as f:
+        connection.executescript(f.read())
+
+    connection.execute("INSERT INTO coursedb (subject, course_code, id) VALUES ('CPSC', '1050', 'CRSE-CPSC-1050')")
+    connection.execute("INSERT INTO semester (id, year, term) VALUES ('SMTR-2024-30', 2024, 30)")
+    for crn, seats, waitlist in BASELINE_SECTIONS:
+        connection.execute(
+            """INSERT INTO sectiondb (id, crn, seats, waitlist, section, credits, subject, course_code, year, term, id_semester, id_course)
+            VALUES (?, ?, ?, ?, '001', 3.0, 'CPSC', '1050', 2024, 30, 'SMTR-2024-30', 'CRSE-CPSC-1050')""",
+            (f"SECT-CPSC-1050-2024-30-{crn}", crn, seats, waitlist),
+        )
+
+    # old ids ended with the position of the entry in the section
+    positions: dict[int, int] = {}
+    for crn, type, days, time in BASELINE_SCHEDULE:
+        n = positions.get(crn, 0)
+        positions[crn] = n + 1
+        connection.execute(
+            """INSERT INTO scheduleentrydb (id, crn, type, days, time, room, instructor, subject, course_code, year, term, id_section)
+            VALUES (?, ?, ?, ?, ?, 'A306', 'Bob Ross', 'CPSC', '1050', 2024, 30, ?)""",
+            (f"SCHD-CPSC-1050-2024-30-{crn}-{n}", crn, type, days, time, f"SECT-CPSC-1050-2024-30-{crn}"),
+        )
+    connection.commit()
+    connection.close()
+
+
+def expectedScheduleIds() -> list[str]:
+    taken: dict[int, set[str]] = {}
+    return sorted(
+        scheduleEntryId(f"SECT-CPSC-1050-2024-30-{crn}", type, days, time, None, None, taken.setdefault(crn, set()))
+        for crn, type, days, time in BASELINE_SCHEDULE
+    )
+
+
+def upgrade(db_path: str) -> None:
+    c = Controller(db_path)
+    c.create_db_and_tables()
+    c.engine.dispose()
+
+
+def test_migrations_upgrade_baseline_database(tmp_path):
+    db_path = str(tmp_path / "database.db")
+    baselineDatabase(db_path)
+    upgrade(db_path)
+
+    connection = sqlite3.connect(db_path)
+    assert Migrations.readDbVersion(connection) == LATEST_DB_VERSION
+    assert [r[0] for r in connection.execute("SELECT version FROM schemamigration ORDER BY version")] == [m.version for m in MIGRATIONS]
+
+    sections = connection.execute("SELECT crn, seats_open, waitlist_count, status, section_key FROM sectiondb ORDER BY crn").fetchall()
+    for (crn, seats, waitlist), row in zip(BASELINE_SECTIONS, sections):
+        status = parseSectionStatus(seats)
+        assert row == (crn, parseCount(seats), parseCount(waitlist), status.name if status else None, sectionKey(2024, 30, crn))
+
+    assert connection.execute("SELECT count(*) FROM scheduleentrydb WHERE section_key IS NULL").fetchone()[0] == 0
+    assert [r[0] for r in connection.execute("SELECT id FROM scheduleentrydb ORDER BY id")] == expectedScheduleIds()
+
+    indexes = {r[1] for r in connection.execute("PRAGMA index_list(sectiondb)")}
+    assert {"ix_sectiondb_year_term_status_waitlist", "ix_sectiondb_year_term_crn"} <= indexes
+
+    # existing databases are switched to WAL too, but keep their page size
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert connection.execute("PRAGMA page_size").fetchone()[0] == 4096
+    connection.close()
+
+
+def test_migrations_run_once(tmp_path):
+    db_path = str(tmp_path / "database.db")
+    baselineDatabase(db_path)
+    upgrade(db_path)
+
+    connection = sqlite3.connect(db_path)
+    before = connection.execute("SELECT * FROM schemamigration ORDER BY version").fetchall()
+    connection.close()
+
+    assert Migrations.runMigrations(db_path) == []
+    upgrade(db_path)
+
+    connection = sqlite3.connect(db_path)
+    assert connection.execute("SELECT * FROM schemamigration ORDER BY version").fetchall() == before
+    connection.close()
+
+
+def test_interrupted_backfill_resumes(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "database.db")
+    baselineDatabase(db_path)
+
+    # fail after the first committed batch of every backfill, once
+    monkeypatch.setattr(Migrations, "MIGRATION_BATCH_SIZE", 1)
+    commitBatch = Migrations.commitBatch
+    failed = False
+
+    def failingCommitBatch(connection):
+        nonlocal failed
+        commitBatch(connection)
+        if not failed:
+            failed = True
+            raise RuntimeError("interrupted")
+
+    monkeypatch.setattr(Migrations, "commitBatch", failingCommitBatch)
+    with pytest.raises(RuntimeError):
+        upgrade(db_path)
+
+    connection = sqlite3.connect(db_path)
+    assert Migrations.readDbVersion(connection) == 2
+    # the first batch stayed committed
+    assert connection.execute("SELECT count(*) FROM sectiondb WHERE status IS NOT NULL").fetchone()[0] == 1
+    connection.close()
+
+    upgrade(db_path)
+
+    connection = sqlite3.connect(db_path)
+    assert Migrations.readDbVersion(connection) == LATEST_DB_VERSION
+    assert connection.execute("SELECT count(*) FROM sectiondb WHERE status IS NULL").fetchone()[0] == 0
+    assert connection.execute("SELECT count(*) FROM scheduleentrydb WHERE section_key IS NULL").fetchone()[0] == 0
+    assert [r[0] for r in connection.execute("SELECT id FROM scheduleentrydb ORDER BY id")] == expectedScheduleIds()
+    connection.close()
+
+
+def test_new_database_starts_at_latest_version(tmp_path):
+    db_path = str(tmp_path / "database.db")
+    upgrade(db_path)
+
+    connection = sqlite3.connect(db_path)
+    assert Migrations.readDbVersion(connection) == LATEST_DB_VERSION
+    assert connection.execute("SELECT count(*) FROM schemamigration").fetchone()[0] == 0
+    connection.close()
@@ -0,0 +1,41 @@
+import asyncio
+
+import httpx
+import orjson
+from sqlmodel import Session, func, select
+
+from sdk.schema.aggregated.Course import CourseDB
+from sdk.schema.sources.Section import SectionDB
+
+
+def test_ndjson_export_streams_every_row(api):
+    with Session(api.engine) as session:
+        course_count = session.exec(select(func.count()).select_from(CourseDB)).one()
+        section_count = session.exec(select(func.count()).select_from(SectionDB)).one()
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test") as client:
+            r = await client.get("/v1/export/ndjson/courses")
+            assert r.status_code == 200
+            courses = [orjson.loads(line) for line in r.content.splitlines()]
+            assert len(courses) == course_count
+
+            r = await client.get("/v1/courses/CPSC/1050")
+            assert next(c for c in courses if c["id"] == "CRSE-CPSC-1050") == r.json()
+
+            r = await client.get("/v1/export/ndjson/sections")
+            sections = [orjson.loads(line) for line in r.content.splitlines()]
+            assert len(sections) == section_count
+            assert len({s["id"] for s in sections}) == section_count
+            assert all("schedule" in s for s in sections)
+
+            r = await client.get("/v1/export/ndjson/nothing")
+            assert r.status_code == 404
+
+            # the first page used to skip all but its last course
+            r = await client.get("/v1/export/all", params={"page": 1})
+            page = r.json()
+            assert page["total_courses"] == course_count
+            assert len(page["courses"]) == min(course_count, page["courses_per_page"])
+
+    asyncio.run(main())
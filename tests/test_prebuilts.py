@@ -0,0 +1,42 @@
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from conftest import buildDatabase
+from Controller import PREBUILTS_DIRECTORY, Controller
+from sdk.api.Prebuilts import loadPrebuiltManifest
+from sdk.schema.sources.Section import SectionDB
+
+
+def test_hourly_update_only_rerenders_what_changed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "database" / "prebuilts").mkdir(parents=True)
+    buildDatabase("database/database.db")
+
+    controller = Controller("database/database.db")
+    assert controller.genIndexesAndPreBuilts() is True
+    before = loadPrebuiltManifest(PREBUILTS_DIRECTORY + "static/")["files"]
+
+    # nothing changed, nothing is regenerated
+    assert controller.genIndexesAndPreBuilts(set()) is False
+
+    with Session(controller.engine) as session:
+        event.listen(session, "before_flush", controller._recordChanges)
+        section = session.exec(select(SectionDB).where(
+            SectionDB.subject == "CPSC", SectionDB.course_code == "1050", SectionDB.year == 2025, SectionDB.term == 10,
+        )).first()
+        section.seats = "42" if section.seats != "42" else "43"
+        session.commit()
+    assert controller.changed == {("CPSC", "1050", 2025, 10)}
+
+    assert controller.genIndexesAndPreBuilts(controller.changed) is True
+    incremental = loadPrebuiltManifest(PREBUILTS_DIRECTORY + "static/")["files"]
+
+    assert incremental["/v1/courses/CPSC/1050"]["file"] != before["/v1/courses/CPSC/1050"]["file"]
+    assert incremental["/v1/semester/2025/10/sections"]["file"] != before["/v1/semester/2025/10/sections"]["file"]
+    assert incremental["/v1/courses/ENGL/1050"] == before["/v1/courses/ENGL/1050"]
+    assert incremental["/v1/semester/2024/30/sections"] == before["/v1/semester/2024/30/sections"]
+
+    # a full run renders exactly what the incremental one kept or wrote
+    controller.genIndexesAndPreBuilts()
+    assert loadPrebuiltManifest(PREBUILTS_DIRECTORY + "static/")["files"] == incremental
+    controller.engine.dispose()
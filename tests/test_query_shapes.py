@@ -0,0 +1,29 @@
+from sqlalchemy import create_engine, text
+
+from sdk.api.QueryShapes import QUERY_SHAPE_SAMPLES, QueryShapeRecorder, decodeParameters, loadQueryShapes
+
+
+def test_recorder_merges_shapes_into_the_file(tmp_path):
+    path = str(tmp_path / "query_shapes.json")
+    engine = create_engine("sqlite://")
+    recorder = QueryShapeRecorder(path)
+    recorder.attach(engine)
+
+    with engine.connect() as connection:
+        connection.execute(text("CREATE TABLE t (a INTEGER, b BLOB)"))
+        for i in range(QUERY_SHAPE_SAMPLES + 2):
+            connection.execute(text("SELECT a FROM t WHERE a = :a AND b = :b"), {"a": i, "b": b"\x00\x01"})
+    assert recorder.save() == 1
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT a FROM t WHERE a = :a AND b = :b"), {"a": 0, "b": b""})
+    recorder.save()
+
+    shapes = loadQueryShapes(path)
+    # only SELECTs are recorded
+    assert len(shapes) == 1
+    shape = next(iter(shapes.values()))
+    assert shape["count"] == QUERY_SHAPE_SAMPLES + 3
+    assert len(shape["parameters"]) == QUERY_SHAPE_SAMPLES
+    assert decodeParameters(shape["parameters"][0]) == (0, b"\x00\x01")
+
@@ -0,0 +1,38 @@
+import inspect
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session
+
+from sdk.api.ReferenceCatalog import ReferenceCatalog
+from sdk.search.CourseSearchIndex import COURSE_SEARCH_TABLE
+
+
+def test_catalog_of_the_test_database(api):
+    with Session(api.engine) as session:
+        catalog = ReferenceCatalog.build(session)
+
+    assert set(catalog.destinations) == {"UBCV", "SFU", "UVIC", "KPU", "DOUG"}
+    assert catalog.destinations["SFU"] == "SFU University"
+    assert catalog.latest_semester == (2025, 10)
+    assert catalog.semesters[-1] == (2023, 10)
+    assert catalog.has_semester(2024, 20)
+    assert not catalog.has_semester(2024, 40)
+    assert catalog.subjects == ["BIOL", "CHEM", "CPSC", "ENGL", "HIST", "MATH"]
+    assert catalog.has_table(COURSE_SEARCH_TABLE)
+    assert not catalog.has_table("nothing")
+
+
+def test_routes_validate_against_the_catalog(api):
+    api.check_year_term_valid_raise_if_not(2024, 30)
+    # after the latest semester, and before the first one
+    for year, term in [(2025, 20), (2022, 30)]:
+        with pytest.raises(HTTPException) as e:
+            api.check_year_term_valid_raise_if_not(year, term)
+        assert e.value.status_code == 404
+
+    search = next(inspect.unwrap(r.endpoint) for r in api.app.routes if getattr(r, "path", None) == "/v1/search/courses")
+    with Session(api.engine) as session:
+        with pytest.raises(HTTPException) as e:
+            search(session=session, query="cpsc", transfers_to=["NOPE"])
+    assert e.value.status_code == 404
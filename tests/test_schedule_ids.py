@@ -0,0 +1,57 @@
+from sqlmodel import Session, select
+
+from conftest import buildDatabase
+from Controller import Controller
+from sdk.schema.sources.ScheduleEntry import ScheduleEntryDB, scheduleEntryId
+
+
+def test_schedule_entry_id_is_stable():
+    # stored in the database and handed out by the api, so it must not change between releases
+    assert scheduleEntryId("SECT-CPSC-1050-2024-30-31005", "Lecture", "M-W----", "1030-1220", None, None, set()) \
+        == "SCHD-CPSC-1050-2024-30-31005-a1b0789a"
+
+
+def test_schedule_entry_id_numbers_duplicates():
+    taken: set[str] = set()
+    ids = [scheduleEntryId("SECT-CPSC-1050-2024-30-31005", "Lecture", "M-W----", "1030-1220", None, None, taken) for _ in range(3)]
+    assert ids[1] == f"{ids[0]}-2"
+    assert ids[2] == f"{ids[0]}-3"
+
+
+def test_schedule_entry_id_ignores_position():
+    meetings = [("Lecture", "M-W----", "1030-1220"), ("Lab", "--W----", "1230-1420"), ("Exam", "-------", "-")]
+
+    def ids(meetings):
+        taken: set[str] = set()
+        return {m: scheduleEntryId("SECT-CPSC-1050-2024-30-31005", *m, None, None, taken) for m in meetings}
+
+    # the registrar listing a section's meetings in another order doesn't change their ids
+    assert ids(meetings) == ids(meetings[::-1])
+
+
+def test_reconcile_schedules_only_touches_what_changed(tmp_path):
+    db_path = str(tmp_path / "database.db")
+    buildDatabase(db_path)
+    controller = Controller(db_path)
+
+    with Session(controller.engine) as session:
+        existing = session.exec(select(ScheduleEntryDB).where(ScheduleEntryDB.year == 2024, ScheduleEntryDB.term == 30)).all()
+        parsed = [ScheduleEntryDB(**s.model_dump()) for s in existing]
+        ids = {s.id for s in existing}
+
+    moved, removed = parsed[0], parsed[1]
+    moved.room = "Z999"
+    parsed.remove(removed)
+    added = ScheduleEntryDB(**{**parsed[2].model_dump(), "type": "Seminar"})
+    added.id = scheduleEntryId(added.id_section, added.type, added.days, added.time, added.start, added.end, ids)
+    parsed.append(added)
+
+    with Session(controller.engine) as session:
+        controller._reconcileSchedules(session, 2024, 30, parsed)
+        assert (len(session.new), len(session.dirty), len(session.deleted)) == (1, 1, 1)
+        session.commit()
+
+        stored = {s.id: s for s in session.exec(select(ScheduleEntryDB).where(ScheduleEntryDB.year == 2024, ScheduleEntryDB.term == 30)).all()}
+    assert set(stored) == {s.id for s in parsed}
+    assert stored[moved.id].room == "Z999"
+    assert removed.id not in stored
@@ -0,0 +1,50 @@
+import pytest
+
+from sdk.parsers.ScheduleTimes import SLOTS_PER_DAY, maskFromBytes, maskToBytes, maskWithin, parseClockTime, parseDays, scheduleMask, windowMask
+from sdk.schema.sources.Section import sectionKey
+
+
+def test_parse_days():
+    assert parseDays("M-W----") == [0, 2]
+    assert parseDays("tr") == [1, 3]
+    with pytest.raises(ValueError):
+        parseDays("X")
+    with pytest.raises(ValueError):
+        parseDays("T-W----")
+
+
+def test_parse_clock_time():
+    assert parseClockTime("0000") == 0
+    assert parseClockTime("1030") == 42
+    assert parseClockTime("1020") == 41
+    assert parseClockTime("1020", round_up=True) == 42
+    assert parseClockTime("2400") == SLOTS_PER_DAY
+    with pytest.raises(ValueError):
+        parseClockTime("10:30")
+
+
+def test_schedule_mask():
+    monday_morning = scheduleMask("M------", "0830-1020")
+    assert monday_morning == windowMask([0], 34, 42)
+    assert scheduleMask("-------", "-") == 0
+    assert scheduleMask("M------", "TBA") == 0
+    # conflicts are shared bits
+    assert monday_morning & scheduleMask("M-W----", "1000-1120")
+    assert not monday_morning & scheduleMask("-T-----", "0830-1020")
+
+
+def test_mask_within():
+    section = maskToBytes(scheduleMask("-T-R---", "1530-1720"))
+    assert maskFromBytes(section) == scheduleMask("-T-R---", "1530-1720")
+    assert maskWithin(section, maskToBytes(windowMask([1, 3], parseClockTime("1500")))) == 1
+    assert maskWithin(section, maskToBytes(windowMask([1], parseClockTime("1500")))) == 0
+    # sections that never meet don't match any window
+    assert maskWithin(None, maskToBytes(windowMask(list(range(7))))) == 0
+
+
+def test_section_keys_of_a_semester_are_one_range():
+    keys = sorted(sectionKey(year, term, crn) for year in (2023, 2024) for term in (10, 20, 30) for crn in (10001, 31005, 99999))
+    assert sectionKey(2024, 30, 31005) == 20243031005
+    # ordered by semester then crn, so a semester is everything between crn 0 and 99999
+    assert keys == [sectionKey(year, term, crn) for year in (2023, 2024) for term in (10, 20, 30) for crn in (10001, 31005, 99999)]
+    assert sectionKey(2024, 20, 99999) < sectionKey(2024, 30, 0) <= sectionKey(2024, 30, 31005) <= sectionKey(2024, 30, 99999) < sectionKey(2025, 10, 0)
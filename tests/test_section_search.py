@@ -0,0 +1,140 @@
+import asyncio
+import inspect
+import itertools
+import random
+
+import httpx
+from sqlmodel import Session
+
+
+def sectionSearchCombinations(count: int) -> list[dict]:
+    combinations = [
+        dict(subject=subject, course_code=course_code, title_search=title, instructor_search=instructor, year=year, term=term,
+             online=online, attr_ut=attr_ut, filter_open_seats=open_seats, filter_no_waitlist=no_waitlist, filter_not_cancelled=not_cancelled)
+        for subject, course_code, title, instructor, (year, term), online, attr_ut, open_seats, no_waitlist, not_cancelled in itertools.product(
+            [None, "CPSC"], [None, 1050, 21, 2], [None, "to", "course 1", "Topics", "nothing like it"], [None, "holdi", "ROSS"],
+            [(None, None), (2024, None), (2024, 30), (None, 20)], [None, True, False], [None, True],
+            [False, True], [False, True], [False, True],
+        )
+    ]
+    return random.Random(0).sample(combinations, count)
+
+
+def test_section_index_matches_sql(api):
+    index = api.section_index
+    assert index is not None
+
+    search = inspect.unwrap(api.search_sections_v2_endpoint)
+    defaults = dict(attr_ar=None, attr_sc=None, attr_hum=None, attr_lsc=None, attr_sci=None, attr_soc=None,
+                    page=1, sections_per_page=100000, days=None, start_after=None, end_before=None, cursor=None)
+    try:
+        with Session(api.engine) as session:
+            for query in sectionSearchCombinations(300):
+                api.section_index = index
+                from_index = search(session=session, **defaults, **query)
+                api.section_index = None
+                from_sql = search(session=session, **defaults, **query)
+
+                assert sorted(s.id for s in from_index.sections) == sorted(s.id for s in from_sql.sections), query
+                assert from_index.total_sections == from_sql.total_sections, query
+    finally:
+        api.section_index = index
+
+
+def test_section_index_pages_in_sql_order(api):
+    search = inspect.unwrap(api.search_sections_v2_endpoint)
+    index = api.section_index
+    defaults = dict(attr_ar=None, attr_sc=None, attr_hum=None, attr_lsc=None, attr_sci=None, attr_soc=None, attr_ut=None,
+                    subject="CPSC", course_code=None, title_search=None, instructor_search=None, year=2024, term=None, online=None,
+                    filter_open_seats=False, filter_no_waitlist=False, filter_not_cancelled=False,
+                    days=None, start_after=None, end_before=None, cursor=None)
+    try:
+        with Session(api.engine) as session:
+            for page in [1, 2, 5]:
+                api.section_index = index
+                from_index = search(session=session, **defaults, page=page, sections_per_page=7)
+                api.section_index = None
+                from_sql = search(session=session, **defaults, page=page, sections_per_page=7)
+
+                assert [s.id for s in from_index.sections] == [s.id for s in from_sql.sections]
+                assert from_index.total_pages == from_sql.total_pages
+    finally:
+        api.section_index = index
+
+
+def test_time_filters_match_sql(api):
+    index = api.section_index
+    search = inspect.unwrap(api.search_sections_v2_endpoint)
+    defaults = dict(attr_ar=None, attr_sc=None, attr_hum=None, attr_lsc=None, attr_sci=None, attr_soc=None, attr_ut=None,
+                    subject=None, course_code=None, title_search=None, instructor_search=None, year=2024, term=None, online=None,
+                    filter_open_seats=False, filter_no_waitlist=False, filter_not_cancelled=False,
+                    page=1, sections_per_page=100000, cursor=None)
+    windows = [
+        dict(days="MW", start_after=None, end_before=None),
+        dict(days="-T-R---", start_after="1000", end_before=None),
+        dict(days=None, start_after="0830", end_before="1430"),
+        dict(days="MTWRF", start_after=None, end_before="1230"),
+        dict(days="F", start_after="1800", end_before=None),
+    ]
+    totals = []
+    try:
+        with Session(api.engine) as session:
+            for window in windows:
+                api.section_index = index
+                from_index = search(session=session, **defaults, **window)
+                api.section_index = None
+                from_sql = search(session=session, **defaults, **window)
+
+                assert sorted(s.id for s in from_index.sections) == sorted(s.id for s in from_sql.sections), window
+                totals.append(from_index.total_sections)
+    finally:
+        api.section_index = index
+
+    assert totals[0] > 0
+    assert totals[-1] == 0
+
+
+def test_cursor_paging_matches_offset_paging(api):
+    async def walkCursor(client, query: str) -> list[str]:
+        r = (await client.get(f"/v2/search/sections?{query}")).json()
+        ids = [s["id"] for s in r["sections"]]
+        while r["next_cursor"]:
+            r = (await client.get(f"/v2/search/sections?{query}&cursor={r['next_cursor']}")).json()
+            ids += [s["id"] for s in r["sections"]]
+        return ids
+
+    async def walkPages(client, query: str) -> list[str]:
+        r = (await client.get(f"/v2/search/sections?{query}")).json()
+        ids = [s["id"] for s in r["sections"]]
+        for page in range(2, r["total_pages"] + 1):
+            ids += [s["id"] for s in (await client.get(f"/v2/search/sections?{query}&page={page}")).json()["sections"]]
+        return ids
+
+    async def main():
+        index = api.section_index
+        async with api.lifespan(api.app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test") as client:
+                for query in ["year=2024", "subject=CPSC", "instructor_search=a", "online=true"]:
+                    for mode in ["index", "sql"]:
+                        if mode == "sql":
+                            api.section_index = None
+                        try:
+                            # the mode is part of the query so the two don't share cached pages
+                            q = f"{query}&sections_per_page=7&mode={mode}"
+                            by_cursor = await walkCursor(client, q)
+                            by_page = await walkPages(client, q)
+                        finally:
+                            api.section_index = index
+
+                        assert by_cursor == by_page, (query, mode)
+                        assert len(set(by_cursor)) == len(by_cursor)
+
+                r = await client.get("/v2/search/sections?year=2024&cursor=garbage")
+                assert r.status_code == 400
+
+                # a cursor only works for the query it was made for
+                first = (await client.get("/v2/search/sections?year=2024&sections_per_page=5")).json()
+                r = await client.get(f"/v2/search/sections?year=2025&sections_per_page=5&cursor={first['next_cursor']}")
+                assert r.status_code == 400
+
+    asyncio.run(main())
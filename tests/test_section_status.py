@@ -0,0 +1,37 @@
+import inspect
+
+from sqlmodel import Session, select
+
+from sdk.parsers.SemesterParser import parseCount, parseSectionStatus
+from sdk.schema.sources.Section import SectionDB, SectionStatus
+
+
+def test_typed_seat_columns():
+    assert [parseCount(s) for s in ["12", " 3 ", "-1", "0", "Inact", "N/A", " ", None]] == [12, 3, -1, 0, None, None, None, None]
+    assert [parseSectionStatus(s) for s in ["12", "0", "-1", "Inact", "Cancel", None]] == [
+        SectionStatus.OPEN, SectionStatus.FULL, SectionStatus.FULL, SectionStatus.INACTIVE, SectionStatus.CANCELLED, None,
+    ]
+
+
+def test_no_waitlist_includes_empty_waitlists(api):
+    search = inspect.unwrap(api.search_sections_v2_endpoint)
+    query = dict(attr_ar=None, attr_sc=None, attr_hum=None, attr_lsc=None, attr_sci=None, attr_soc=None, attr_ut=None,
+                 subject=None, course_code=None, title_search=None, instructor_search=None, year=2024, term=30, online=None,
+                 filter_open_seats=False, filter_no_waitlist=True, filter_not_cancelled=False,
+                 page=1, sections_per_page=100000, days=None, start_after=None, end_before=None, cursor=None)
+
+    index = api.section_index
+    try:
+        with Session(api.engine) as session:
+            sections = session.exec(select(SectionDB).where(SectionDB.year == 2024, SectionDB.term == 30)).all()
+            # a waitlist of "0" has nobody on it, same as no waitlist at all
+            expected = sorted(s.id for s in sections if s.waitlist is None or s.waitlist.strip() in ("", "N/A", "0"))
+            assert any(s.waitlist == "0" for s in sections)
+
+            for section_index in [index, None]:
+                api.section_index = section_index
+                found = search(session=session, **query)
+                assert sorted(s.id for s in found.sections) == expected
+    finally:
+        api.section_index = index
+
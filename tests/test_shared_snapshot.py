@@ -0,0 +1,42 @@
+import os
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from Controller import Controller
+
+
+def test_workers_serve_the_published_snapshot(api):
+    controller = Controller(api.DB_LOCATION)
+    first = controller.publishSnapshot()
+    controller.engine.dispose()
+
+    api.USE_SHARED_SNAPSHOT = True
+    try:
+        api.fetchDB()
+        assert api.snapshot_path == first
+        assert api.snapshot_anchor is None
+        with Session(api.engine) as session:
+            assert session.exec(text("SELECT count(*) FROM semester")).one()[0] > 0
+
+        # nothing new was published
+        assert api.buildDB() is None
+
+        controller = Controller(api.DB_LOCATION)
+        second = controller.publishSnapshot(keep=1)
+        controller.engine.dispose()
+        assert not os.path.exists(first)
+
+        new = api.buildDB()
+        assert new.snapshot_path == second
+        api.publishDB(new)
+    finally:
+        api.USE_SHARED_SNAPSHOT = False
+        api.fetchDB()
+
+    assert api.snapshot_path is None
+    assert api.snapshot_anchor is not None
+
+
+def test_unchanged_database_is_not_copied_again(api):
+    assert api.buildDB() is None
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi_cache import FastAPICache
+
+from sdk.api.SingleFlightBackend import SingleFlightBackend, cache
+
+
+def test_single_flight_coalesces_concurrent_misses():
+    backend = SingleFlightBackend()
+    calls = 0
+
+    async def request() -> bytes:
+        nonlocal calls
+        _, value = await backend.get_with_ttl("key")
+        if value is not None:
+            return value
+        calls += 1
+        await asyncio.sleep(0.05)
+        await backend.set("key", b"value", 60)
+        return b"value"
+
+    async def main():
+        return await asyncio.gather(*[request() for _ in range(20)])
+
+    assert asyncio.run(main()) == [b"value"] * 20
+    assert calls == 1
+
+
+def test_single_flight_releases_lease_when_route_fails():
+    backend = SingleFlightBackend()
+    calls = 0
+
+    async def request(fail: bool) -> bytes:
+        nonlocal calls
+        _, value = await backend.get_with_ttl("key")
+        if value is not None:
+            return value
+        calls += 1
+        await asyncio.sleep(0.05)
+        if fail:
+            raise RuntimeError("route failed")
+        await backend.set("key", b"value", 60)
+        return b"value"
+
+    async def main():
+        gathered = asyncio.gather(request(True), *[request(False) for _ in range(5)], return_exceptions=True)
+        return await asyncio.wait_for(gathered, 5)
+
+    results = asyncio.run(main())
+    assert isinstance(results[0], RuntimeError)
+    # the waiting requests ran the route themselves instead of hanging
+    assert results[1:] == [b"value"] * 5
+    assert calls > 1
+
+
+def test_cached_call_releases_its_lease_before_the_task_ends():
+    backend = SingleFlightBackend(wait_timeout=10)
+    FastAPICache.init(backend, prefix="test")
+
+    @cache(expire=60, key_builder=lambda *args, **kwargs: "route")
+    async def route(fail: bool) -> dict:
+        if fail:
+            raise HTTPException(status_code=404)
+        return {"found": True}
+
+    async def main():
+        # several routes run one after another in one task, like a cache warm-up
+        with pytest.raises(HTTPException):
+            await route(fail=True)
+
+        # the failed call must not leave the key leased until this task ends
+        other = asyncio.create_task(route(fail=False))
+        assert await asyncio.wait_for(other, 2) == {"found": True}
+
+    asyncio.run(main())
+
+
+def test_single_flight_serves_stale_value_while_revalidating(monkeypatch):
+    backend = SingleFlightBackend(stale_ttl=600)
+    now = 1_000_000
+    monkeypatch.setattr(SingleFlightBackend, "_now", property(lambda self: now))
+
+    async def main():
+        nonlocal now
+        await backend.set("key", b"old", 10)
+        now += 60
+
+        # the first request after expiry revalidates, the others get the old value right away
+        assert await backend.get_with_ttl("key") == (0, None)
+        assert await backend.get_with_ttl("key") == (0, b"old")
+
+        await backend.set("key", b"new", 10)
+        assert await backend.get_with_ttl("key") == (10, b"new")
+
+        # past stale_ttl the value is gone
+        now += 1000
+        assert await backend.get_with_ttl("key") == (0, None)
+
+    asyncio.run(main())
+
+
+def test_single_flight_clear_keeps_stale_values(monkeypatch):
+    backend = SingleFlightBackend(stale_ttl=600)
+    monkeypatch.setattr(SingleFlightBackend, "_now", property(lambda self: 1_000_000))
+
+    async def main():
+        await backend.set("a", b"a", 60)
+        await backend.set("b", b"b", 60)
+
+        assert await backend.clear(namespace="a") == 1
+        # cleared keys are revalidated by the next request and served stale to the rest
+        assert await backend.get_with_ttl("a") == (0, None)
+        assert await backend.get_with_ttl("a") == (0, b"a")
+        assert await backend.get_with_ttl("b") == (60, b"b")
+
+    asyncio.run(main())
+
+
+def test_single_flight_drop_deletes_entries(monkeypatch):
+    backend = SingleFlightBackend(stale_ttl=600)
+    monkeypatch.setattr(SingleFlightBackend, "_now", property(lambda self: 1_000_000))
+
+    async def main():
+        await backend.set("1:a", b"a", 60)
+        await backend.set("1:b", b"b", 60)
+        await backend.set("2:a", b"c", 60)
+
+        # unlike clear(), nothing is kept around as stale
+        assert await backend.drop("1:") == 2
+        assert await backend.get("1:a") is None
+        assert await backend.get_with_ttl("1:b") == (0, None)
+        assert await backend.get("2:a") == b"c"
+
+    asyncio.run(main())
@@ -0,0 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+
+def test_every_pooled_connection_reads_the_same_snapshot(api):
+    def count_semesters(_):
+        with Session(api.engine) as session:
+            return session.exec(text("SELECT count(*) FROM semester")).one()[0]
+
+    # sqlite:// would hand every thread its own empty database
+    with ThreadPoolExecutor(api.DB_THREADS) as pool:
+        counts = list(pool.map(count_semesters, range(api.DB_THREADS * 2)))
+
+    assert counts[0] > 0
+    assert set(counts) == {counts[0]}
+
+
+def test_snapshot_is_read_only(api):
+    with Session(api.engine) as session:
+        with pytest.raises(OperationalError):
+            session.exec(text("DELETE FROM semester"))
@@ -0,0 +1,85 @@
+import asyncio
+import itertools
+import random
+
+import httpx
+import orjson
+from sqlmodel import Session, select
+
+from sdk.parsers.ScheduleTimes import maskFromBytes
+from sdk.schema.aggregated.SectionTimes import SectionTimesDB
+from sdk.schema.sources.Section import SectionDB
+from sdk.search.TimetableBuilder import TimetableSearch
+
+
+def bruteForce(courses: list[list[tuple[int, str]]]) -> list[tuple[str, ...]]:
+    out = []
+    for combination in itertools.product(*courses):
+        used = 0
+        for mask, _ in combination:
+            if mask & used:
+                break
+            used |= mask
+        else:
+            out.append(tuple(section for _, section in combination))
+    return out
+
+
+def test_finds_every_conflict_free_timetable():
+    rng = random.Random(0)
+    for _ in range(50):
+        courses = [
+            [(rng.getrandbits(12) & rng.getrandbits(12), f"{c}-{s}") for s in range(rng.randint(1, 5))]
+            for c in range(rng.randint(1, 4))
+        ]
+        found = [tuple(t) for t in TimetableSearch(courses, max_results=10000)]
+        assert sorted(found) == sorted(bruteForce(courses))
+
+
+def test_results_keep_the_course_order():
+    # the second course is the most constrained and gets placed first
+    courses = [[(0b0011, "a1"), (0b1100, "a2")], [(0b0001, "b1")]]
+    assert list(TimetableSearch(courses)) == [["a2", "b1"]]
+
+
+def test_stops_at_max_results():
+    courses = [[(0, f"{c}-{s}") for s in range(10)] for c in range(3)]
+    search = TimetableSearch(courses, max_results=25)
+    assert len(list(search)) == 25
+    assert search.stopped == "max_results"
+
+    search = TimetableSearch([[(1, "a")], []])
+    assert list(search) == []
+    assert search.stopped is None
+
+
+def test_timetable_route(api):
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://test") as client:
+            r = await client.get("/v1/timetable", params={"year": 2024, "term": 30, "courses": ["CPSC 1050", "MATH-1150", "ENGL2280"]})
+            assert r.status_code == 200
+            lines = [orjson.loads(line) for line in r.content.splitlines()]
+
+            summary = lines.pop()
+            assert summary == {"count": len(lines), "complete": True, "stopped": None}
+            assert lines
+
+            with Session(api.engine) as session:
+                statement = select(SectionDB.id, SectionTimesDB.mask).join(SectionTimesDB, SectionTimesDB.section_key == SectionDB.section_key)
+                masks = {id: maskFromBytes(mask) for id, mask in session.exec(statement).all()}
+            for timetable in lines:
+                assert [id.split("-")[1:3] for id in timetable["sections"]] == [["CPSC", "1050"], ["MATH", "1150"], ["ENGL", "2280"]]
+                for a, b in itertools.combinations(timetable["sections"], 2):
+                    assert not masks[a] & masks[b]
+
+            r = await client.get("/v1/timetable", params={"year": 2024, "term": 30, "courses": ["CPSC 1050"], "max_results": 2})
+            assert orjson.loads(r.content.splitlines()[-1]) == {"count": 2, "complete": False, "stopped": "max_results"}
+
+            r = await client.get("/v1/timetable", params={"year": 2024, "term": 30, "courses": ["CPSC 1050", "CPSC-1050"]})
+            assert r.status_code == 400
+            r = await client.get("/v1/timetable", params={"year": 2024, "term": 30, "courses": ["1050"]})
+            assert r.status_code == 400
+            r = await client.get("/v1/timetable", params={"year": 2024, "term": 30, "courses": ["CPSC 9999"]})
+            assert r.status_code == 404
+
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+import inspect
+
+from sqlmodel import Session, select
+
+from sdk.schema.aggregated.CourseMax import CourseMaxDB
+from sdk.schema.aggregated.CourseTransferDestination import CourseTransferDestinationDB
+
+
+def route(api, path):
+    endpoint = next(r.endpoint for r in api.app.routes if getattr(r, "path", None) == path)
+    return inspect.unwrap(endpoint)
+
+
+def test_table_matches_the_csv_column(api):
+    with Session(api.engine) as session:
+        rows = session.exec(select(CourseTransferDestinationDB)).all()
+        courses = session.exec(select(CourseMaxDB)).all()
+
+    from_table = {(r.destination, r.id_course) for r in rows}
+    from_csv = {
+        (destination, c.id_course)
+        for c in courses if c.transfer_destinations
+        for destination in c.transfer_destinations.strip(",").split(",")
+    }
+    assert from_table == from_csv
+
+    # agreements without credit don't count, ended ones aren't active
+    assert not [r for r in rows if r.destination == "DOUG"]
+    assert {r.active for r in rows if r.destination == "KPU"} == {False}
+    assert {r.active for r in rows if r.destination == "SFU"} == {True}
+
+
+def test_course_searches_filter_by_destination(api):
+    v1 = route(api, "/v1/search/courses")
+    v2 = route(api, "/v2/search/courses")
+    with Session(api.engine) as session:
+        expected = {
+            (c.subject, c.course_code) for c in session.exec(select(CourseMaxDB)).all()
+            if c.transfer_destinations and ",SFU," in c.transfer_destinations and ",UBCV," in c.transfer_destinations
+        }
+        assert expected
+
+        result = v1(session=session, query="", transfers_to=["SFU", "UBCV"])
+        assert {(c.subject, c.course_code) for c in result.courses} == expected
+
+        result = v2(
+            session=session, subject=None, course_code=None, title_search=None, attr_ar=None, attr_sc=None, attr_hum=None,
+            attr_lsc=None, attr_sci=None, attr_soc=None, attr_ut=None, credits=None, on_langara_website=None,
+            offered_online=None, prerequisites=None, transfer_destinations=["SFU", "UBCV"],
+        )
+        assert {(c.subject, c.course_code) for c in result.courses} == expected
+
+        assert v1(session=session, query="", transfers_to=["DOUG"]).courses == []
@@ -0,0 +1,56 @@
+from sqlmodel import Session
+
+from sdk.search.SectionSearchIndex import SectionSearchIndex
+from sdk.search.TrigramIndex import TrigramIndex, trigrams
+
+
+INSTRUCTORS = ["gregory holditch", "bob ross", "jane smith", "ada lovelace"]
+
+
+def test_trigrams_are_padded():
+    assert trigrams("cat") == {"  c", " ca", "cat", "at "}
+
+
+def test_typos_find_the_value():
+    index = TrigramIndex(INSTRUCTORS)
+    scores = index.search("Holdich")
+    assert list(scores) == ["gregory holditch"]
+    assert 0.4 <= scores["gregory holditch"] < 1
+
+
+def test_substrings_score_one():
+    index = TrigramIndex(INSTRUCTORS)
+    assert index.search("ross") == {"bob ross": 1.0}
+    assert index.search("lovel")["ada lovelace"] == 1.0
+
+
+def test_every_query_word_has_to_match():
+    index = TrigramIndex(INSTRUCTORS)
+    assert "ada lovelace" in index.search("ada lovelase")
+    assert index.search("jane holditch") == {}
+    assert index.search("xyzzy") == {}
+
+
+def test_bitsets_count_and_page(api):
+    with Session(api.engine) as session:
+        index = SectionSearchIndex.build(session)
+
+    exact = index.search(instructor_search="Holditch")
+    assert exact
+    # a typo still finds every section of the instructor
+    assert index.search(instructor_search="Holdich") & exact == exact
+
+    both = index.search(year=2024, subject="CPSC")
+    assert index.count(both) == index.count(index.search(year=2024) & index.search(subject="CPSC"))
+
+    ids = index.page(both, 0, index.count(both))
+    assert len(ids) == len(set(ids)) == index.count(both)
+    assert index.page(both, 5, 7) == ids[5:12]
+    assert index.page(both, index.count(both), 10) == []
+
+
+def test_quick_search_ranks_best_matches_first(api):
+    index = api.section_index
+    positions = index.quick_search("Holdich")
+    assert positions
+    assert index.quick_search("CPSC 1050", year=2024) == [p for p in index.positions(index.search(subject="CPSC", course_code=1050, year=2024))]
@@ -0,0 +1,44 @@
+import os
+import sqlite3
+
+from sqlmodel import Session
+
+from Controller import Controller
+from sdk.schema.aggregated.Metadata import Metadata
+
+
+def test_new_database_uses_wal_and_large_pages(tmp_path):
+    db_path = str(tmp_path / "database.db")
+    c = Controller(db_path)
+    c.create_db_and_tables()
+    c.engine.dispose()
+
+    connection = sqlite3.connect(db_path)
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert connection.execute("PRAGMA page_size").fetchone()[0] == 32768
+    connection.close()
+
+
+def test_readers_dont_block_writes(tmp_path):
+    db_path = str(tmp_path / "database.db")
+    c = Controller(db_path)
+    c.create_db_and_tables()
+
+    # an api worker in the middle of copying the database
+    reader = sqlite3.connect(db_path)
+    reader.execute("BEGIN")
+    before = reader.execute("SELECT count(*) FROM metadata").fetchone()[0]
+
+    with Session(c.engine) as session:
+        session.add(Metadata(field="test_field", value="written"))
+        session.commit()
+
+    # the reader still sees the version it started on
+    assert reader.execute("SELECT count(*) FROM metadata").fetchone()[0] == before
+    reader.rollback()
+    assert reader.execute("SELECT count(*) FROM metadata").fetchone()[0] == before + 1
+    reader.close()
+
+    assert c.checkpoint() is True
+    assert os.path.getsize(db_path + "-wal") == 0
+    c.engine.dispose()